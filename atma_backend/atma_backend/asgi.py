@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'atma_backend.settings')
+os.environ.setdefault('ATMA_ASYNC_VIEWS', '1')  # Route the read-heavy pages to their async views
 
 application = get_asgi_application()
@@ -33,30 +33,35 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 
-# Simple JWT settings
-# SIMPLE_JWT = {
-#     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
-#     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-#     'ROTATE_REFRESH_TOKENS': False,
-#     'BLACKLIST_AFTER_ROTATION': True,
-#     'ALGORITHM': 'HS256',
-#     'SIGNING_KEY': os.getenv('SECRET_KEY'),
-#     'VERIFYING_KEY': None,
-#     'AUDIENCE': None,
-#     'ISSUER': None,
-#     'AUTH_HEADER_TYPES': ('Bearer',),
-#     'USER_ID_FIELD': 'id',
-#     'USER_ID_CLAIM': 'user_id',
-#     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
-#     'TOKEN_TYPE_CLAIM': 'token_type',
-#     'JTI_CLAIM': 'jti',
-#     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
-#     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
-#     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
-# }
+# JSON API for the mobile app (timetable/api.py): stateless JWT
+# authentication, so API requests read neither the session nor the user table
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication'],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser', 'rest_framework.parsers.FormParser'],
+}
+
+# Short-lived access tokens; refreshing one reloads the user and their claims
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('ATMA_API_ACCESS_MINUTES', '5'))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.getenv('ATMA_API_REFRESH_DAYS', '7'))),
+    'UPDATE_LAST_LOGIN': False,
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'timetable.api.TokenObtainSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'timetable.api.TokenRefreshWithClaimsSerializer',
+}
 
 AUTH_USER_MODEL = 'timetable.User'
 
+# Loads the user's department with the user, for the authorization checks.
+# ModelBackend stays listed so sessions logged in through it before remain
+# valid (a session records the backend that logged it in).
+AUTHENTICATION_BACKENDS = [
+    'timetable.authz.DepartmentModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Application definition
 
@@ -69,10 +74,13 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'django_htmx',  # HTMX support
+    'rest_framework',  # JSON API for the mobile app
     'timetable.apps.TimetableConfig',  # Custom app for timetable management
 ]
 
 MIDDLEWARE = [
+    'timetable.middleware.MetricsMiddleware',  # Prometheus request metrics for /metrics
+    'timetable.middleware.RequestMetricsMiddleware',  # Query/timing metrics (off unless enabled below)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,13 +89,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'timetable.middleware.ProfilingMiddleware',  # Staff-only cProfile captures (off unless enabled below)
 ]
 
 ROOT_URLCONF = 'atma_backend.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'timetable.template_backends.TimedDjangoTemplates',  # DjangoTemplates + render timing
         'DIRS': [
             BASE_DIR / 'templates',  # Directory for HTML templates
         ],
@@ -98,6 +107,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'timetable.authz.context',  # Role and HOD status for navigation
             ],
         },
     },
@@ -113,6 +123,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent
+            # writers (elective registration) wait instead of failing with
+            # "database is locked" when upgrading a read lock
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -136,6 +153,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache. The timetable grids and the live update log are versioned in it,
+# so every worker process must see the same cache: the default in-memory
+# cache is per process and only fits a single worker. Set ATMA_WORKERS to
+# the number of worker processes; with more than one, a system check
+# refuses to start until ATMA_CACHE_BACKEND names a shared cache, e.g.
+# django.core.cache.backends.redis.RedisCache with
+# ATMA_CACHE_LOCATION=redis://127.0.0.1:6379.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('ATMA_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('ATMA_CACHE_LOCATION', ''),
+    },
+}
+ATMA_WORKERS = int(os.getenv('ATMA_WORKERS', '1'))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -160,6 +193,121 @@ STATICFILES_DIRS = [BASE_DIR / 'timetable' / 'static'] # Directory for static fi
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Per-request metrics: query count, DB time, template time and wall time are
+# sent as a Server-Timing header and logged by 'timetable.requests'.
+# BUDGETS maps URL names to a max query count or to a dict with any of
+# 'queries', 'db_ms' and 'total_ms'; ON_BUDGET_EXCEEDED is 'warn' or 'raise'.
+ATMA_REQUEST_METRICS = {
+    'ENABLED': os.getenv('ATMA_REQUEST_METRICS', '0') == '1',
+    'BUDGETS': {},
+    'ON_BUDGET_EXCEEDED': 'warn',
+}
+
+# On-demand profiling: staff users can send "X-Profile: 1" (or ?_profile=1)
+# to run one request under cProfile. Captures are written to DIR and listed
+# in the admin under "Profile captures".
+ATMA_PROFILING = {
+    'ENABLED': os.getenv('ATMA_PROFILING', '0') == '1',
+    'DIR': Path(os.getenv('ATMA_PROFILING_DIR', BASE_DIR / 'profiles')),
+    'TOP_N': 30,
+    'HEADER': 'X-Profile',
+    'QUERY_PARAM': '_profile',
+}
+
+# Prometheus metrics served at /metrics, off unless ATMA_METRICS=1. Only
+# staff users and scrapers connecting from ALLOWED_IPS may read them. With
+# several worker processes set MULTIPROCESS_DIR to a directory shared by all
+# workers: each one writes its values there (at most every FLUSH_INTERVAL
+# seconds) and a scrape sums them.
+ATMA_METRICS = {
+    'ENABLED': os.getenv('ATMA_METRICS', '0') == '1',
+    'ALLOWED_IPS': os.getenv('ATMA_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(','),
+    'MULTIPROCESS_DIR': os.getenv('ATMA_METRICS_DIR'),
+    'FLUSH_INTERVAL': 1.0,
+}
+
+# Serve the timetable and course detail pages with their native async views
+# (timetable/views/async_views.py). asgi.py turns this on; WSGI keeps the
+# sync views.
+ATMA_ASYNC_VIEWS = os.getenv('ATMA_ASYNC_VIEWS', '0') == '1'
+
+# Course scheduler. With TRACE on, every run records each candidate slot and
+# why it was rejected; the HOD "Bottlenecks" page summarizes the stored runs.
+ATMA_SCHEDULER = {
+    'TRACE': os.getenv('ATMA_SCHEDULER_TRACE', '0') == '1',
+}
+
+# Weekly time grid (timetable/timegrid.py): the teaching days and each day's
+# slots as (code, start, end). A gap between two slots is a break that labs
+# never span. TimeSlot rows are created from it after migrate.
+ATMA_TIME_GRID = {
+    'DAYS': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'],
+    'SLOTS': [
+        ('A', '08:00', '09:00'),
+        ('B', '09:00', '10:00'),
+        ('C', '10:00', '11:00'),
+        ('D', '11:00', '12:00'),
+        ('E', '12:00', '13:00'),
+        ('F', '14:00', '15:00'),
+        ('G', '15:00', '16:00'),
+        ('H', '16:00', '17:00'),
+    ],
+}
+
+# Session and flash message storage. 'db' is Django's default: every
+# logged-in request reads its django_session row. 'cached' serves sessions
+# from the cache (written through to the database) and keeps flash messages
+# in a signed cookie, so most pages neither read nor write django_session.
+# With several worker processes 'cached' needs a cache they all share
+# (CACHES), or a logout would not reach the other workers.
+ATMA_SESSION_PROFILES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    },
+    'cached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.cookie.CookieStorage',
+    },
+}
+ATMA_SESSION_PROFILE = os.getenv('ATMA_SESSION_PROFILE', 'db')
+SESSION_ENGINE = ATMA_SESSION_PROFILES[ATMA_SESSION_PROFILE]['SESSION_ENGINE']
+MESSAGE_STORAGE = ATMA_SESSION_PROFILES[ATMA_SESSION_PROFILE]['MESSAGE_STORAGE']
+SESSION_SAVE_EVERY_REQUEST = False  # Save sessions only when they change
+
+# Signup username check (timetable/usernames.py). A Bloom filter answers most
+# checks without a query; it picks up new users every REFRESH_INTERVAL
+# seconds and is rebuilt every REBUILD_INTERVAL. Each client may check
+# RATE_LIMIT names per RATE_WINDOW seconds before getting 429s.
+ATMA_USERNAME_CHECK = {
+    'ERROR_RATE': 0.01,
+    'MIN_CAPACITY': 10_000,
+    'REFRESH_INTERVAL': 5.0,
+    'REBUILD_INTERVAL': 600.0,
+    'RATE_LIMIT': int(os.getenv('ATMA_USERNAME_CHECK_RATE_LIMIT', '30')),
+    'RATE_WINDOW': 10,
+}
+
+# Client address used for rate limits (timetable/ratelimit.py). Behind a
+# reverse proxy set HEADER to the header it adds (e.g. X-Forwarded-For) and
+# PROXY_COUNT to the number of trusted proxies in front of the app; without
+# a HEADER the socket address (REMOTE_ADDR) is used.
+ATMA_CLIENT_IP = {
+    'HEADER': os.getenv('ATMA_CLIENT_IP_HEADER'),
+    'PROXY_COUNT': int(os.getenv('ATMA_TRUSTED_PROXIES', '1')),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'timetable.requests': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
\ No newline at end of file
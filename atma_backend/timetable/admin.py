@@ -1,6 +1,9 @@
 from django import forms
 from django.contrib import admin
-from .models import Department, User, Batch, Classroom, TimeSlot, Student, Course, Schedule
+from .models import (
+    Department, User, Batch, Classroom, TimeSlot, Student, Course, Schedule, TimetableVersion,
+    Term, ArchivedCourse, ArchivedSchedule, ProfileCapture, SchedulingRun, TeacherAvailability,
+)
 
 class DepartmentAdminForm(forms.ModelForm):
     class Meta:
@@ -27,11 +30,68 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ('username', 'department__name')  # Enable search bar
     ordering = ('department', 'role')  # Order by department first
 
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'term', 'department', 'teacher')
+    list_filter = ('term', 'department')
+    search_fields = ('code', 'name')
+
+    def get_queryset(self, request):
+        # The default manager only sees the active term
+        return Course.all_terms.select_related('term', 'department', 'teacher')
+
+class ScheduleAdmin(admin.ModelAdmin):
+    list_filter = ('term',)
+
+    def get_queryset(self, request):
+        return Schedule.all_terms.select_related('course', 'timeslot', 'classroom')
+
+class TermAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'is_active', 'is_closed')
+
+class TimetableVersionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'term', 'session_count', 'created_by', 'created_at')
+    list_filter = ('term',)
+    exclude = ('data',)  # Packed snapshot, managed through timetable.versions
+    readonly_fields = ('name', 'term', 'session_count', 'created_by', 'created_at')
+
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'url_name', 'duration_ms', 'user')
+    list_filter = ('url_name',)
+    search_fields = ('path', 'user__username')
+    readonly_fields = ('created_at', 'user', 'method', 'path', 'url_name', 'duration_ms', 'prof_file', 'summary')
+
+    def has_add_permission(self, request):
+        return False  # Captures are only created by ProfilingMiddleware
+
+class SchedulingRunAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'course', 'department', 'placed', 'required', 'created_by')
+    list_filter = ('department',)
+    exclude = ('trace',)
+    readonly_fields = (
+        'created_at', 'course', 'department', 'created_by', 'required', 'placed',
+        'load_ms', 'search_ms', 'write_ms', 'rejections',
+    )
+
+    def has_add_permission(self, request):
+        return False  # Runs are only recorded by the scheduler
+
+class TeacherAvailabilityAdmin(admin.ModelAdmin):
+    list_display = ('teacher', 'updated_at')
+    search_fields = ('teacher__username',)
+    readonly_fields = ('updated_at',)  # The slot masks are edited on the teacher's availability page
+
 admin.site.register(Department, DepartmentAdmin)
 admin.site.register(Batch)
 admin.site.register(Classroom)
 admin.site.register(TimeSlot)
 admin.site.register(Student)
-admin.site.register(Course)
-admin.site.register(Schedule)
-admin.site.register(User, UserAdmin)
\ No newline at end of file
+admin.site.register(Course, CourseAdmin)
+admin.site.register(Schedule, ScheduleAdmin)
+admin.site.register(User, UserAdmin)
+admin.site.register(TimetableVersion, TimetableVersionAdmin)
+admin.site.register(Term, TermAdmin)
+admin.site.register(ArchivedCourse)
+admin.site.register(ArchivedSchedule)
+admin.site.register(ProfileCapture, ProfileCaptureAdmin)
+admin.site.register(SchedulingRun, SchedulingRunAdmin)
+admin.site.register(TeacherAvailability, TeacherAvailabilityAdmin)
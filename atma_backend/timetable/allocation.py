@@ -0,0 +1,346 @@
+"""
+Institution-wide room allocation.
+
+HODs schedule their courses one at a time and each run takes the rooms that
+are still free, so the first department to schedule gets the best rooms.
+This module re-assigns the classrooms of every placed session in one go,
+across all departments, keeping every session in its timeslot.
+
+Sessions in the same timeslot compete for the same rooms, so each timeslot
+is one assignment problem (sessions x rooms) solved exactly with the
+Hungarian algorithm. Lab blocks are the exception: a block (consecutive
+sessions of a lab course in one room) must keep one room for all its slots,
+so blocks are placed first, each in the room that is cheapest over all its
+slots and not taken by another block, and are then pinned while the
+timeslots are solved. A room costs, per session:
+
+- a large penalty per missing seat (too small) and for unavailable rooms,
+- a penalty when the room is another department's (far away),
+- one point per empty seat, so big rooms stay free for big classes,
+- one point for moving, so equal choices keep the current room.
+
+A session in a too small, unavailable or far-away room is *poorly placed*.
+A first pass finds the cheapest allocation and with it how many sessions
+have to be poorly placed at all. Fairness quotas split that number between
+departments in proportion to their sessions. The second pass solves the
+timeslots again in week order, scaling each department's penalties by how
+much of its quota it has already used, so when rooms run short the bad ones
+rotate between departments instead of always landing on the same one.
+
+Everything is loaded in a handful of queries. With ``apply`` the load and
+the write run in one transaction, the sessions locked as they are read, so
+nothing scheduled in between is overwritten; the rooms are read from the
+database too rather than from the per-process occupancy index. The moved
+sessions are written back by deleting them and inserting them again under
+their ids: a room may only hold one session per timeslot, a constraint
+checked row by row, so updating two sessions that swap rooms would fail
+halfway.
+"""
+import math
+import time
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from . import events, grids, occupancy
+from .models import Classroom, Course, Department, Schedule, Student, Term
+
+SHORT_SEAT_COST = 1000  # Per missing seat
+UNAVAILABLE_COST = 100_000
+AWAY_COST = 200  # Room of another department
+MOVE_COST = 1
+
+
+def min_cost_assignment(costs):
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials) for an
+    ``n x m`` cost matrix with ``n <= m``: the column assigned to each row,
+    with the smallest total cost. O(n^2 * m).
+    """
+    n = len(costs)
+    m = len(costs[0]) if n else 0
+    if n > m:
+        raise ValueError("More rows than columns.")
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    owner = [0] * (m + 1)  # Row (1-based) assigned to each column, 0 for none
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = [math.inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            row = costs[i0 - 1]
+            ui0 = u[i0]
+            delta = math.inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = row[j - 1] - ui0 - v[j]
+                    if reduced < minv[j]:
+                        minv[j] = reduced
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    assignment = [0] * n
+    for j in range(1, m + 1):
+        if owner[j]:
+            assignment[owner[j] - 1] = j - 1
+    return assignment
+
+
+class Session:
+    __slots__ = ('pk', 'timeslot_id', 'course_id', 'department_id', 'size', 'current', 'room', 'block')
+
+    def __init__(self, pk, timeslot_id, course_id, department_id, size, current):
+        self.pk = pk
+        self.timeslot_id = timeslot_id
+        self.course_id = course_id
+        self.department_id = department_id
+        self.size = size
+        self.current = current  # Classroom id now
+        self.room = current  # Classroom id after allocation
+        self.block = None  # The lab block's sessions, when part of one
+
+
+class RoomAllocator:
+    def __init__(self):
+        self.quota = {}
+        self.timings = {'load': 0.0, 'solve': 0.0, 'write': 0.0}
+
+    def load(self, lock=False):
+        """Read the rooms and sessions; with ``lock`` the sessions are locked until the transaction ends."""
+        start = time.perf_counter()
+        self.rooms = list(Classroom.objects.order_by('pk'))
+        self.room_by_id = {room.pk: room for room in self.rooms}
+
+        # Students per course: its batches' students plus its elective students
+        batch_sizes = dict(Student.objects.values_list('batch_id').annotate(count=Count('pk')))
+        sizes = Counter()
+        for course_id, batch_id in Course.batches.through.objects.values_list('course_id', 'batch_id'):
+            sizes[course_id] += batch_sizes.get(batch_id, 0)
+        enrolled = Course.elective_students.through.objects.values_list('course_id').annotate(count=Count('pk'))
+        for course_id, count in enrolled:
+            sizes[course_id] += count
+
+        schedules = Schedule.objects.select_for_update(of=('self',)) if lock else Schedule.objects.all()
+        self.sessions = [
+            Session(pk, timeslot_id, course_id, department_id, sizes[course_id], classroom_id)
+            for pk, timeslot_id, course_id, department_id, classroom_id in schedules.values_list(
+                'pk', 'timeslot_id', 'course_id', 'course__department_id', 'classroom_id')
+        ]
+        self.by_timeslot = defaultdict(list)
+        for session in self.sessions:
+            self.by_timeslot[session.timeslot_id].append(session)
+        lab_courses = set(Course.objects.filter(lab_blocks__gt=0).values_list('pk', flat=True))
+        self.blocks = self.lab_blocks([session for session in self.sessions if session.course_id in lab_courses])
+        self.sessions_per_department = Counter(session.department_id for session in self.sessions)
+        self.department_codes = dict(Department.objects.values_list('pk', 'code'))
+        self.timings['load'] = time.perf_counter() - start
+
+    def lab_blocks(self, sessions):
+        """
+        Group lab course sessions in back-to-back slots of one room into
+        blocks, in week order. A lecture right next to its course's lab in
+        the same room joins the block, which only keeps it in that room.
+        """
+        index = occupancy.get_index()  # Only for the bit positions of the week grid
+        runs = defaultdict(list)
+        for session in sessions:
+            if session.timeslot_id in index.bits:
+                runs[session.course_id, session.current].append(session)
+        blocks = []
+        for run in runs.values():
+            run.sort(key=lambda session: index.bits[session.timeslot_id])
+            block = [run[0]]
+            for session in run[1:]:
+                previous = index.bits[block[-1].timeslot_id]
+                if previous & index.links and index.bits[session.timeslot_id] == previous << 1:
+                    block.append(session)
+                    continue
+                blocks.append(block)
+                block = [session]
+            blocks.append(block)
+        blocks = [block for block in blocks if len(block) > 1]
+        for block in blocks:
+            for session in block:
+                session.block = block
+        return sorted(blocks, key=lambda block: index.bits[block[0].timeslot_id])
+
+    def poor(self, session, room_id):
+        room = self.room_by_id.get(room_id)
+        return (
+            room is None or not room.availability or room.capacity < session.size
+            or room.department_id not in (None, session.department_id)
+        )
+
+    def cost(self, session, room, weight):
+        penalty = 0
+        if not room.availability:
+            penalty += UNAVAILABLE_COST
+        if room.capacity < session.size:
+            penalty += SHORT_SEAT_COST * (session.size - room.capacity)
+        if room.department_id not in (None, session.department_id):
+            penalty += AWAY_COST
+        waste = max(room.capacity - session.size, 0)
+        return penalty * weight + waste + (MOVE_COST if room.pk != session.current else 0)
+
+    def solve_blocks(self, blocks, taken):
+        """Give each lab block the room cheapest over all its slots among those nothing else holds then."""
+        for block in blocks:
+            free = [
+                room for room in self.rooms
+                if not any((session.timeslot_id, room.pk) in taken for session in block)
+            ] or [self.room_by_id.get(block[0].current)]  # Blocks cannot overlap in the current timetable
+            room = min(free, key=lambda room: sum(self.cost(session, room, 1) for session in block))
+            for session in block:
+                session.room = room.pk
+                taken.add((session.timeslot_id, room.pk))
+
+    def solve_timeslot(self, sessions, weights, taken=()):
+        """Assign the sessions of one timeslot, except lab block sessions, to the rooms blocks left free."""
+        sessions = [session for session in sessions if session.block is None]
+        rooms = [room for room in self.rooms if not sessions or (sessions[0].timeslot_id, room.pk) not in taken]
+        costs = [[self.cost(session, room, weights[session.department_id]) for room in rooms] for session in sessions]
+        for session, column in zip(sessions, min_cost_assignment(costs)):
+            session.room = rooms[column].pk
+
+    def poorly_placed(self, attribute):
+        counts = Counter()
+        for session in self.sessions:
+            if self.poor(session, getattr(session, attribute)):
+                counts[session.department_id] += 1
+        return counts
+
+    def quotas(self, total_poor):
+        """Each department's share of the poorly placed sessions, by its share of sessions."""
+        total = len(self.sessions)
+        return {
+            department_id: math.ceil(total_poor * count / total)
+            for department_id, count in self.sessions_per_department.items()
+        }
+
+    def pinned(self):
+        """
+        Timeslots with more sessions than rooms keep their rooms, and so
+        do the lab blocks meeting in them. Returns the solvable timeslots,
+        the movable blocks and the (timeslot, room) pairs held by the rest.
+        """
+        timeslots = [sessions for _, sessions in sorted(self.by_timeslot.items()) if len(sessions) <= len(self.rooms)]
+        solvable = {sessions[0].timeslot_id for sessions in timeslots}
+        blocks = [block for block in self.blocks if all(session.timeslot_id in solvable for session in block)]
+        kept = {
+            (session.timeslot_id, session.current) for session in self.sessions
+            if session.timeslot_id not in solvable or (session.block is not None and session.block not in blocks)
+        }
+        return timeslots, blocks, kept
+
+    def solve(self):
+        start = time.perf_counter()
+        timeslots, blocks, kept = self.pinned()
+
+        # Lab blocks first; they stay pinned while the timeslots are solved
+        taken = set(kept)
+        self.solve_blocks(blocks, taken)
+
+        # First pass: the cheapest rooms overall, which sizes the quotas
+        for sessions in timeslots:
+            self.solve_timeslot(sessions, defaultdict(lambda: 1), taken)
+        self.quota = self.quotas(sum(self.poorly_placed('room').values()))
+
+        # Second pass: a department pays more for bad rooms the more of its quota it has used
+        used = Counter(
+            session.department_id for block in blocks for session in block if self.poor(session, session.room)
+        )
+        for sessions in timeslots:
+            weights = {
+                department_id: 1 + used[department_id] / max(self.quota[department_id], 1)
+                for department_id in {session.department_id for session in sessions}
+            }
+            self.solve_timeslot(sessions, weights, taken)
+            used.update(
+                session.department_id for session in sessions
+                if session.block is None and self.poor(session, session.room)
+            )
+        self.timings['solve'] = time.perf_counter() - start
+
+    def write(self):
+        start = time.perf_counter()
+        moved = self.moved()
+        if moved:
+            term_id = Term.get_active().pk
+            with events.bulk_change():
+                Schedule.objects.filter(pk__in=[session.pk for session in moved]).delete()
+                Schedule.objects.bulk_create([
+                    Schedule(
+                        pk=session.pk, term_id=term_id, course_id=session.course_id,
+                        timeslot_id=session.timeslot_id, classroom_id=session.room,
+                    )
+                    for session in moved
+                ], batch_size=500)
+            grids.invalidate()  # bulk_create does not send post_save
+        self.timings['write'] = time.perf_counter() - start
+        return len(moved)
+
+    def moved(self):
+        return [session for session in self.sessions if session.room != session.current]
+
+    def seats_short(self, attribute):
+        return sum(
+            max(session.size - self.room_by_id[getattr(session, attribute)].capacity, 0)
+            for session in self.sessions if getattr(session, attribute) in self.room_by_id
+        )
+
+    def report(self):
+        before = self.poorly_placed('current')
+        after = self.poorly_placed('room')
+        moved = Counter(session.department_id for session in self.moved())
+        return {
+            'sessions': len(self.sessions),
+            'rooms': len(self.rooms),
+            'moved': sum(moved.values()),
+            'poorly_placed': {'before': sum(before.values()), 'after': sum(after.values())},
+            'seats_short': {'before': self.seats_short('current'), 'after': self.seats_short('room')},
+            'departments': {
+                self.department_codes.get(department_id, str(department_id)): {
+                    'sessions': count,
+                    'poorly_placed_before': before[department_id],
+                    'poorly_placed_after': after[department_id],
+                    'quota': self.quota[department_id],
+                    'moved': moved[department_id],
+                }
+                for department_id, count in sorted(self.sessions_per_department.items())
+            },
+            'timings_ms': {phase: round(seconds * 1000, 2) for phase, seconds in self.timings.items()},
+        }
+
+
+def allocate(apply=False):
+    """Re-assign the classrooms of all placed sessions; write them with ``apply``. Returns the report."""
+    allocator = RoomAllocator()
+    with transaction.atomic():
+        allocator.load(lock=apply)
+        allocator.solve()
+        if apply:
+            allocator.write()
+    report = allocator.report()
+    report['applied'] = apply
+    return report
@@ -0,0 +1,119 @@
+"""
+Token authentication and payloads for the JSON API used by the mobile app.
+
+Requests are authenticated with short-lived JWT access tokens
+(``JWTStatelessUserAuthentication``): the token is checked with the signing
+key alone, so there is no session or user lookup per request. Everything a
+view needs to know about the user (role, department, batch) travels in the
+token as claims, added when the token pair is issued and again on every
+refresh, which reloads the user and turns away inactive accounts. A role
+change therefore reaches the API within one access token lifetime.
+
+Timetables are served as compact grids built from the cached grids in
+``grids`` (rows are days, columns are slots, each cell is ``[course id,
+room id]`` or ``null``, with the courses and rooms listed once) and carry
+a hash of that content as their ETag, so an unchanged timetable costs a
+conditional request and a cache read. Being derived from the content, the
+ETag changes with anything that changes the grid (electives included) and
+is the same on every worker.
+"""
+import hashlib
+import json
+
+from rest_framework import exceptions
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from . import grids, timegrid
+from .models import Student, User
+
+ROLE_CLAIM = 'role'
+DEPARTMENT_CLAIM = 'department_id'
+BATCH_CLAIM = 'batch_id'
+
+
+def add_claims(token, user):
+    """Put what the API views need about ``user`` into ``token``."""
+    token[ROLE_CLAIM] = user.role
+    token[DEPARTMENT_CLAIM] = user.department_id
+    if user.role == 'student':
+        student = getattr(user, 'student_profile', None)  # Students pick their batch after signing up
+        token[BATCH_CLAIM] = student.batch_id if student else None
+    return token
+
+
+class TokenObtainSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class TokenRefreshWithClaimsSerializer(TokenRefreshSerializer):
+    """Issue a new access token with the user's current claims; inactive users get none."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.select_related('student_profile').filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        return {'access': str(add_claims(refresh.access_token, user))}
+
+
+def owner(user):
+    """``(kind, owner)`` of the token user's timetable, as ``grids`` expects it, or ``None``."""
+    claims = user.token
+    if claims.get(ROLE_CLAIM) == 'teacher':
+        return 'teacher', User(pk=user.pk)
+    if claims.get(ROLE_CLAIM) == 'student' and claims.get(BATCH_CLAIM):
+        return 'student', Student(pk=user.pk, batch_id=claims[BATCH_CLAIM])
+    return None
+
+
+def grid_etag(payload):
+    """ETag of a ``grid_payload``: a digest of its content."""
+    content = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return f'"{hashlib.blake2b(content.encode(), digest_size=16).hexdigest()}"'
+
+
+def grid_payload(kind, owner):
+    """The owner's timetable as a days x slots matrix of ``[course id, room id]`` cells."""
+    grid = grids.student_grid(owner) if kind == 'student' else grids.teacher_grid(owner)
+    time_grid = timegrid.get_grid()
+    days = list(time_grid.days)
+    courses, rooms, cells = {}, {}, []
+    for day in days:
+        row = []
+        for slot in time_grid.codes:
+            schedule = grid.get(day, {}).get(slot)
+            if schedule is None:
+                row.append(None)
+                continue
+            courses[schedule.course_id] = {'code': schedule.course.code, 'name': schedule.course.name}
+            rooms[schedule.classroom_id] = schedule.classroom.name
+            row.append([schedule.course_id, schedule.classroom_id])
+        cells.append(row)
+    return {
+        'days': days,
+        'slots': [[code, start.strftime('%H:%M'), end.strftime('%H:%M')] for code, start, end in time_grid.slots],
+        'cells': cells,
+        'courses': courses,
+        'rooms': rooms,
+    }
+
+
+def course_payload(course):
+    """A course loaded with ``Course.objects.with_details()``."""
+    return {
+        'id': course.pk,
+        'code': course.code,
+        'name': course.name,
+        'credits': course.credits,
+        'teacher': f"{course.teacher.first_name} {course.teacher.last_name}".strip() or course.teacher.username,
+        'department': course.department.code,
+        'batches': [str(batch) for batch in course.batches.all()],
+        'sessions': [
+            [schedule.timeslot.day, schedule.timeslot.slot, schedule.classroom.name]
+            for schedule in course.schedules.all()
+        ],
+        'elective_seats_left': course.elective_seats_left,
+    }
@@ -6,4 +6,5 @@ class TimetableConfig(AppConfig):
     name = 'timetable'
 
     def ready(self):
+        import timetable.checks
         import timetable.signals
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Request-scoped authorization.
+
+``access(request)`` tells what the user is to the timetable: their role,
+their department and whether they are its HOD. It is worked out once per
+request from the user row itself: ``DepartmentModelBackend`` loads the user
+together with their department, so the HOD check costs no extra query and
+is always current, on every worker process. Appointing a new HOD, or
+changing a user's role or department, takes effect on the next request.
+
+``hod_required`` guards the HOD views with it, in place of comparing
+``request.user`` with ``request.user.department.hod`` in every view. Async
+views load the user themselves and hand it over with ``attach``, so the
+navbar's ``access`` never queries the database from the event loop.
+"""
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+
+class Access:
+    __slots__ = ('role', 'department_id', 'is_hod')
+
+    def __init__(self, role=None, department_id=None, is_hod=False):
+        self.role = role
+        self.department_id = department_id
+        self.is_hod = is_hod
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher'
+
+    @property
+    def is_student(self):
+        return self.role == 'student'
+
+
+ANONYMOUS = Access()
+
+
+def resolve(user):
+    department = user.department  # Loaded with the user by DepartmentModelBackend
+    return Access(user.role, user.department_id, department is not None and department.hod_id == user.pk)
+
+
+def access(request):
+    """The user's ``Access``, worked out once per request."""
+    try:
+        return request._timetable_access
+    except AttributeError:
+        pass
+    user = request.user
+    request._timetable_access = resolve(user) if user.is_authenticated else ANONYMOUS
+    return request._timetable_access
+
+
+def attach(request, user):
+    """Serve the request as ``user``, already loaded with its department (for async views)."""
+    request.user = user
+    request._timetable_access = resolve(user)
+    return request._timetable_access
+
+
+def hod_required(view=None, *, forbidden=False):
+    """
+    Let only the HOD of the user's department through. Everyone else is sent
+    home, or with ``forbidden`` (HTMX partials and actions) gets a 403 after
+    the usual login redirect for anonymous users.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if access(request).is_hod:
+                return view(request, *args, **kwargs)
+            if not forbidden:
+                return redirect('home')
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            return HttpResponse("Unauthorized", status=403)
+        return wrapper
+
+    return decorator(view) if view is not None else decorator
+
+
+def context(request):
+    """Template context processor: ``access`` for navigation, worked out only if used."""
+    return {'access': SimpleLazyObject(lambda: access(request))}
+
+
+class DepartmentModelBackend(ModelBackend):
+    """``ModelBackend`` that loads the user's department in the same query."""
+
+    def get_user(self, user_id):
+        try:
+            user = get_user_model()._default_manager.select_related('department').get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,29 @@
+"""
+System checks for deployment settings.
+
+The timetable grids (``grids``) and the live update log (``events``) keep
+their version counters in the default cache. A per-process cache gives
+every worker its own counters, so a change made through one worker would
+never reach the others.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Refuse a per-process cache when several worker processes serve the site."""
+    workers = getattr(settings, 'ATMA_WORKERS', 1)
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if workers > 1 and backend in PER_PROCESS_CACHES:
+        return [Error(
+            f"ATMA_WORKERS is {workers} but the default cache ({backend}) is per process.",
+            hint="Set ATMA_CACHE_BACKEND and ATMA_CACHE_LOCATION to a cache all workers share, e.g. Redis.",
+            id='timetable.E001',
+        )]
+    return []
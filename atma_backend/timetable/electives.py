@@ -0,0 +1,138 @@
+"""
+Elective registration.
+
+Students register for courses of other batches that are open as electives
+(``Course.elective_seats`` set). Two rules hold under any number of
+concurrent registrations:
+
+- Seats are never oversold. A seat is taken with a single conditional
+  ``UPDATE ... SET elective_seats_taken = elective_seats_taken + 1 WHERE
+  elective_seats_taken < elective_seats``; the database applies those one
+  at a time, so the last seat goes to exactly one student and everyone
+  else's update matches no row.
+- Electives never clash with the student's timetable. The slots of every
+  course come precomputed as bitmasks from the occupancy index, so the
+  student's week is the OR of their courses' masks and a clash is a single
+  AND. The student row is locked while registering, so two requests of the
+  same student cannot both pass the check.
+
+Registration only drops the student's own cached grid instead of bumping
+the global timetable version, so a registration rush does not throw away
+every other cached grid or the occupancy index.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from . import events, grids, occupancy
+from .models import Course, Student
+
+Enrollment = Course.elective_students.through
+
+
+class RegistrationError(Exception):
+    """A registration or drop that cannot go through; the message is shown to the student."""
+
+
+class ElectiveFull(RegistrationError):
+    pass
+
+
+class ElectiveClash(RegistrationError):
+    pass
+
+
+def offered(student):
+    """Courses open as electives to the student: open ones not taught to their batch."""
+    return (
+        Course.objects.filter(elective_seats__isnull=False)
+        .exclude(batches=student.batch_id)
+        .select_related('teacher', 'department')
+        .order_by('code')
+    )
+
+
+def courses_of(student):
+    """``{course id: code}`` of the student's core and elective courses, in one query."""
+    return dict(
+        Course.objects.filter(Q(batches=student.batch_id) | Q(elective_students=student))
+        .values_list('pk', 'code')
+    )
+
+
+def options(student):
+    """
+    ``(course, registered, clash)`` for every offered elective; ``clash`` is
+    the code of a course of the student's it collides with, if any.
+    """
+    index = occupancy.get_index()
+    taken = courses_of(student)
+    masks = {code: index.course_masks.get(course_id, 0) for course_id, code in taken.items()}
+    rows = []
+    for course in offered(student):
+        registered = course.pk in taken
+        clash = None
+        if not registered:
+            wanted = index.course_masks.get(course.pk, 0)
+            clash = next((code for code, mask in masks.items() if mask & wanted), None)
+        rows.append((course, registered, clash))
+    return rows
+
+
+def _changed(student, course_id, index):
+    """After commit: drop the student's grid and push the course's cells to their open timetable."""
+    cells = index.cells_of(index.course_masks.get(course_id, 0))
+    transaction.on_commit(partial(grids.forget_student, student.pk), robust=True)
+    if cells:
+        transaction.on_commit(partial(events.publish, {f'student:{student.pk}': set(cells)}), robust=True)
+
+
+@transaction.atomic
+def register(student, course_id):
+    """Register the student for an elective; ``RegistrationError`` says why not."""
+    # One registration per student at a time, so the clash check below stays true
+    Student.objects.select_for_update().only('pk').get(pk=student.pk)
+    course = offered(student).filter(pk=course_id).first()
+    if course is None:
+        raise RegistrationError("This course is not open for elective registration.")
+
+    taken = courses_of(student)
+    if course.pk in taken:
+        raise RegistrationError(f"You are already registered for {course.code}.")
+    index = occupancy.get_index()
+    if index.courses_mask(taken) & index.course_masks.get(course.pk, 0):
+        raise ElectiveClash(f"{course.code} clashes with your timetable.")
+
+    seat = Course.all_terms.filter(pk=course.pk, elective_seats_taken__lt=F('elective_seats'))
+    if not seat.update(elective_seats_taken=F('elective_seats_taken') + 1):
+        raise ElectiveFull(f"{course.code} is full.")
+    Enrollment.objects.create(course_id=course.pk, student_id=student.pk)
+    _changed(student, course.pk, index)
+    return course
+
+
+@transaction.atomic
+def drop(student, course_id):
+    """Drop an elective and give its seat back."""
+    course = Course.objects.filter(pk=course_id).first()
+    deleted = 0
+    if course is not None:
+        deleted, _ = Enrollment.objects.filter(course_id=course.pk, student_id=student.pk).delete()
+    if not deleted:
+        raise RegistrationError("You are not registered for this course.")
+    Course.all_terms.filter(pk=course.pk, elective_seats_taken__gt=0).update(
+        elective_seats_taken=F('elective_seats_taken') - 1
+    )
+    _changed(student, course.pk, occupancy.get_index())
+    return course
+
+
+def recount_seats(course_ids):
+    """Recount taken seats from the enrollments, after changes made around ``register``."""
+    taken = (
+        Enrollment.objects.filter(course_id=OuterRef('pk'))
+        .values('course_id').annotate(count=Count('*')).values('count')
+    )
+    Course.all_terms.filter(pk__in=course_ids).update(elective_seats_taken=Coalesce(Subquery(taken), 0))
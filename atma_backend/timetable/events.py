@@ -0,0 +1,301 @@
+"""
+Live timetable updates for the server-sent events stream.
+
+When ``Schedule`` rows change, the affected cells (day, slot letter) are
+published on the channel of everyone whose timetable shows them:
+``batch:<id>`` for core courses, ``student:<id>`` for electives and
+``teacher:<id>``. Bulk operations publish a reset on ``all`` instead.
+
+Each channel keeps a sequence number and a short log of recent changes in
+the default cache. The in-process ``broker`` only wakes the streams of the
+publishing process; every stream also re-checks the cache every
+``POLL_INTERVAL`` seconds. Across worker processes delivery is therefore
+polling, with up to ``POLL_INTERVAL`` of delay, and it only works when the
+workers share the cache: with the default per-process cache each worker
+sees only its own changes, which is why several workers require a shared
+cache (``CACHES``, enforced by the ``timetable.E001`` check).
+
+A cursor (``"all=0,batch:3=12"``) records the last sequence seen per
+channel. It travels as the SSE event id, so a reconnecting ``EventSource``
+resumes where it left off. When the log no longer reaches back that far
+the stream sends ``reset`` and the page reloads.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Course, Schedule, TimeSlot
+
+ALL = 'all'
+LOG_SIZE = 50
+LOG_TIMEOUT = 60 * 60
+POLL_INTERVAL = 15  # Seconds between cache checks (and keep-alives) of an idle stream
+RETRY_MS = 15_000  # How long a browser waits before reconnecting
+
+
+def student_channels(student):
+    return [ALL, f'batch:{student.batch_id}', f'student:{student.pk}']
+
+
+def teacher_channels(teacher):
+    return [ALL, f'teacher:{teacher.pk}']
+
+
+def _seq_key(channel):
+    return f'timetable:events:{channel}:seq'
+
+
+def _log_key(channel):
+    return f'timetable:events:{channel}:log'
+
+
+# -----------------------------------------------------------------------------
+# Publishing
+# -----------------------------------------------------------------------------
+
+class Broker:
+    """Wakes the streams of this process that wait on a channel."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = defaultdict(set)  # channel -> {(loop, asyncio.Event)}
+
+    def subscribe(self, channels, event):
+        waiter = (asyncio.get_running_loop(), event)
+        with self.lock:
+            for channel in channels:
+                self.waiters[channel].add(waiter)
+        return waiter
+
+    def unsubscribe(self, channels, waiter):
+        with self.lock:
+            for channel in channels:
+                self.waiters[channel].discard(waiter)
+                if not self.waiters[channel]:
+                    del self.waiters[channel]
+
+    def notify(self, channels):
+        with self.lock:
+            waiters = {waiter for channel in channels for waiter in self.waiters.get(channel, ())}
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # The loop is closed
+                pass
+
+    def connections(self):
+        with self.lock:
+            return len({waiter for waiters in self.waiters.values() for waiter in waiters})
+
+
+broker = Broker()
+
+
+def publish(changes):
+    """
+    Append ``{channel: cells}`` to the channel logs and wake local streams.
+    ``None`` instead of cells tells the channel's streams to reset.
+    """
+    for channel, cells in changes.items():
+        key = _seq_key(channel)
+        try:
+            seq = cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            seq = cache.incr(key)
+        # Concurrent publishers may drop each other's entry; readers see the gap and reset
+        log = [entry for entry in cache.get(_log_key(channel), []) if entry[0] > seq - LOG_SIZE]
+        log.append((seq, None if cells is None else sorted(cells)))
+        cache.set(_log_key(channel), log, LOG_TIMEOUT)
+    broker.notify(changes)
+
+
+class _Changes:
+    """Cells changed in one transaction, published once it commits."""
+
+    def __init__(self):
+        self.courses = defaultdict(set)  # course id -> timeslot ids, audience looked up on publish
+        self.channels = defaultdict(set)  # channel -> timeslot ids
+
+    def add_course(self, course_id, timeslot_ids):
+        self.courses[course_id].update(timeslot_ids)
+
+    def add_audience(self, course_id, timeslot_ids):
+        """Resolve the audience now, for courses about to be deleted."""
+        for channel in _audiences([course_id])[course_id]:
+            self.channels[channel].update(timeslot_ids)
+
+    def publish(self):
+        audiences = _audiences(self.courses)
+        for course_id, timeslot_ids in self.courses.items():
+            for channel in audiences[course_id]:
+                self.channels[channel].update(timeslot_ids)
+        timeslot_ids = set().union(*self.channels.values())
+        cells = {pk: (day, slot) for pk, day, slot in TimeSlot.objects.filter(
+            pk__in=timeslot_ids).values_list('pk', 'day', 'slot')}
+        publish({
+            channel: {cells[pk] for pk in ids if pk in cells}
+            for channel, ids in self.channels.items()
+        })
+
+
+def _audiences(course_ids):
+    """Channels that see each course: its teacher, batches and elective students."""
+    audiences = defaultdict(list)
+    if not course_ids:
+        return audiences
+    for course_id, teacher_id in Course.all_terms.filter(pk__in=course_ids).values_list('pk', 'teacher_id'):
+        audiences[course_id].append(f'teacher:{teacher_id}')
+    for course_id, batch_id in Course.batches.through.objects.filter(
+            course_id__in=course_ids).values_list('course_id', 'batch_id'):
+        audiences[course_id].append(f'batch:{batch_id}')
+    for course_id, student_id in Course.elective_students.through.objects.filter(
+            course_id__in=course_ids).values_list('course_id', 'student_id'):
+        audiences[course_id].append(f'student:{student_id}')
+    return audiences
+
+
+_local = threading.local()
+
+
+def _suppressed():
+    return getattr(_local, 'bulk', 0) > 0
+
+
+def schedules_changed(course_id, timeslot_ids):
+    """Publish changed sessions of a course after the current transaction commits."""
+    if _suppressed() or not timeslot_ids:
+        return
+    changes = _Changes()
+    changes.add_course(course_id, timeslot_ids)
+    transaction.on_commit(changes.publish, robust=True)
+
+
+def course_deleted(course):
+    """Publish the sessions of a course that is being deleted."""
+    if _suppressed():
+        return
+    timeslot_ids = list(Schedule.all_terms.filter(course=course).values_list('timeslot_id', flat=True))
+    if not timeslot_ids:
+        return
+    changes = _Changes()
+    changes.add_audience(course.pk, timeslot_ids)
+    transaction.on_commit(changes.publish, robust=True)
+
+
+@contextmanager
+def bulk_change(reset=True):
+    """
+    Skip per-row events inside the block and, with ``reset``, tell every
+    stream to reset once it commits. For restores and other bulk rewrites.
+    """
+    _local.bulk = getattr(_local, 'bulk', 0) + 1
+    try:
+        yield
+    finally:
+        _local.bulk -= 1
+    if reset:
+        transaction.on_commit(lambda: publish({ALL: None}), robust=True)
+
+
+# -----------------------------------------------------------------------------
+# Reading
+# -----------------------------------------------------------------------------
+
+def parse_cursor(value, channels):
+    cursor = {}
+    for part in (value or '').split(','):
+        channel, _, seq = part.rpartition('=')
+        if channel in channels and seq.isdigit():
+            cursor[channel] = int(seq)
+    return cursor
+
+
+def format_cursor(cursor):
+    return ','.join(f'{channel}={seq}' for channel, seq in sorted(cursor.items()))
+
+
+def _current(channels, seqs):
+    return {channel: seqs.get(_seq_key(channel), 0) for channel in channels}
+
+
+def current_cursor(channels):
+    return format_cursor(_current(channels, cache.get_many([_seq_key(c) for c in channels])))
+
+
+async def acurrent_cursor(channels):
+    return format_cursor(_current(channels, await cache.aget_many([_seq_key(c) for c in channels])))
+
+
+def _keys(channels):
+    return [_seq_key(c) for c in channels] + [_log_key(c) for c in channels]
+
+
+def _read(channels, cursor, values):
+    """
+    Return ``(cells, reset, cursor)`` for changes after ``cursor``.
+
+    Channels missing from the cursor start at their current sequence. An
+    entry whose sequence was taken but not yet logged ends the read early;
+    a real gap means changes were lost and the client must reset.
+    """
+    cells, reset, read = set(), False, {}
+    for channel in channels:
+        seq = values.get(_seq_key(channel), 0)
+        since = cursor.get(channel, seq)
+        entries = dict(values.get(_log_key(channel)) or [])
+        if seq < since or seq - since > LOG_SIZE:
+            reset, since = True, seq
+        for entry in range(since + 1, seq + 1):
+            if entry not in entries:
+                if any(later > entry for later in entries):
+                    reset, since = True, seq
+                break
+            if entries[entry] is None:
+                reset = True
+            else:
+                cells.update(map(tuple, entries[entry]))
+            since = entry
+        read[channel] = since
+    return cells, reset, read
+
+
+def read(channels, cursor):
+    return _read(channels, cursor, cache.get_many(_keys(channels)))
+
+
+async def aread(channels, cursor):
+    return _read(channels, cursor, await cache.aget_many(_keys(channels)))
+
+
+def message(cells, reset, cursor):
+    """Format one SSE message; it always carries the cursor as its id."""
+    lines = f"id: {format_cursor(cursor)}\n"
+    if reset:
+        lines += "event: reset\ndata: {}\n"
+    elif cells:
+        lines += f"event: cells\ndata: {json.dumps({'cells': sorted(cells)})}\n"
+    return lines + "\n"
+
+
+async def stream(channels, cursor):
+    """Yield SSE messages for ``channels`` until the client disconnects."""
+    wakeup = asyncio.Event()
+    waiter = broker.subscribe(channels, wakeup)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            wakeup.clear()
+            cells, reset, cursor = await aread(channels, cursor)
+            yield message(cells, reset, cursor) if cells or reset else ": keep-alive\n\n"
+            try:
+                await asyncio.wait_for(wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        broker.unsubscribe(channels, waiter)
@@ -0,0 +1,37 @@
+"""Custom model fields."""
+from django.db import models
+
+
+class BitmaskField(models.BinaryField):
+    """
+    A set of bit positions stored as little-endian bytes and read back as a
+    Python ``int``. Unlike ``BigIntegerField`` there is no 63-bit limit, so a
+    mask can cover any number of timeslots. Serialized as a hex string.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default', 0)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return int.from_bytes(value, 'little')
+
+    def to_python(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        if isinstance(value, str):
+            return int(value, 16)
+        return int.from_bytes(value, 'little')
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        if value is None:
+            return value
+        if value < 0:
+            raise ValueError("A bitmask cannot be negative.")
+        return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+    def value_to_string(self, obj):
+        return hex(self.value_from_object(obj))
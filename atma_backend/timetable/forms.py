@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from . import timegrid
 from .models import User, Course, Batch
 
 class CustomUserCreationForm(UserCreationForm):
@@ -25,16 +26,21 @@ class CustomAuthenticationForm(AuthenticationForm):
 
 class CreateCourseForm(forms.ModelForm):
     batches = forms.ModelMultipleChoiceField(
-        queryset=Batch.objects.all(),
+        queryset=Batch.objects.select_related('department'),
         widget=forms.CheckboxSelectMultiple
     )
     class Meta:
         model = Course
-        fields = ['name', 'code', 'credits', 'teacher', 'batches']
+        fields = ['name', 'code', 'credits', 'lab_blocks', 'lab_length', 'elective_seats', 'teacher', 'batches']
+        labels = {'lab_blocks': 'Labs per week', 'lab_length': 'Lab length', 'elective_seats': 'Elective seats'}
+        help_texts = {'elective_seats': 'Leave empty if students of other batches cannot register.'}
         
     def __init__(self, *args, **kwargs):
         self.request = kwargs.pop('request', None)
         super().__init__(*args, **kwargs)
+        # Labs are optional; omitted fields keep the model defaults
+        self.fields['lab_blocks'].required = False
+        self.fields['lab_length'].required = False
         if self.request and self.request.user.is_authenticated:
             self.fields['teacher'].queryset = User.objects.filter(
                 role='teacher',
@@ -43,8 +49,45 @@ class CreateCourseForm(forms.ModelForm):
         else:
             self.fields['teacher'].queryset = User.objects.filter(role='teacher')
 
+    def clean_code(self):
+        # Codes are unique per term; the term is not a form field, so the
+        # model constraint is not checked by the form itself
+        code = self.cleaned_data.get('code')
+        duplicates = Course.objects.filter(code=code)
+        if self.instance.pk:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise forms.ValidationError("A course with this code already exists in the current term.")
+        return code
+
     def clean_credits(self):
         credits = self.cleaned_data.get('credits')
         if credits < 1 or credits > 5:
             raise forms.ValidationError("Credits must be between 1 and 4.")
         return credits
+
+    def clean_lab_blocks(self):
+        # At most one lab per day
+        lab_blocks = self.cleaned_data.get('lab_blocks') or 0
+        days = len(timegrid.get_grid().days)
+        if lab_blocks > days:
+            raise forms.ValidationError(f"A course can have at most {days} labs per week.")
+        return lab_blocks
+
+    def clean_lab_length(self):
+        return self.cleaned_data.get('lab_length') or self.instance.lab_length
+
+    def clean_elective_seats(self):
+        seats = self.cleaned_data.get('elective_seats')
+        taken = self.instance.elective_seats_taken
+        if seats is not None and seats < taken:
+            raise forms.ValidationError(f"{taken} students are already registered.")
+        return seats
+
+
+class FreeRoomSearchForm(forms.Form):
+    day = forms.ChoiceField(choices=timegrid.day_choices)
+    first_slot = forms.ChoiceField(choices=timegrid.slot_choices, label="From slot")
+    last_slot = forms.ChoiceField(choices=timegrid.slot_choices, label="To slot")
+    min_capacity = forms.IntegerField(min_value=0, required=False, label="Seats at least")
+    include_unavailable = forms.BooleanField(required=False, label="Include unavailable rooms")
@@ -0,0 +1,153 @@
+"""
+Cached timetable grids for students and teachers.
+
+A grid maps day -> slot letter -> ``Schedule`` (with its course, classroom
+and timeslot already loaded). Grids are cached per student/teacher under a
+global timetable version; any change to courses, schedules or the entities
+they depend on bumps the version (see ``signals``), so stale grids are never
+read and simply expire. Changes only one student sees (their batch, their
+electives) drop just that student's grid. A missing version is seeded from the clock rather
+than 1, so a flushed or restarted cache never repeats an earlier version
+(the in-memory occupancy index relies on that). The version lives in the
+default cache, so with several worker processes that cache must be shared
+(``CACHES``; the ``timetable.E001`` check enforces it), or a worker would
+serve a grid another worker already replaced.
+
+The ``a``-prefixed functions are the same lookups for async views, using
+the async cache and ORM APIs.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from . import timegrid
+from .metrics import TIMETABLE_CACHE
+from .models import Schedule
+
+VERSION_KEY = 'timetable:version'
+CACHE_TIMEOUT = 60 * 60
+
+
+def _initial_version():
+    return time.time_ns() // 1000
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        initial = _initial_version()
+        cache.add(VERSION_KEY, initial, timeout=None)
+        version = cache.get(VERSION_KEY, initial)
+    return version
+
+
+async def acurrent_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        initial = _initial_version()
+        await cache.aadd(VERSION_KEY, initial, timeout=None)
+        version = await cache.aget(VERSION_KEY, initial)
+    return version
+
+
+def invalidate():
+    """Make every cached grid stale. Call after bulk changes that skip signals."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, _initial_version(), timeout=None)
+
+
+def forget_student(student_id):
+    """
+    Drop one student's cached grid, for changes only that student sees
+    (elective registration), without making every other grid stale.
+    """
+    cache.delete(_grid_key('student', student_id, current_version()))
+
+
+def days_of_week():
+    return list(timegrid.get_grid().days)
+
+
+def time_slot_labels():
+    """Return ``{slot code: "HH:MM - HH:MM"}`` in time order, from the configured grid."""
+    return timegrid.get_grid().labels()
+
+
+async def atime_slot_labels():
+    return time_slot_labels()
+
+
+def build_grid(schedules):
+    grid = {day: {} for day in days_of_week()}
+    for schedule in schedules:
+        grid.setdefault(schedule.timeslot.day, {})[schedule.timeslot.slot] = schedule
+    return grid
+
+
+def _grid_key(kind, owner_id, version):
+    return f"timetable:{kind}:{owner_id}:v{version}"
+
+
+def _cached_grid(kind, owner_id, schedules):
+    key = _grid_key(kind, owner_id, current_version())
+    grid = cache.get(key)
+    if grid is not None:
+        TIMETABLE_CACHE.inc(kind=kind, result='hit')
+        return grid
+
+    TIMETABLE_CACHE.inc(kind=kind, result='miss')
+    grid = build_grid(schedules)
+    cache.set(key, grid, CACHE_TIMEOUT)
+    return grid
+
+
+async def _acached_grid(kind, owner_id, schedules):
+    key = _grid_key(kind, owner_id, await acurrent_version())
+    grid = await cache.aget(key)
+    if grid is not None:
+        TIMETABLE_CACHE.inc(kind=kind, result='hit')
+        return grid
+
+    TIMETABLE_CACHE.inc(kind=kind, result='miss')
+    grid = build_grid([schedule async for schedule in schedules])
+    await cache.aset(key, grid, CACHE_TIMEOUT)
+    return grid
+
+
+def student_schedules(student):
+    """Schedules of the student's core (batch) and elective courses."""
+    return (
+        Schedule.objects
+        .filter(Q(course__batches=student.batch_id) | Q(course__elective_students=student))
+        .select_related('course', 'classroom', 'timeslot')
+        .distinct()
+    )
+
+
+def teacher_schedules(teacher):
+    return (
+        Schedule.objects
+        .filter(course__teacher=teacher)
+        .select_related('course', 'classroom', 'timeslot')
+        .prefetch_related('course__batches__department')
+    )
+
+
+def student_grid(student):
+    # The queryset is lazy, so a cache hit never touches the database
+    return _cached_grid('student', student.pk, student_schedules(student))
+
+
+def teacher_grid(teacher):
+    return _cached_grid('teacher', teacher.pk, teacher_schedules(teacher))
+
+
+async def astudent_grid(student):
+    return await _acached_grid('student', student.pk, student_schedules(student))
+
+
+async def ateacher_grid(teacher):
+    return await _acached_grid('teacher', teacher.pk, teacher_schedules(teacher))
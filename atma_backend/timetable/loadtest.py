@@ -0,0 +1,168 @@
+"""
+Virtual users for the ``loadtest`` management command.
+
+Each virtual user runs in its own thread with its own cookie jar and keeps
+repeating its flow against a running server until the time or iteration
+limit is reached:
+
+- students: login -> ``view_timetable`` -> ``course_detail``
+- HODs: login -> ``manage_courses`` -> ``schedule_course``
+
+Every HTTP request is recorded as a sample; ``summarize()`` turns the
+samples into per-endpoint throughput, latency percentiles and error rates.
+"""
+import math
+import random
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.urls import reverse
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    # Time each request on its own instead of following redirects
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class VirtualUser:
+    """One simulated browser session."""
+
+    def __init__(self, base_url, username, password, course_ids, timeout=30, think_time=0.0, rng=None):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.course_ids = course_ids
+        self.timeout = timeout
+        self.think_time = think_time
+        self.rng = rng or random.Random()
+        self.samples = []
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def request(self, endpoint, path, data=None, expect=200):
+        """Issue one request and record ``(endpoint, seconds, ok, status)``."""
+        body = urlencode(data).encode() if data is not None else None
+        request = Request(self.base_url + path, data=body)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except HTTPError as e:
+            status = e.code  # Also raised for the redirects we do not follow
+        except (URLError, OSError):
+            status = 0
+        self.samples.append((endpoint, time.perf_counter() - start, status == expect, status))
+        if self.think_time:
+            time.sleep(self.think_time)
+        return status
+
+    def login(self):
+        self.cookies.clear()
+        self.request('login_page', reverse('login'))
+        csrf_token = next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+        status = self.request('login', reverse('login'), {
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': csrf_token,
+        }, expect=302)
+        return status == 302
+
+    def run_flow(self):
+        raise NotImplementedError
+
+
+class StudentUser(VirtualUser):
+    def run_flow(self):
+        if not self.login():
+            return
+        self.request('view_timetable', reverse('view_timetable'))
+        if self.course_ids:
+            course_id = self.rng.choice(self.course_ids)
+            self.request('course_detail', reverse('course_detail', args=[course_id]))
+
+
+class HodUser(VirtualUser):
+    def run_flow(self):
+        if not self.login():
+            return
+        self.request('manage_courses', reverse('hod-manage-courses'))
+        if self.course_ids:
+            course_id = self.rng.choice(self.course_ids)
+            self.request('schedule_course', reverse('hod-schedule-course', args=[course_id]), expect=302)
+
+
+def run(virtual_users, duration=None, iterations=None):
+    """
+    Run every virtual user in its own thread, stopping after ``iterations``
+    flows per user or after ``duration`` seconds. Returns the samples and
+    the elapsed wall time.
+    """
+    deadline = time.monotonic() + duration if duration else None
+
+    def loop(user):
+        done = 0
+        while (iterations is None or done < iterations) and (deadline is None or time.monotonic() < deadline):
+            user.run_flow()
+            done += 1
+
+    threads = [threading.Thread(target=loop, args=(user,), daemon=True) for user in virtual_users]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = [sample for user in virtual_users for sample in user.samples]
+    return samples, elapsed
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _stats(samples, elapsed):
+    latencies = sorted(seconds * 1000 for _, seconds, _, _ in samples)
+    errors = sum(1 for _, _, ok, _ in samples if not ok)
+    status_codes = {}
+    for _, _, _, status in samples:
+        status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        },
+        'status_codes': status_codes,
+    }
+
+
+def summarize(samples, elapsed):
+    """Aggregate samples overall and per endpoint."""
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'overall': _stats(samples, elapsed),
+        'endpoints': {
+            endpoint: _stats(endpoint_samples, elapsed)
+            for endpoint, endpoint_samples in sorted(by_endpoint.items())
+        },
+    }
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from timetable import allocation
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-assign the classrooms of every placed session across all departments in one "
+        "joint assignment per timeslot, with per-department fairness quotas for too small "
+        "or far-away rooms. Prints a JSON report; nothing is written without --apply."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help="Write the new rooms (default: report only)")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+        parser.add_argument('--indent', type=int, default=None, help="Pretty-print the JSON report")
+
+    def handle(self, *args, **options):
+        report = allocation.allocate(apply=options['apply'])
+        output = json.dumps(report, indent=options['indent'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
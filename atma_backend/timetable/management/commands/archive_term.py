@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from timetable.models import Term
+from timetable.terms import archive_term
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the courses and schedules of a closed term into the archive tables "
+        "so that timetable queries only touch live terms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', help="Code of the term to archive")
+        parser.add_argument(
+            '--close', action='store_true',
+            help="Mark the term closed first if it is not already",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            term = Term.objects.get(code=options['term'])
+        except Term.DoesNotExist:
+            raise CommandError(f"Unknown term '{options['term']}'.")
+
+        if term.is_active:
+            raise CommandError("The active term cannot be archived.")
+        if not term.is_closed:
+            if not options['close']:
+                raise CommandError(f"Term {term.code} is not closed. Pass --close to close it first.")
+            term.is_closed = True
+            term.save(update_fields=['is_closed'])
+
+        courses, schedules = archive_term(term)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {courses} courses and {schedules} schedules from term {term.code}."
+        ))
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from timetable.audit import CHECKS, run_audit
+
+
+class Command(BaseCommand):
+    help = (
+        "Audit the whole timetable for double-booked rooms, teacher, batch and "
+        "elective clashes and print a JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='append', choices=sorted(CHECKS), dest='checks',
+            help="Only run the given check (may be repeated)",
+        )
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+        parser.add_argument('--indent', type=int, default=None, help="Pretty-print the JSON report")
+        parser.add_argument(
+            '--fail-on-violation', action='store_true',
+            help="Exit with a non-zero status when any violation is found",
+        )
+
+    def handle(self, *args, **options):
+        report = run_audit(options['checks'])
+        output = json.dumps(report, indent=options['indent'], default=str)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if options['fail_on_violation'] and report['total_violations']:
+            raise CommandError(f"{report['total_violations']} timetable violations found.")
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from timetable import regbench, synthetic
+from timetable.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic institution, open its courses as electives with fewer seats than "
+        "demand and let every student register concurrently. Reports registrations per "
+        "second, latency percentiles and outcome counts as JSON, and checks for overselling."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16, help="Registering threads (default: 16)")
+        parser.add_argument('--size', choices=sorted(synthetic.SIZES), default='medium', help="Synthetic data size")
+        parser.add_argument('--prefix', default='regbench', help="Prefix of the synthetic data")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed")
+        parser.add_argument('--keep-data', action='store_true', help="Do not delete the seeded data afterwards")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+        parser.add_argument('--indent', type=int, default=None, help="Pretty-print the JSON report")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("The benchmark needs a database shared between threads, not in-memory SQLite.")
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Synthetic data with prefix '{prefix}' already exists; pick another --prefix.")
+
+        try:
+            plan = regbench.prepare(prefix, size=options['size'], seed=options['seed'])
+            self.stderr.write(f"Registering {len(plan)} students from {options['concurrency']} threads...")
+            samples, elapsed = regbench.run(plan, options['concurrency'])
+            report = {
+                'config': {
+                    'students': len(plan),
+                    'concurrency': options['concurrency'],
+                    'size': options['size'],
+                    'database': connection.vendor,
+                },
+                **regbench.summarize(samples, elapsed),
+                'oversold': regbench.oversold(prefix),
+            }
+        finally:
+            if not options['keep_data']:
+                synthetic.remove(prefix)
+
+        output = json.dumps(report, indent=options['indent'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+        if report['oversold']:
+            raise CommandError("Seats were oversold or the seat counters drifted.")
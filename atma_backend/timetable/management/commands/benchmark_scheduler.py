@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from timetable import schedbench, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Schedule a synthetic institution course by course on growing time grids "
+        "(days x slots per day) and report per-phase timings, queries per run and "
+        "scaling against the smallest grid as JSON. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grids', default='5x8,6x10,6x12', help="Comma-separated DAYSxSLOTS grids (default: 5x8,6x10,6x12)")
+        parser.add_argument('--size', choices=sorted(synthetic.SIZES), default='small', help="Synthetic data size")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+        parser.add_argument('--indent', type=int, default=None, help="Pretty-print the JSON report")
+
+    def handle(self, *args, **options):
+        try:
+            grid_sizes = [schedbench.parse_grid(value) for value in options['grids'].split(',')]
+            for days, slots in grid_sizes:
+                schedbench.grid_config(days, slots)
+        except ValueError as e:
+            raise CommandError(f"Invalid --grids: {e}")
+
+        report = schedbench.run(grid_sizes, size=options['size'], seed=options['seed'])
+
+        output = json.dumps(report, indent=options['indent'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
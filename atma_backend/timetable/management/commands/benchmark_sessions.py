@@ -0,0 +1,36 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from timetable import sessionbench, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the main student, teacher and HOD flows once per session profile "
+        "(ATMA_SESSION_PROFILES) and report queries, database writes and "
+        "django_session reads and writes per request as JSON. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='db,cached', help="Comma-separated session profiles (default: db,cached)")
+        parser.add_argument('--size', choices=sorted(synthetic.SIZES), default='small', help="Synthetic data size")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+        parser.add_argument('--indent', type=int, default=None, help="Pretty-print the JSON report")
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'].split(',')
+        unknown = sorted(set(profiles) - set(settings.ATMA_SESSION_PROFILES))
+        if unknown:
+            raise CommandError(f"Unknown session profile(s): {', '.join(unknown)}.")
+
+        report = sessionbench.run(profiles, size=options['size'], seed=options['seed'])
+
+        output = json.dumps(report, indent=options['indent'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from timetable import loadtest, stackbench, synthetic
+from timetable.models import User, Course
+
+BACKEND = 'timetable.authz.DepartmentModelBackend'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the read-heavy pages (timetables and course details) "
+        "on the sync WSGI stack with sync views against the ASGI stack with async views, "
+        "at high concurrency. Each stack runs in its own process; the report is JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per stack (default: 2000)")
+        parser.add_argument('--concurrency', type=int, default=100, help="Requests in flight (default: 100)")
+        parser.add_argument('--stack', choices=['wsgi', 'asgi', 'both'], default='both', help="Stack(s) to run")
+        parser.add_argument('--size', choices=sorted(synthetic.SIZES), default='small', help="Synthetic data size")
+        parser.add_argument('--prefix', default='bench', help="Prefix of the synthetic data")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed")
+        parser.add_argument('--keep-data', action='store_true', help="Do not delete the seeded data afterwards")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+        parser.add_argument('--indent', type=int, default=None, help="Pretty-print the JSON report")
+        # Internal: run one stack on a prepared plan in this process
+        parser.add_argument('--worker', choices=sorted(stackbench.RUNNERS), help=argparse.SUPPRESS)
+        parser.add_argument('--plan', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.run_worker(options)
+
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("The benchmark needs a database shared between processes, not in-memory SQLite.")
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Synthetic data with prefix '{options['prefix']}' already exists; pick another --prefix.")
+
+        synthetic.generate(prefix=options['prefix'], size=options['size'], seed=options['seed'])
+        session_keys = []
+        try:
+            plan = self.build_plan(options, session_keys)
+            report = {
+                'config': {
+                    'requests': len(plan),
+                    'concurrency': options['concurrency'],
+                    'size': options['size'],
+                    'database': connection.vendor,
+                    'debug': settings.DEBUG,
+                },
+            }
+            stacks = ['wsgi', 'asgi'] if options['stack'] == 'both' else [options['stack']]
+            for stack in stacks:
+                report[stack] = self.run_stack(stack, plan, options['concurrency'])
+        finally:
+            Session.objects.filter(session_key__in=session_keys).delete()
+            if not options['keep_data']:
+                synthetic.remove(options['prefix'])
+
+        if 'wsgi' in report and 'asgi' in report:
+            wsgi_rps = report['wsgi']['overall']['throughput_rps']
+            report['asgi_speedup'] = round(report['asgi']['overall']['throughput_rps'] / wsgi_rps, 2) if wsgi_rps else None
+
+        output = json.dumps(report, indent=options['indent'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def build_plan(self, options, session_keys):
+        """Log in synthetic students and teachers and list the requests to send."""
+        prefix = options['prefix']
+        rng = random.Random(options['seed'])
+        users = list(User.objects.filter(username__startswith=f"{prefix}_").exclude(role='admin'))
+        cookies = {user.pk: self.login_cookie(user, session_keys) for user in rng.sample(users, min(50, len(users)))}
+        students = [user for user in users if user.pk in cookies and user.role == 'student']
+        teachers = [user for user in users if user.pk in cookies and user.role == 'teacher']
+        courses = list(Course.objects.filter(department__code__startswith=prefix.upper()).values_list('pk', 'teacher_id'))
+        courses_by_teacher = {}
+        for course_id, teacher_id in courses:
+            courses_by_teacher.setdefault(teacher_id, []).append(course_id)
+
+        plan = []
+        while len(plan) < options['requests']:
+            if students and (not teachers or rng.random() < 0.8):
+                user = rng.choice(students)
+                if rng.random() < 0.5:
+                    plan.append(('view_timetable', reverse('view_timetable'), cookies[user.pk]))
+                else:
+                    course_id = rng.choice(courses)[0]
+                    plan.append(('course_detail', reverse('course_detail', args=[course_id]), cookies[user.pk]))
+            else:
+                user = rng.choice(teachers)
+                own = courses_by_teacher.get(user.pk)
+                if own and rng.random() < 0.5:
+                    path = reverse('teacher_course_detail', args=[rng.choice(own)])
+                    plan.append(('teacher_course_detail', path, cookies[user.pk]))
+                else:
+                    plan.append(('teacher_timetable', reverse('teacher_timetable'), cookies[user.pk]))
+        return plan
+
+    def login_cookie(self, user, session_keys):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = BACKEND
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        session_keys.append(session.session_key)
+        return f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+    def run_stack(self, stack, plan, concurrency):
+        """Run one stack in a fresh process, with async views only for ASGI."""
+        fd, plan_path = tempfile.mkstemp(suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(plan, f)
+            env = {**os.environ, 'ATMA_ASYNC_VIEWS': '1' if stack == 'asgi' else '0'}
+            command = [
+                sys.executable, sys.argv[0], 'benchmark_stacks',
+                '--worker', stack, '--plan', plan_path, '--concurrency', str(concurrency),
+            ]
+            self.stderr.write(f"Running {len(plan)} requests on the {stack.upper()} stack...")
+            result = subprocess.run(command, env=env, capture_output=True, text=True)
+        finally:
+            os.remove(plan_path)
+        if result.returncode:
+            raise CommandError(f"The {stack} run failed:\n{result.stderr}")
+        return json.loads(result.stdout)
+
+    def run_worker(self, options):
+        with open(options['plan']) as f:
+            plan = [tuple(item) for item in json.load(f)]
+        samples, elapsed = stackbench.RUNNERS[options['worker']](plan, options['concurrency'])
+        report = loadtest.summarize(samples, elapsed)
+        report['async_views'] = settings.ATMA_ASYNC_VIEWS
+        self.stdout.write(json.dumps(report))
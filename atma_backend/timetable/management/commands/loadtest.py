@@ -0,0 +1,157 @@
+import json
+import random
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+
+from timetable import loadtest, synthetic
+from timetable.models import User, Department, Course
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic institution and drive concurrent virtual users through the "
+        "student (login, timetable, course detail) and HOD (manage courses, schedule "
+        "course) flows, then print throughput, latency percentiles and error rates per "
+        "endpoint as JSON. Note that the HOD flow schedules courses, i.e. it writes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help="Base URL of a running server using this database "
+                 "(default: start a threaded server in this process)",
+        )
+        parser.add_argument('--users', type=int, default=10, help="Number of concurrent virtual users")
+        parser.add_argument(
+            '--hod-share', type=float, default=0.2,
+            help="Fraction of virtual users running the HOD flow (default: 0.2)",
+        )
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run (default: 30)")
+        parser.add_argument(
+            '--iterations', type=int, default=None,
+            help="Flows per virtual user; overrides --duration",
+        )
+        parser.add_argument('--think-time', type=float, default=0.0, help="Seconds to pause after each request")
+        parser.add_argument('--size', choices=sorted(synthetic.SIZES), default='small', help="Synthetic data size")
+        parser.add_argument('--prefix', default='loadtest', help="Prefix of the synthetic data")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for data and user behaviour")
+        parser.add_argument(
+            '--no-seed', action='store_true',
+            help="Reuse synthetic data created earlier with the same --prefix",
+        )
+        parser.add_argument('--keep-data', action='store_true', help="Do not delete the seeded data afterwards")
+        parser.add_argument('--password', default=synthetic.DEFAULT_PASSWORD, help="Password of the synthetic users")
+        parser.add_argument('--output', help="Write the report to this file instead of stdout")
+        parser.add_argument('--indent', type=int, default=None, help="Pretty-print the JSON report")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['users'] < 1:
+            raise CommandError("--users must be at least 1.")
+
+        seeded = False
+        if not options['no_seed']:
+            if User.objects.filter(username__startswith=f"{prefix}_").exists():
+                raise CommandError(
+                    f"Synthetic data with prefix '{prefix}' already exists; "
+                    "use --no-seed to reuse it or pick another --prefix."
+                )
+            summary = synthetic.generate(
+                prefix=prefix, size=options['size'], seed=options['seed'], password=options['password'],
+            )
+            seeded = True
+            self.stderr.write(
+                f"Seeded {len(summary['students'])} students, {len(summary['teachers'])} teachers, "
+                f"{len(summary['courses'])} courses and {summary['schedules']} sessions."
+            )
+
+        server = None
+        try:
+            base_url = options['url']
+            if not base_url:
+                server = self.start_server()
+                base_url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+            virtual_users = self.build_users(base_url, options)
+            samples, elapsed = loadtest.run(
+                virtual_users,
+                duration=None if options['iterations'] else options['duration'],
+                iterations=options['iterations'],
+            )
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            if seeded and not options['keep_data']:
+                synthetic.remove(prefix)
+
+        report = {
+            'config': {
+                'url': options['url'] or 'in-process',
+                'users': options['users'],
+                'hod_users': sum(isinstance(user, loadtest.HodUser) for user in virtual_users),
+                'duration_s': None if options['iterations'] else options['duration'],
+                'iterations': options['iterations'],
+                'think_time_s': options['think_time'],
+                'size': options['size'],
+            },
+            **loadtest.summarize(samples, elapsed),
+        }
+        output = json.dumps(report, indent=options['indent'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def start_server(self):
+        """Serve the project from a background thread on a free local port."""
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def build_users(self, base_url, options):
+        prefix = options['prefix']
+        tag = prefix.upper()
+        rng = random.Random(options['seed'])
+
+        students = list(
+            User.objects.filter(username__startswith=f"{prefix}_", student_profile__isnull=False)
+            .values_list('username', flat=True)
+        )
+        departments = Department.objects.filter(code__startswith=tag, hod__isnull=False).select_related('hod')
+        hods = {department.hod.username: department.pk for department in departments}
+        courses = list(
+            Course.objects.filter(department__code__startswith=tag).values_list('pk', 'department_id')
+        )
+        if not students or not hods:
+            raise CommandError(f"No synthetic students or HODs found with prefix '{prefix}'.")
+
+        all_course_ids = [pk for pk, _ in courses]
+        hod_count = round(options['users'] * options['hod_share'])
+        hod_names = sorted(hods)
+
+        users = []
+        for i in range(options['users']):
+            common = {
+                'password': options['password'],
+                'think_time': options['think_time'],
+                'rng': random.Random(rng.random()),
+            }
+            if i < hod_count:
+                username = hod_names[i % len(hod_names)]
+                department_courses = [pk for pk, department_id in courses if department_id == hods[username]]
+                users.append(loadtest.HodUser(base_url, username, course_ids=department_courses, **common))
+            else:
+                username = rng.choice(students)
+                users.append(loadtest.StudentUser(base_url, username, course_ids=all_course_ids, **common))
+        return users
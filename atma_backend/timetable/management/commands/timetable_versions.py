@@ -0,0 +1,92 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from timetable.models import Department, Term, TimetableVersion
+from timetable import versions
+
+
+class Command(BaseCommand):
+    help = "Snapshot, list, restore, diff and copy forward named timetable versions."
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        snapshot = subparsers.add_parser('snapshot', help="Save the live timetable as a version")
+        snapshot.add_argument('term')
+        snapshot.add_argument('name')
+
+        listing = subparsers.add_parser('list', help="List stored versions")
+        listing.add_argument('--term')
+
+        restore = subparsers.add_parser('restore', help="Replace the live timetable with a version")
+        restore.add_argument('term')
+        restore.add_argument('name')
+        restore.add_argument('--department', help="Only restore this department (by code)")
+
+        diff = subparsers.add_parser('diff', help="Show sessions moved, added or removed between versions")
+        diff.add_argument('term')
+        diff.add_argument('name')
+        diff.add_argument('other', nargs='?', help="Version to compare with (default: live timetable)")
+
+        copy = subparsers.add_parser('copy-forward', help="Seed a new term with a copy of a version")
+        copy.add_argument('term')
+        copy.add_argument('name')
+        copy.add_argument('new_term')
+
+    def find_term(self, code):
+        try:
+            return Term.objects.get(code=code)
+        except Term.DoesNotExist:
+            raise CommandError(f"Unknown term '{code}'.")
+
+    def find_version(self, term, name):
+        try:
+            return TimetableVersion.objects.select_related('term').get(term__code=term, name=name)
+        except TimetableVersion.DoesNotExist:
+            raise CommandError(f"No version '{name}' in term {term}.")
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'snapshot':
+            term = self.find_term(options['term'])
+            if TimetableVersion.objects.filter(term=term, name=options['name']).exists():
+                raise CommandError(f"Version '{options['name']}' already exists in term {term.code}.")
+            version = versions.create_snapshot(options['name'], term)
+            self.stdout.write(self.style.SUCCESS(f"Saved {version}."))
+
+        elif action == 'list':
+            stored = TimetableVersion.objects.defer('data').select_related('term')
+            if options['term']:
+                stored = stored.filter(term__code=options['term'])
+            for version in stored:
+                self.stdout.write(f"{version.created_at:%Y-%m-%d %H:%M}  {version}")
+
+        elif action == 'restore':
+            version = self.find_version(options['term'], options['name'])
+            department = None
+            if options['department']:
+                department = Department.objects.filter(code=options['department']).first()
+                if department is None:
+                    raise CommandError(f"Unknown department code '{options['department']}'.")
+            restored, skipped = versions.restore_snapshot(version, department=department)
+            self.stdout.write(self.style.SUCCESS(
+                f"Restored {restored} sessions from {version} "
+                f"({len(skipped)} skipped: their course, timeslot or classroom no longer exists)."
+            ))
+            for course_id, timeslot_id, classroom_id in skipped:
+                self.stdout.write(f"  skipped course {course_id}, timeslot {timeslot_id}, classroom {classroom_id}")
+
+        elif action == 'diff':
+            version = self.find_version(options['term'], options['name'])
+            other = self.find_version(options['term'], options['other']) if options['other'] else None
+            self.stdout.write(json.dumps(versions.diff_versions(version, other), indent=2))
+
+        elif action == 'copy-forward':
+            version = self.find_version(options['term'], options['name'])
+            new_term = self.find_term(options['new_term'])
+            if TimetableVersion.objects.filter(term=new_term, name=version.name).exists():
+                raise CommandError(f"Version '{version.name}' already exists in term {new_term.code}.")
+            copy = versions.copy_forward(version, new_term)
+            self.stdout.write(self.style.SUCCESS(f"Copied to {copy}."))
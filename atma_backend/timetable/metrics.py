@@ -0,0 +1,245 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms live in a module-level registry and are rendered by
+the ``/metrics`` view. With ``ATMA_METRICS['MULTIPROCESS_DIR']`` set, every
+worker process periodically writes its values to its own JSON file in that
+directory and a scrape sums the files of all workers, so any worker can
+answer for the whole deployment.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """Return the values of every metric in a JSON-friendly form."""
+        with self.lock:
+            return {
+                name: {
+                    'type': metric.type,
+                    'help': metric.documentation,
+                    'labelnames': list(metric.labelnames),
+                    'buckets': list(getattr(metric, 'buckets', ())),
+                    'samples': [[list(labels), value] for labels, value in metric.values.items()],
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+
+REGISTRY = Registry()
+
+
+def _config():
+    return getattr(settings, 'ATMA_METRICS', {})
+
+
+def _multiprocess_dir():
+    directory = _config().get('MULTIPROCESS_DIR')
+    return Path(directory) if directory else None
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.registry = registry
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        maybe_flush()
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            # [count per bucket..., count above the last bucket, sum]
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+        maybe_flush()
+
+    def count(self, **labels):
+        state = self.values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+
+
+# -----------------------------------------------------------------------------
+# Application metrics
+# -----------------------------------------------------------------------------
+REQUEST_LATENCY = Histogram(
+    'atma_request_duration_seconds', "Request latency by URL name.", ['url_name', 'method'],
+)
+REQUEST_QUERIES = Counter(
+    'atma_db_queries_total', "Database queries executed, by URL name.", ['url_name'],
+)
+TIMETABLE_CACHE = Counter(
+    'atma_timetable_cache_requests_total', "Timetable grid cache lookups.", ['kind', 'result'],
+)
+SCHEDULER_DURATION = Histogram(
+    'atma_scheduler_run_duration_seconds', "Duration of scheduling runs.",
+)
+SCHEDULER_PLACEMENTS = Counter(
+    'atma_scheduler_placements_total', "Sessions placed by the scheduler.",
+)
+SCHEDULER_FAILURES = Counter(
+    'atma_scheduler_failures_total', "Sessions the scheduler could not place, by reason.", ['reason'],
+)
+USERNAME_CHECKS = Counter(
+    'atma_username_checks_total', "Signup username checks by outcome: answered by the Bloom filter, "
+    "by the database, or rejected by the rate limit.", ['result'],
+)
+
+
+# -----------------------------------------------------------------------------
+# Multiprocess mode
+# -----------------------------------------------------------------------------
+def flush(registry=REGISTRY):
+    """Write this process's values to its file in the multiprocess directory."""
+    directory = _multiprocess_dir()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"metrics_{os.getpid()}.json"
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(registry.snapshot()))
+    os.replace(tmp_path, path)  # Atomic, so readers never see half a file
+    registry.last_flush = time.monotonic()
+
+
+def maybe_flush(registry=REGISTRY):
+    """Flush at most once per ``FLUSH_INTERVAL`` seconds."""
+    if _multiprocess_dir() is None:
+        return
+    if time.monotonic() - registry.last_flush >= _config().get('FLUSH_INTERVAL', 1.0):
+        flush(registry)
+
+
+atexit.register(lambda: flush() if settings.configured else None)
+
+
+def collect(registry=REGISTRY):
+    """
+    Return the metrics to expose: this process's values, or in multiprocess
+    mode the sum over every worker's file.
+    """
+    directory = _multiprocess_dir()
+    if directory is None:
+        return registry.snapshot()
+
+    flush(registry)
+    merged = {}
+    for path in directory.glob('metrics_*.json'):
+        try:
+            snapshot = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # A worker is replacing its file right now
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'samples': {}})
+            for labels, value in metric['samples']:
+                key = tuple(labels)
+                if key not in target['samples']:
+                    target['samples'][key] = value
+                elif isinstance(value, list):
+                    target['samples'][key] = [a + b for a, b in zip(target['samples'][key], value)]
+                else:
+                    target['samples'][key] += value
+
+    for metric in merged.values():
+        metric['samples'] = [[list(labels), value] for labels, value in metric['samples'].items()]
+    return merged
+
+
+# -----------------------------------------------------------------------------
+# Text exposition
+# -----------------------------------------------------------------------------
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def render(metrics=None):
+    """Render collected metrics in the Prometheus text format (version 0.0.4)."""
+    metrics = collect() if metrics is None else metrics
+    lines = []
+    for name in sorted(metrics):
+        metric = metrics[name]
+        names = metric['labelnames']
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['samples']):
+            if metric['type'] == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric['buckets'] + [math.inf], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(names, labels, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(names, labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(names, labels)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(names, labels)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,267 @@
+"""
+Request instrumentation middleware.
+
+``RequestMetricsMiddleware`` records per request the number of queries, the
+time spent in the database, the time spent rendering templates and the wall
+time. It reports them as a ``Server-Timing`` header and a structured log line,
+and checks per-URL-name query budgets.
+
+``ProfilingMiddleware`` runs a single request under cProfile when a staff
+user asks for it and stores the capture for the admin.
+
+``MetricsMiddleware`` feeds request latency and query counts per URL name
+into the Prometheus metrics served at ``/metrics``.
+
+All of them remove themselves from the chain at startup when disabled in settings,
+so they cost nothing.
+"""
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+import warnings
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger('timetable.requests')
+
+_current_stats = contextvars.ContextVar('atma_request_stats', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a view goes over its budget and the action is 'raise'."""
+
+
+class QueryBudgetWarning(UserWarning):
+    """Issued when a view goes over its budget and the action is 'warn'."""
+
+
+class RequestStats:
+    """Counters collected while a single request is being handled."""
+    __slots__ = ('queries', 'db_time', 'template_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def current_stats():
+    """Return the stats of the request being handled, or None."""
+    return _current_stats.get()
+
+
+def record_template_time(seconds):
+    """Add template rendering time to the current request, if any."""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.template_time += seconds
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        config = getattr(settings, 'ATMA_REQUEST_METRICS', {})
+        if not config.get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budgets = config.get('BUDGETS', {})
+        self.on_exceeded = config.get('ON_BUDGET_EXCEEDED', 'warn')
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        total_time = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f'tpl;dur={stats.template_time * 1000:.2f}',
+            f'total;dur={total_time * 1000:.2f}',
+        ])
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+        }))
+
+        self.check_budget(url_name, stats, total_time)
+        return response
+
+    def check_budget(self, url_name, stats, total_time):
+        """Compare the request with its budget and warn or raise if exceeded."""
+        budget = self.budgets.get(url_name)
+        if budget is None:
+            return
+        if isinstance(budget, int):
+            budget = {'queries': budget}
+
+        measured = {
+            'queries': stats.queries,
+            'db_ms': stats.db_time * 1000,
+            'total_ms': total_time * 1000,
+        }
+        exceeded = [
+            f"{key} {measured[key]:.0f} > {limit}"
+            for key, limit in budget.items()
+            if key in measured and measured[key] > limit
+        ]
+        if not exceeded:
+            return
+
+        message = f"Budget exceeded for '{url_name}': {', '.join(exceeded)}"
+        if self.on_exceeded == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        warnings.warn(message, QueryBudgetWarning)
+
+
+class ProfilingMiddleware:
+    """
+    Profile one request with cProfile when a staff user sends the configured
+    header (``X-Profile: 1``) or query parameter (``?_profile=1``).
+
+    The ``.prof`` file and a top-N text summary are written to
+    ``ATMA_PROFILING['DIR']`` and recorded as a ``ProfileCapture`` listed in
+    the admin. Requests from anyone else are left untouched, and so are
+    async views: ``runcall`` would only time the creation of their coroutine.
+    Keep this last in ``MIDDLEWARE`` so every other ``process_view`` hook has
+    already run.
+    """
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'ATMA_PROFILING', {})
+        if not config.get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = Path(config.get('DIR', 'profiles'))
+        self.top_n = config.get('TOP_N', 30)
+        self.header = 'HTTP_' + config.get('HEADER', 'X-Profile').upper().replace('-', '_')
+        self.query_param = config.get('QUERY_PARAM', '_profile')
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def wants_profile(self, request):
+        if not (request.META.get(self.header) or request.GET.get(self.query_param)):
+            return False
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated and user.is_staff)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func) or not self.wants_profile(request):
+            return None
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            capture = self.save_capture(request, profiler, duration)
+        response['X-Profile-Capture'] = str(capture.pk)
+        return response
+
+    def save_capture(self, request, profiler, duration):
+        """Write the .prof and summary files and record the capture."""
+        from .models import ProfileCapture
+
+        url_name = request.resolver_match.view_name if request.resolver_match else ''
+        stem = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{url_name or 'request'}-{request.user.pk}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        prof_path = self.directory / f"{stem}.prof"
+        profiler.dump_stats(prof_path)
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(self.top_n)
+        summary = stream.getvalue()
+        (self.directory / f"{stem}.txt").write_text(summary)
+
+        return ProfileCapture.objects.create(
+            user=request.user,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            url_name=url_name,
+            duration_ms=duration * 1000,
+            prof_file=str(prof_path),
+            summary=summary,
+        )
+
+
+class MetricsMiddleware:
+    """
+    Record latency and query count per URL name for ``/metrics``.
+
+    Works on both stacks so async views stay async under ASGI. There, ORM
+    calls run in worker threads whose connections are not wrapped, so only
+    latency is recorded for async requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ATMA_METRICS', {}).get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        self.record(request, time.perf_counter() - start, stats.queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, time.perf_counter() - start)
+        return response
+
+    def record(self, request, duration, queries=None):
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.view_name if match else None) or 'unresolved'
+        metrics.REQUEST_LATENCY.observe(duration, url_name=url_name, method=request.method)
+        if queries is not None:
+            metrics.REQUEST_QUERIES.inc(queries, url_name=url_name)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0002_alter_batch_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='num_years',
+            field=models.PositiveSmallIntegerField(default=4),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_default_term(apps, schema_editor):
+    """Put every existing course and schedule into an active default term."""
+    Term = apps.get_model('timetable', 'Term')
+    Course = apps.get_model('timetable', 'Course')
+    Schedule = apps.get_model('timetable', 'Schedule')
+
+    if not Course.objects.exists():
+        return
+    term, _ = Term.objects.get_or_create(code='DEFAULT', defaults={'is_active': True})
+    Course.objects.filter(term__isnull=True).update(term=term)
+    Schedule.objects.filter(term__isnull=True).update(term=term)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0004_timetableversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='code',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ArchivedCourse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.CharField(max_length=10)),
+                ('credits', models.IntegerField()),
+                ('batch_ids', models.JSONField(default=list)),
+                ('elective_student_ids', models.JSONField(default=list)),
+                ('department', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_courses', to='timetable.department')),
+                ('teacher', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_courses_taught', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Term',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('is_active', models.BooleanField(default=False)),
+                ('is_closed', models.BooleanField(default=False)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_term')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.CharField(max_length=10)),
+                ('slot', models.CharField(max_length=1)),
+                ('classroom_name', models.CharField(max_length=100)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='timetable.archivedcourse')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_schedules', to='timetable.term')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedcourse',
+            name='term',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_courses', to='timetable.term'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='term',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='courses', to='timetable.term'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='term',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='schedules', to='timetable.term'),
+        ),
+        migrations.RunPython(assign_default_term, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='course',
+            name='term',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='courses', to='timetable.term'),
+        ),
+        migrations.AlterField(
+            model_name='schedule',
+            name='term',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='schedules', to='timetable.term'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['term', 'department'], name='course_term_department_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['term', 'teacher'], name='course_term_teacher_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['term', 'timeslot', 'classroom'], name='schedule_term_slot_room_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['term', 'course'], name='schedule_term_course_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='course',
+            constraint=models.UniqueConstraint(fields=('term', 'code'), name='unique_course_code_per_term'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedcourse',
+            unique_together={('term', 'original_id')},
+        ),
+    ]
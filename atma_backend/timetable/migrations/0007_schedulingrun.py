@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-19 06:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0006_profilecapture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('required', models.PositiveSmallIntegerField()),
+                ('placed', models.PositiveSmallIntegerField()),
+                ('load_ms', models.FloatField()),
+                ('search_ms', models.FloatField()),
+                ('write_ms', models.FloatField()),
+                ('rejections', models.JSONField(default=dict)),
+                ('trace', models.BinaryField()),
+                ('course', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduling_runs', to='timetable.course')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduling_runs', to=settings.AUTH_USER_MODEL)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduling_runs', to='timetable.department')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['department', '-created_at'], name='schedrun_department_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:35
+
+import django.db.models.deletion
+import timetable.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0008_user_username_lower_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unavailable', timetable.fields.BitmaskField(default=0)),
+                ('preferred', timetable.fields.BitmaskField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('teacher', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='slot_availability', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'teacher availabilities',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0009_teacheravailability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcourse',
+            name='lab_blocks',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='archivedcourse',
+            name='lab_length',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='lab_blocks',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='lab_length',
+            field=models.PositiveSmallIntegerField(choices=[(2, '2 consecutive slots'), (3, '3 consecutive slots')], default=2),
+        ),
+    ]
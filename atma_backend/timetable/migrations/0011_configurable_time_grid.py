@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:47
+
+import timetable.timegrid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0010_course_labs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timeslot',
+            name='day',
+            field=models.CharField(choices=timetable.timegrid.day_choices, max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='timeslot',
+            name='slot',
+            field=models.CharField(choices=timetable.timegrid.slot_choices, max_length=4),
+        ),
+    ]
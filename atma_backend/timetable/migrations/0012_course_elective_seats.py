@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0011_configurable_time_grid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='elective_seats',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='elective_seats_taken',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
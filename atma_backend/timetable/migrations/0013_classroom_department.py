@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0012_course_elective_seats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='home_classrooms', to='timetable.department'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_terms(apps, schema_editor):
+    """Point each version at the Term with its old term code, creating missing terms."""
+    Term = apps.get_model('timetable', 'Term')
+    TimetableVersion = apps.get_model('timetable', 'TimetableVersion')
+    for code in TimetableVersion.objects.values_list('term_code', flat=True).distinct():
+        term, _ = Term.objects.get_or_create(code=code)
+        TimetableVersion.objects.filter(term_code=code).update(term=term)
+
+
+def unlink_terms(apps, schema_editor):
+    TimetableVersion = apps.get_model('timetable', 'TimetableVersion')
+    for version in TimetableVersion.objects.select_related('term'):
+        version.term_code = version.term.code
+        version.save(update_fields=['term_code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0013_classroom_department'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(name='timetableversion', unique_together=set()),
+        migrations.RenameField(model_name='timetableversion', old_name='term', new_name='term_code'),
+        migrations.AddField(
+            model_name='timetableversion',
+            name='term',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='timetable_versions', to='timetable.term'),
+        ),
+        migrations.RunPython(link_terms, unlink_terms),
+        migrations.RemoveField(model_name='timetableversion', name='term_code'),
+        migrations.AlterField(
+            model_name='timetableversion',
+            name='term',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='timetable_versions', to='timetable.term'),
+        ),
+        migrations.AlterUniqueTogether(name='timetableversion', unique_together={('term', 'name')}),
+    ]
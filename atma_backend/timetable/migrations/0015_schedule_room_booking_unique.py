@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0014_timetableversion_term_fk'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='schedule',
+            name='schedule_term_slot_room_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('term', 'timeslot', 'classroom'), name='schedule_term_slot_room_uniq'),
+        ),
+    ]
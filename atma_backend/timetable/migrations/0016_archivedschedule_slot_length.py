@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0015_schedule_room_booking_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedschedule',
+            name='slot',
+            field=models.CharField(max_length=4),
+        ),
+    ]
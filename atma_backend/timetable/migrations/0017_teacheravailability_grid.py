@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:02
+
+import timetable.timegrid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timetable', '0016_archivedschedule_slot_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacheravailability',
+            name='grid',
+            field=models.TextField(default=timetable.timegrid.current_layout, editable=False),
+        ),
+    ]
@@ -1,5 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+
+from . import timegrid
+from .fields import BitmaskField
 
 # -----------------------------------------------------------------------------
 # 1. Department Model
@@ -15,15 +19,36 @@ class Department(models.Model):
         limit_choices_to={'role': 'teacher'},
         related_name='hod_of_department'
     )
+    num_years = models.PositiveSmallIntegerField(default=4)  # Number of year-wise batches
 
     def __str__(self):
         return f"{self.name} ({self.code})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored year count so save() can tell when it changes
+        instance._loaded_num_years = instance.__dict__.get('num_years')
+        return instance
+
     def save(self, *args, **kwargs):
+        creating = self._state.adding
         super().save(*args, **kwargs)
-        # Create 4 batches for the department if they don't already exist
-        for year in range(1, 5):
-            Batch.objects.get_or_create(department=self, year=year)
+        # Only touch batches on insert or when the year count changes,
+        # so plain edits (e.g. a rename or a new HOD) stay a single query
+        if creating or self.num_years != getattr(self, '_loaded_num_years', None):
+            self.create_missing_batches()
+            self._loaded_num_years = self.num_years
+
+    def create_missing_batches(self):
+        """
+        Create any missing year-wise batches in a single INSERT.
+        Existing batches are left alone, even if the year count shrinks.
+        """
+        Batch.objects.bulk_create(
+            [Batch(department=self, year=year) for year in range(1, self.num_years + 1)],
+            ignore_conflicts=True,
+        )
 
 
 # -----------------------------------------------------------------------------
@@ -44,6 +69,12 @@ class User(AbstractUser):
         related_name='users'
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive username lookups (signup availability check)
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.username})"
     
@@ -75,62 +106,87 @@ class Classroom(models.Model):
     name = models.CharField(max_length=100 , unique=True)
     capacity = models.IntegerField()
     availability = models.BooleanField(default=True)
+    # Department the room is near (e.g. in its building); empty for shared rooms
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='home_classrooms',
+    )
     
     def __str__(self):
         return f"{self.name} (Capacity: {self.capacity})"
     
 
 # -----------------------------------------------------------------------------
-# 5. TimeSlot Model (Fixed slots throughout the week)
+# 5. TimeSlot Model (The cells of the configured time grid, see timegrid.py)
 # -----------------------------------------------------------------------------
-class TimeSlot(models.Model):
-    DAYS_OF_WEEK = [
-        ('Monday', 'Monday'),
-        ('Tuesday', 'Tuesday'),
-        ('Wednesday', 'Wednesday'),
-        ('Thursday', 'Thursday'),
-        ('Friday', 'Friday'),
-    ]
-    
-    SLOT_CHOICES = [
-        ('A', '8:00 - 9:00'),
-        ('B', '9:00 - 10:00'),
-        ('C', '10:00 - 11:00'),
-        ('D', '11:00 - 12:00'),
-        ('E', '12:00 - 13:00'),
-        ('F', '14:00 - 15:00'),
-        ('G', '15:00 - 16:00'),
-        ('H', '16:00 - 17:00'),
-    ]
+class TimeSlotQuerySet(models.QuerySet):
+    def in_grid(self):
+        """Timeslots of the configured grid, leaving out rows of removed days or slots."""
+        grid = timegrid.get_grid()
+        return self.filter(day__in=grid.days, slot__in=grid.codes)
+
+    def sync_grid(self):
+        """
+        Create the rows of new grid cells and fix the times of changed ones in
+        bulk: one query when nothing changed. Return ``(created, updated)``.
+        """
+        week = self.model.build_week()
+        existing = {(ts.day, ts.slot): ts for ts in self.in_grid()}
+        missing = [ts for ts in week if (ts.day, ts.slot) not in existing]
+        retimed = []
+        for ts in week:
+            current = existing.get((ts.day, ts.slot))
+            if current and (current.start_time, current.end_time) != (ts.start_time, ts.end_time):
+                current.start_time, current.end_time = ts.start_time, ts.end_time
+                retimed.append(current)
 
-    day = models.CharField(max_length=10, choices=DAYS_OF_WEEK)
-    slot = models.CharField(max_length=1, choices=SLOT_CHOICES)
+        if missing:
+            self.bulk_create(missing, ignore_conflicts=True)
+        if retimed:
+            self.bulk_update(retimed, ['start_time', 'end_time'])
+        return len(missing), len(retimed)
+
+
+class TimeSlot(models.Model):
+    day = models.CharField(max_length=10, choices=timegrid.day_choices)
+    slot = models.CharField(max_length=timegrid.MAX_CODE_LENGTH, choices=timegrid.slot_choices)
     start_time = models.TimeField(blank=True)
     end_time = models.TimeField(blank=True)
+
+    objects = TimeSlotQuerySet.as_manager()
     
     class Meta:
         unique_together = ['day', 'slot']  # Ensure day+slot combination is unique
 
     def save(self, *args, **kwargs):
         # Automatically set start_time and end_time based on slot
-        slot_times = {
-            'A': ('08:00:00', '09:00:00'),
-            'B': ('09:00:00', '10:00:00'),
-            'C': ('10:00:00', '11:00:00'),
-            'D': ('11:00:00', '12:00:00'),
-            'E': ('12:00:00', '13:00:00'),
-            'F': ('14:00:00', '15:00:00'),
-            'G': ('15:00:00', '16:00:00'),
-            'H': ('16:00:00', '17:00:00'),
-        }
-        
+        slot_times = timegrid.get_grid().slot_times
         if self.slot in slot_times:
-            import datetime
-            self.start_time = datetime.time.fromisoformat(slot_times[self.slot][0])
-            self.end_time = datetime.time.fromisoformat(slot_times[self.slot][1])
+            self.start_time, self.end_time = slot_times[self.slot]
             
         super().save(*args, **kwargs)
 
+    @classmethod
+    def grid_position(cls, day, slot):
+        """Bit position of a (day, slot) cell in week-grid bitmasks, independent of row ids."""
+        return timegrid.get_grid().position(day, slot)
+
+    @classmethod
+    def build_week(cls):
+        """
+        Return unsaved TimeSlot instances for the whole grid, with times
+        filled in, ready for bulk_create (which bypasses save()).
+        """
+        grid = timegrid.get_grid()
+        return [
+            cls(day=day, slot=slot, start_time=start, end_time=end)
+            for day in grid.days
+            for slot, start, end in grid.slots
+        ]
+
     def __str__(self):
         return f"{self.day} (Slot {self.slot}: {self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')})"
 
@@ -170,13 +226,50 @@ class Student(models.Model):
         return list(core_courses) + list(elective_courses)
 
 
+class ActiveTermManager(models.Manager):
+    """
+    Default manager for term-partitioned models: only rows of the active
+    term are visible, so timetable queries never scan older terms.
+    Use ``all_terms`` to reach every term.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(term__is_active=True)
+
+
+class CourseManager(ActiveTermManager):
+    def with_details(self):
+        """
+        Courses with everything the course pages render (teacher,
+        department, batches and sessions with their slot and room) loaded
+        in a fixed number of queries, however many courses there are.
+        """
+        return self.select_related('teacher', 'department').prefetch_related(
+            'batches__department',
+            models.Prefetch('schedules', queryset=Schedule.objects.select_related('timeslot', 'classroom')),
+        )
+
+
 # -----------------------------------------------------------------------------
 # 7. Course Model
 # -----------------------------------------------------------------------------
 class Course(models.Model):
+    term = models.ForeignKey(
+        'Term',
+        on_delete=models.PROTECT,
+        related_name='courses',
+        db_index=False,  # Covered by the (term, code) unique index
+    )
+    LAB_LENGTH_CHOICES = [(2, '2 consecutive slots'), (3, '3 consecutive slots')]
+
     name = models.CharField(max_length=100)
-    code = models.CharField(max_length=10, unique=True)
-    credits = models.IntegerField()
+    code = models.CharField(max_length=10)
+    credits = models.IntegerField()  # Single-slot lectures per week
+    # Labs: blocks of consecutive slots in one room, at most one per day
+    lab_blocks = models.PositiveSmallIntegerField(default=0)
+    lab_length = models.PositiveSmallIntegerField(choices=LAB_LENGTH_CHOICES, default=2)
+    # Seats for students of other batches; empty: not open for elective registration
+    elective_seats = models.PositiveIntegerField(null=True, blank=True)
+    elective_seats_taken = models.PositiveIntegerField(default=0)  # Kept in step with elective_students
     teacher = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -199,8 +292,37 @@ class Course(models.Model):
         related_name='elective_courses'
     )
 
+    objects = CourseManager()
+    all_terms = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'code'], name='unique_course_code_per_term'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'department'], name='course_term_department_idx'),
+            models.Index(fields=['term', 'teacher'], name='course_term_teacher_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - ({self.code})"
+
+    @property
+    def session_count(self):
+        """Schedule rows of a fully scheduled course: lectures plus lab slots."""
+        return self.credits + self.lab_blocks * self.lab_length
+
+    @property
+    def elective_seats_left(self):
+        if self.elective_seats is None:
+            return None
+        return max(self.elective_seats - self.elective_seats_taken, 0)
+
+    def save(self, *args, **kwargs):
+        # New courses belong to the active term unless told otherwise
+        if self.term_id is None:
+            self.term = Term.get_active()
+        super().save(*args, **kwargs)
     
     def is_core_for(self, student):
         """
@@ -219,9 +341,266 @@ class Course(models.Model):
 # 8. Schedule Model (Links Course, TimeSlot, and Classroom)
 # -----------------------------------------------------------------------------
 class Schedule(models.Model):
+    # Copied from the course so term-scoped queries stay on one table
+    term = models.ForeignKey(
+        'Term',
+        on_delete=models.PROTECT,
+        related_name='schedules',
+        db_index=False,  # Covered by the term-leading indexes below
+    )
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='schedules')
     timeslot = models.ForeignKey(TimeSlot, on_delete=models.CASCADE, related_name='schedules')
     classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='schedules')
 
+    objects = ActiveTermManager()
+    all_terms = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'course'], name='schedule_term_course_idx'),
+        ]
+        constraints = [
+            # A room holds one session per timeslot; also serves as the term-leading slot index
+            models.UniqueConstraint(fields=['term', 'timeslot', 'classroom'], name='schedule_term_slot_room_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.course.name} - {self.timeslot.day} ({self.timeslot.start_time} - {self.timeslot.end_time}) in {self.classroom.name}"
+
+    def save(self, *args, **kwargs):
+        if self.term_id is None:
+            self.term_id = self.course.term_id
+        super().save(*args, **kwargs)
+
+# -----------------------------------------------------------------------------
+# 9. TimetableVersion Model (Named snapshots of the whole timetable)
+# -----------------------------------------------------------------------------
+class TimetableVersion(models.Model):
+    name = models.CharField(max_length=100)
+    term = models.ForeignKey('Term', on_delete=models.PROTECT, related_name='timetable_versions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='timetable_versions'
+    )
+    session_count = models.PositiveIntegerField(default=0)
+    # Packed (course_id, timeslot_id, classroom_id) triples, see timetable.versions
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = ('term', 'name')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.term} / {self.name} ({self.session_count} sessions)"
+
+
+# -----------------------------------------------------------------------------
+# 10. Term Model (Academic terms partitioning courses and schedules)
+# -----------------------------------------------------------------------------
+class Term(models.Model):
+    DEFAULT_CODE = 'DEFAULT'
+
+    code = models.CharField(max_length=20, unique=True)  # e.g. "2025-AUTUMN"
+    name = models.CharField(max_length=100, blank=True)
+    is_active = models.BooleanField(default=False)
+    is_closed = models.BooleanField(default=False)  # Closed terms can be archived
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=models.Q(is_active=True),
+                name='single_active_term',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name or self.code
+
+    @classmethod
+    def get_active(cls):
+        """
+        Return the active term. A fresh installation gets a default
+        active term on first use.
+        """
+        term = cls.objects.filter(is_active=True).first()
+        if term is None:
+            if cls.objects.exists():
+                raise cls.DoesNotExist("No term is marked active.")
+            term = cls.objects.create(code=cls.DEFAULT_CODE, is_active=True)
+        return term
+
+
+# -----------------------------------------------------------------------------
+# 11. ArchivedCourse Model (Courses of archived terms, kept out of hot tables)
+# -----------------------------------------------------------------------------
+class ArchivedCourse(models.Model):
+    term = models.ForeignKey(Term, on_delete=models.PROTECT, related_name='archived_courses')
+    original_id = models.BigIntegerField()
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=10)
+    credits = models.IntegerField()
+    lab_blocks = models.PositiveSmallIntegerField(default=0)
+    lab_length = models.PositiveSmallIntegerField(default=2)
+    teacher = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_courses_taught'
+    )
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_courses'
+    )
+    batch_ids = models.JSONField(default=list)
+    elective_student_ids = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ('term', 'original_id')
+
+    def __str__(self):
+        return f"{self.name} - ({self.code}) [{self.term}]"
+
+
+# -----------------------------------------------------------------------------
+# 12. ArchivedSchedule Model
+# -----------------------------------------------------------------------------
+class ArchivedSchedule(models.Model):
+    term = models.ForeignKey(Term, on_delete=models.PROTECT, related_name='archived_schedules')
+    course = models.ForeignKey(ArchivedCourse, on_delete=models.CASCADE, related_name='schedules')
+    day = models.CharField(max_length=10)
+    slot = models.CharField(max_length=timegrid.MAX_CODE_LENGTH)
+    classroom_name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return f"{self.course.code} - {self.day} slot {self.slot} in {self.classroom_name}"
+
+
+# -----------------------------------------------------------------------------
+# 13. ProfileCapture Model (On-demand cProfile captures of single requests)
+# -----------------------------------------------------------------------------
+class ProfileCapture(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='profile_captures'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    url_name = models.CharField(max_length=100, blank=True)
+    duration_ms = models.FloatField()
+    prof_file = models.CharField(max_length=500)  # Path of the saved .prof file
+    summary = models.TextField()  # Top-N functions by cumulative time
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+# -----------------------------------------------------------------------------
+# 14. SchedulingRun Model (Traced runs of the course scheduler)
+# -----------------------------------------------------------------------------
+class SchedulingRun(models.Model):
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='scheduling_runs'
+    )
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='scheduling_runs')
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scheduling_runs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    required = models.PositiveSmallIntegerField()
+    placed = models.PositiveSmallIntegerField()
+    load_ms = models.FloatField()
+    search_ms = models.FloatField()
+    write_ms = models.FloatField()
+    rejections = models.JSONField(default=dict)  # Rejected candidate slots per reason
+    trace = models.BinaryField()  # zlib-compressed (timeslot, outcome, resource) triples, see scheduler.py
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['department', '-created_at'], name='schedrun_department_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.course} - {self.placed}/{self.required} placed"
+
+
+# -----------------------------------------------------------------------------
+# 15. TeacherAvailability Model (Unavailable and preferred slots of a teacher)
+# -----------------------------------------------------------------------------
+class TeacherAvailabilityQuerySet(models.QuerySet):
+    def fit_grid(self):
+        """Remap the masks of rows stored on another grid layout in bulk; return how many changed."""
+        stale = [a for a in self.exclude(grid=timegrid.get_grid().layout) if a.fit_grid()]
+        if stale:
+            self.bulk_update(stale, ['unavailable', 'preferred', 'grid'])
+        return len(stale)
+
+
+class TeacherAvailability(models.Model):
+    AVAILABLE = 'available'
+    PREFERRED = 'preferred'
+    UNAVAILABLE = 'unavailable'
+    STATES = [AVAILABLE, PREFERRED, UNAVAILABLE]  # Order the grid editor cycles through
+
+    teacher = models.OneToOneField(User, on_delete=models.CASCADE, related_name='slot_availability')
+    # One bit per week-grid cell, see TimeSlot.grid_position
+    unavailable = BitmaskField()  # Hard constraint: never scheduled there
+    preferred = BitmaskField()  # Soft constraint: filled first
+    # Grid layout the masks were written on, see TimeGrid.remap
+    grid = models.TextField(default=timegrid.current_layout, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TeacherAvailabilityQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'teacher availabilities'
+
+    def fit_grid(self):
+        """Move the masks onto the current grid if it changed shape since they were saved; return whether it did."""
+        grid = timegrid.get_grid()
+        if self.grid == grid.layout:
+            return False
+        self.unavailable = grid.remap(self.unavailable, self.grid)
+        self.preferred = grid.remap(self.preferred, self.grid)
+        self.grid = grid.layout
+        return True
+
+    def state(self, position):
+        bit = 1 << position
+        if self.unavailable & bit:
+            return self.UNAVAILABLE
+        if self.preferred & bit:
+            return self.PREFERRED
+        return self.AVAILABLE
+
+    def set_state(self, position, state):
+        bit = 1 << position
+        self.unavailable &= ~bit
+        self.preferred &= ~bit
+        if state == self.UNAVAILABLE:
+            self.unavailable |= bit
+        elif state == self.PREFERRED:
+            self.preferred |= bit
+
     def __str__(self):
-        return f"{self.course.name} - {self.timeslot.day} ({self.timeslot.start_time} - {self.timeslot.end_time}) in {self.classroom.name}"
\ No newline at end of file
+        return f"Availability of {self.teacher}"
@@ -0,0 +1,173 @@
+"""
+Room occupancy as one bitmask per classroom.
+
+Each ``TimeSlot`` gets a bit position (week order: day, then start time),
+and each ``Classroom`` an integer whose set bits are the slots it is booked
+in the active term. "Which rooms are free on Thursday, slots C to E?" is
+then ``mask & wanted == 0`` per room, with rooms kept sorted by capacity so
+a minimum capacity skips the small ones by bisection.
+
+Consecutive bits are adjacent in time unless they cross a break (lunch
+between E and F, or the end of a day). ``links`` marks the slots that are
+directly followed by the next one, so runs of free slots for labs come
+from shifting and ANDing masks (``block_starts``) instead of scanning.
+
+The index lives in process memory and is stamped with the timetable
+version from ``grids``. Every ``Schedule``, ``Classroom`` and ``TimeSlot``
+change (and every bulk path) bumps that version, and the next lookup
+rebuilds the index in three queries; lookups between changes never touch
+the database. The scheduler reads its room occupancy from the same index,
+and elective registration the slots each course meets in (``course_masks``).
+
+The index is a read-side accelerator only: a version bumped by another
+process may not be visible yet, so writers re-check the rooms they chose
+in the database (see ``scheduler``), and a unique constraint on
+(term, timeslot, classroom) refuses any double booking that slips through.
+"""
+import bisect
+import threading
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import grids, timegrid
+from .models import Classroom, Schedule, TimeSlot
+
+
+class OccupancyIndex:
+    def __init__(self, timeslots, rooms, booked):
+        # Bit positions in week order
+        grid = timegrid.get_grid()
+        self.timeslots = sorted(timeslots, key=lambda ts: (grid.day_order(ts.day), ts.start_time, ts.slot))
+        self.bits = {timeslot.pk: 1 << position for position, timeslot in enumerate(self.timeslots)}
+        self.cells = {(timeslot.day, timeslot.slot): timeslot.pk for timeslot in self.timeslots}
+        self.day_masks = {}
+        self.links = 0  # Bit i set: slot i ends exactly when slot i + 1 starts, on the same day
+        for position, timeslot in enumerate(self.timeslots):
+            self.day_masks[timeslot.day] = self.day_masks.get(timeslot.day, 0) | 1 << position
+            following = self.timeslots[position + 1] if position + 1 < len(self.timeslots) else None
+            if following and following.day == timeslot.day and following.start_time == timeslot.end_time:
+                self.links |= 1 << position
+        # Bits of the fixed week grid, for masks stored per teacher (TimeSlot.grid_position)
+        self.grid_bits = {
+            timeslot.pk: 1 << TimeSlot.grid_position(timeslot.day, timeslot.slot) for timeslot in self.timeslots
+        }
+
+        self.rooms = sorted(rooms, key=lambda room: (room.capacity, room.name))
+        self.capacities = [room.capacity for room in self.rooms]
+        self.masks = {room.pk: 0 for room in self.rooms}
+        self.course_masks = {}  # Slots each course meets in, for clash checks
+        for timeslot_id, classroom_id, course_id in booked:
+            bit = self.bits.get(timeslot_id, 0)
+            if classroom_id in self.masks:
+                self.masks[classroom_id] |= bit
+            self.course_masks[course_id] = self.course_masks.get(course_id, 0) | bit
+        self.version = None
+
+    @classmethod
+    def build(cls):
+        return cls(
+            TimeSlot.objects.in_grid(),
+            Classroom.objects.all(),
+            Schedule.objects.values_list('timeslot_id', 'classroom_id', 'course_id'),
+        )
+
+    def mask(self, timeslot_ids):
+        """The bits of the given timeslots; unknown ids are ignored."""
+        mask = 0
+        for timeslot_id in timeslot_ids:
+            mask |= self.bits.get(timeslot_id, 0)
+        return mask
+
+    def day_slots(self, day):
+        """Slot letters of a day in chronological order."""
+        return [timeslot.slot for timeslot in self.timeslots if timeslot.day == day]
+
+    def slot_range(self, day, first, last):
+        """Timeslot ids of ``day`` from slot ``first`` through ``last``, inclusive."""
+        slots = self.day_slots(day)
+        if first not in slots or last not in slots:
+            return []
+        start, end = sorted((slots.index(first), slots.index(last)))
+        return [self.cells[(day, slot)] for slot in slots[start:end + 1]]
+
+    def is_free(self, classroom_id, timeslot_ids):
+        return not self.masks.get(classroom_id, 0) & self.mask(timeslot_ids)
+
+    def free_rooms(self, timeslot_ids, min_capacity=0, available_only=True):
+        """Classrooms free in all of ``timeslot_ids``, smallest fitting room first."""
+        wanted = self.mask(timeslot_ids)
+        start = bisect.bisect_left(self.capacities, min_capacity)
+        return [
+            room for room in self.rooms[start:]
+            if not self.masks[room.pk] & wanted and (room.availability or not available_only)
+        ]
+
+    def block_starts(self, free, length):
+        """
+        Bits of ``free`` that start ``length`` consecutive free slots with no
+        break in between: bit i survives if bits i..i+length-1 are free and
+        slots i..i+length-2 are each directly followed by the next.
+        """
+        starts = free
+        for offset in range(1, length):
+            starts &= (free >> offset) & (self.links >> (offset - 1))
+        return starts
+
+    def block(self, start, length):
+        """Timeslots of the block starting at bit position ``start``."""
+        return self.timeslots[start:start + length]
+
+    def courses_mask(self, course_ids):
+        """The slots any of the courses meets in."""
+        mask = 0
+        for course_id in course_ids:
+            mask |= self.course_masks.get(course_id, 0)
+        return mask
+
+    def cells_of(self, mask):
+        """(day, slot) cells of the set bits, in week order."""
+        return [(timeslot.day, timeslot.slot) for timeslot in self.timeslots if mask & self.bits[timeslot.pk]]
+
+    def booked(self, classroom_id):
+        """Timeslot ids the classroom is booked in, in week order."""
+        mask = self.masks.get(classroom_id, 0)
+        return [timeslot.pk for timeslot in self.timeslots if mask & self.bits[timeslot.pk]]
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_index():
+    """
+    The occupancy index for the current timetable version. The version is
+    read before the rows, so a change racing a rebuild leaves the index
+    stamped older than its data and the next lookup rebuilds it again.
+
+    Treat the returned index as read-only; it is shared by every thread.
+    """
+    global _index
+    version = grids.current_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            index = OccupancyIndex.build()
+            index.version = version
+            _index = index
+        return _index
+
+
+def clear():
+    """Drop the in-memory index; the next lookup rebuilds it."""
+    global _index
+    with _lock:
+        _index = None
+
+
+@receiver(setting_changed)
+def _grid_changed(setting, **kwargs):
+    if setting == 'ATMA_TIME_GRID':
+        clear()
@@ -0,0 +1,126 @@
+"""
+Bulk provisioning helpers used when onboarding whole cohorts at once.
+
+Creating users one by one with ``User.objects.create_user`` hashes every
+password serially and issues several queries per user. The helpers here hash
+passwords across a process pool and insert users and their student profiles
+with ``bulk_create``. Departments are handled the same way, with all of
+their batches created in one statement.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import User, Student, Department, Batch
+
+
+def _init_hasher_process():
+    # Workers started with the "spawn" method need Django configured before
+    # the password hashers can be loaded. Under "fork" this is a no-op.
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash a list of raw passwords, spreading the work across a process pool.
+
+    ``None`` entries produce unusable passwords, matching ``make_password``.
+    With ``workers`` <= 1 the passwords are hashed in the current process.
+    """
+    passwords = list(passwords)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(passwords))
+
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hasher_process) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+@transaction.atomic
+def bulk_create_users(rows, workers=None, batch_size=500):
+    """
+    Create many users (and student profiles) in a handful of queries.
+
+    Each row is a dict with ``username`` and ``password`` plus any of
+    ``first_name``, ``last_name``, ``email``, ``role``, ``department`` and
+    ``batch``. Students with a ``batch`` get a ``Student`` profile attached.
+    Returns the list of created users.
+    """
+    rows = list(rows)
+    hashes = hash_passwords([row.get('password') for row in rows], workers=workers)
+
+    users = []
+    for row, password_hash in zip(rows, hashes):
+        user = User(
+            username=row['username'],
+            password=password_hash,
+            first_name=row.get('first_name', ''),
+            last_name=row.get('last_name', ''),
+            email=row.get('email', ''),
+            role=row.get('role', 'student'),
+            department=row.get('department'),
+        )
+        # bulk_create skips User.save(), so apply its admin rule here
+        if user.role == 'admin':
+            user.department = None
+        users.append(user)
+
+    User.objects.bulk_create(users, batch_size=batch_size)
+
+    # Backends that cannot return ids from a bulk insert leave pk unset
+    if any(user.pk is None for user in users):
+        ids = dict(
+            User.objects.filter(username__in=[user.username for user in users])
+            .values_list('username', 'id')
+        )
+        for user in users:
+            user.pk = ids[user.username]
+
+    students = [
+        Student(user=user, batch=row['batch'])
+        for row, user in zip(rows, users)
+        if user.role == 'student' and row.get('batch') is not None
+    ]
+    Student.objects.bulk_create(students, batch_size=batch_size)
+
+    return users
+
+
+@transaction.atomic
+def bulk_create_departments(departments, batch_size=500):
+    """
+    Insert unsaved ``Department`` instances together with their year-wise
+    batches, using one INSERT for the departments and one for the batches
+    instead of a save() per department.
+    """
+    departments = list(departments)
+    Department.objects.bulk_create(departments, batch_size=batch_size)
+
+    if any(department.pk is None for department in departments):
+        ids = dict(
+            Department.objects.filter(code__in=[d.code for d in departments])
+            .values_list('code', 'id')
+        )
+        for department in departments:
+            department.pk = ids[department.code]
+
+    Batch.objects.bulk_create(
+        [
+            Batch(department=department, year=year)
+            for department in departments
+            for year in range(1, department.num_years + 1)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    for department in departments:
+        department._loaded_num_years = department.num_years
+
+    return departments
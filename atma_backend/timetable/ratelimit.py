@@ -0,0 +1,36 @@
+"""
+Fixed-window rate limiting on the Django cache.
+
+Each client gets a counter per scope and window; the first request of a
+window creates it with the window as its timeout, so old windows expire on
+their own. Clients are told apart by IP address. Behind a reverse proxy every
+request comes from the proxy's address, so ``ATMA_CLIENT_IP`` names the
+header the proxy puts the client address in and how many trusted proxies
+append to it; the address is read that many entries from the right, so a
+client cannot pick its own bucket by sending the header itself.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def client_key(request):
+    config = getattr(settings, 'ATMA_CLIENT_IP', {})
+    header = config.get('HEADER')
+    if header:
+        forwarded = [ip.strip() for ip in request.headers.get(header, '').split(',') if ip.strip()]
+        proxies = config.get('PROXY_COUNT', 1)
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def exceeded(request, scope, limit, window):
+    """Count this request and return True once the client is over ``limit`` per ``window`` seconds."""
+    key = f"ratelimit:{scope}:{client_key(request)}:{int(time.time() // window)}"
+    cache.add(key, 0, timeout=window)
+    try:
+        return cache.incr(key) > limit
+    except ValueError:  # Evicted between add() and incr()
+        return False
@@ -0,0 +1,132 @@
+"""
+Elective registration concurrency benchmark for the ``benchmark_registration``
+command.
+
+A synthetic institution is seeded with its electives emptied and a few
+courses per department opened with fewer seats than there are students who
+want them. Every student then tries to register for their electives from a
+pool of ``concurrency`` threads, each with its own database connection,
+calling ``electives.register`` the way the view does. The report gives
+registrations per second, latency percentiles and the outcome counts, and
+checks that no course ended up with more students than seats.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from queue import Empty, Queue
+
+from django.db import DatabaseError, connection
+from django.db.models import Count
+
+from . import electives, occupancy, synthetic
+from .loadtest import percentile
+from .models import Course, Student
+
+
+def prepare(prefix, size='small', seed=0, seat_share=0.5, choices=3):
+    """
+    Seed the data and return ``[(student, [course ids in order of preference])]``.
+    Students only pick courses that fit around their core timetable, and each
+    open course gets seats for ``seat_share`` of the students who want it first.
+    """
+    synthetic.generate(prefix=prefix, size=size, seed=seed, electives_per_student=0)
+    rng = random.Random(seed)
+    courses = list(Course.objects.filter(code__startswith=prefix.upper()).prefetch_related('batches'))
+    students = list(Student.objects.filter(user__username__startswith=f"{prefix}_").select_related('batch'))
+
+    index = occupancy.get_index()
+    core = {}
+    for course in courses:
+        for batch in course.batches.all():
+            core[batch.pk] = core.get(batch.pk, 0) | index.course_masks.get(course.pk, 0)
+    wanted = {}
+    for student in students:
+        candidates = [
+            course.pk for course in courses
+            if course.department_id == student.batch.department_id
+            and all(batch.pk != student.batch_id for batch in course.batches.all())
+            and not index.course_masks.get(course.pk, 0) & core.get(student.batch_id, 0)
+        ]
+        wanted[student.pk] = rng.sample(candidates, min(choices, len(candidates)))
+
+    demand = Counter(course_id for course_ids in wanted.values() for course_id in course_ids[:1])
+    for course in courses:
+        course.elective_seats = max(1, int(demand[course.pk] * seat_share))
+    Course.objects.bulk_update(courses, ['elective_seats'])
+    return [(student, wanted[student.pk]) for student in students]
+
+
+def run(plan, concurrency):
+    """Register every student for their first choice that succeeds; return samples and elapsed seconds."""
+    queue = Queue()
+    for item in plan:
+        queue.put(item)
+    samples = []  # (outcome, seconds)
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                try:
+                    student, course_ids = queue.get_nowait()
+                except Empty:
+                    return
+                for course_id in course_ids:
+                    start = time.perf_counter()
+                    try:
+                        electives.register(student, course_id)
+                        outcome = 'registered'
+                    except electives.ElectiveFull:
+                        outcome = 'full'
+                    except electives.ElectiveClash:
+                        outcome = 'clash'
+                    except electives.RegistrationError:
+                        outcome = 'rejected'
+                    except DatabaseError:
+                        outcome = 'error'
+                    with lock:
+                        samples.append((outcome, time.perf_counter() - start))
+                    if outcome == 'registered':
+                        break
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def oversold(prefix):
+    """Open courses with more enrolled students than seats, or a seat counter out of step."""
+    rows = (
+        Course.objects.filter(code__startswith=prefix.upper(), elective_seats__isnull=False)
+        .annotate(enrolled=Count('elective_students'))
+        .values_list('code', 'elective_seats', 'elective_seats_taken', 'enrolled')
+    )
+    return [
+        {'course': code, 'seats': seats, 'taken': taken, 'enrolled': enrolled}
+        for code, seats, taken, enrolled in rows
+        if enrolled > seats or taken != enrolled
+    ]
+
+
+def summarize(samples, elapsed):
+    outcomes = Counter(outcome for outcome, _ in samples)
+    latencies = sorted(seconds * 1000 for _, seconds in samples)
+    return {
+        'attempts': len(samples),
+        'outcomes': dict(outcomes),
+        'elapsed_s': round(elapsed, 3),
+        'attempts_per_s': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'registrations_per_s': round(outcomes['registered'] / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+        },
+    }
@@ -0,0 +1,116 @@
+"""
+Scheduler scaling benchmark for the ``benchmark_scheduler`` command.
+
+For each grid size (days x slots per day) it switches ``ATMA_TIME_GRID``
+to a generated grid, creates its timeslots, seeds a synthetic institution
+and schedules every course one by one with ``scheduler.schedule_course``,
+timing the load, search and write phases and counting queries per run.
+Everything happens in one transaction that is rolled back, so the real
+timetable is never touched.
+
+The search works on per-room bitmasks, so its cost grows with rooms and
+slots per run while the number of queries per run stays constant; the
+report puts both next to the grid size to make that visible.
+"""
+import datetime
+import time
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from . import grids, occupancy, scheduler, synthetic
+from .loadtest import percentile
+from .models import Course, Schedule, TimeSlot
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+LUNCH_AFTER = 5  # Slots before the lunch break
+
+
+def grid_config(days, slots):
+    """A grid of ``days`` x ``slots`` one-hour slots from 08:00, with lunch after the fifth."""
+    if not 1 <= days <= len(WEEKDAYS) or not 1 <= slots <= 26:
+        raise ValueError(f"Unsupported grid {days}x{slots}.")
+    config = []
+    start = datetime.datetime(2000, 1, 1, 8)
+    for i in range(slots):
+        if i == LUNCH_AFTER:
+            start += datetime.timedelta(hours=1)
+        end = start + datetime.timedelta(hours=1)
+        config.append((chr(ord('A') + i), start.strftime('%H:%M'), end.strftime('%H:%M')))
+        start = end
+    return {'DAYS': WEEKDAYS[:days], 'SLOTS': config}
+
+
+def parse_grid(value):
+    """``"6x12"`` -> ``(6, 12)``."""
+    days, _, slots = value.lower().partition('x')
+    return int(days), int(slots)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_grid(days, slots, size='small', seed=0, lab_share=0.25):
+    """Schedule a synthetic institution on a ``days`` x ``slots`` grid and report the timings."""
+    report = None
+    try:
+        with override_settings(ATMA_TIME_GRID=grid_config(days, slots)), transaction.atomic():
+            TimeSlot.objects.sync_grid()
+            data = synthetic.generate(prefix='schedbench', size=size, seed=seed)
+            courses = list(Course.objects.filter(pk__in=data['courses']).order_by('pk'))
+            # Start from an empty timetable, with labs on a share of the courses
+            Schedule.objects.filter(course__in=courses).delete()
+            labs = courses[:int(len(courses) * lab_share)]
+            Course.objects.filter(pk__in=[c.pk for c in labs]).update(lab_blocks=1, lab_length=2)
+            for course in labs:
+                course.lab_blocks, course.lab_length = 1, 2
+            grids.invalidate()
+
+            runs = []
+            for course in courses:
+                with CaptureQueriesContext(connection) as queries:
+                    result = scheduler.schedule_course(course, trace=False)
+                runs.append((result, len(queries.captured_queries)))
+            report = _summarize(days, slots, runs)
+            raise _Rollback
+    except _Rollback:
+        pass
+    finally:
+        # The index may hold rows of the rolled-back transaction
+        occupancy.clear()
+        grids.invalidate()
+    return report
+
+
+def _summarize(days, slots, runs):
+    phases = {}
+    for phase in ('load', 'search', 'write'):
+        values = sorted(result.timings[phase] * 1000 for result, _ in runs)
+        phases[phase] = {
+            'mean': round(sum(values) / len(values), 3) if values else 0.0,
+            'p95': round(percentile(values, 95), 3),
+        }
+    query_counts = [count for _, count in runs]
+    return {
+        'grid': f"{days}x{slots}",
+        'cells': days * slots,
+        'courses': len(runs),
+        'required': sum(result.required for result, _ in runs),
+        'placed': sum(result.placed for result, _ in runs),
+        'phase_ms': phases,
+        'total_ms': round(sum(sum(result.timings.values()) for result, _ in runs) * 1000, 2),
+        'queries_per_run': {'min': min(query_counts, default=0), 'max': max(query_counts, default=0)},
+    }
+
+
+def run(grid_sizes, size='small', seed=0):
+    """Run every grid and add each one's search time relative to the first grid."""
+    start = time.perf_counter()
+    reports = [run_grid(days, slots, size=size, seed=seed) for days, slots in grid_sizes]
+    base = reports[0]
+    for report in reports:
+        base_search = base['phase_ms']['search']['mean']
+        report['cells_ratio'] = round(report['cells'] / base['cells'], 2)
+        report['search_ratio'] = round(report['phase_ms']['search']['mean'] / base_search, 2) if base_search else None
+    return {'size': size, 'elapsed_s': round(time.perf_counter() - start, 2), 'grids': reports}
@@ -0,0 +1,418 @@
+"""
+Greedy course scheduler used by the HOD "schedule course" action.
+
+A run has three phases:
+
+- load: read everything that is already busy (the teacher's slots, the
+  teacher's unavailable and preferred slots, the batches' slots) in a fixed
+  number of queries, and take the timeslots and the booked rooms from the
+  shared occupancy index (``occupancy``);
+- search: place labs first, each as a run of consecutive free slots in one
+  room (found with bitmask shifts, never across the lunch break), at most
+  one lab per day; then round-robin the lectures over the days, at most two
+  per day, the teacher's preferred slots first, keeping the same classroom
+  per day where possible. Entirely in memory;
+- write: re-check the chosen rooms against the database and insert the
+  sessions with one ``bulk_create``.
+
+The occupancy index is only a read-side accelerator: it is rebuilt when
+this process sees a new timetable version, so another worker may have
+booked a room since. The write phase therefore reads the bookings of the
+chosen (timeslot, room) pairs inside the write transaction; when one is
+taken it raises ``StalePlan``, and ``schedule_course`` rebuilds the index
+and searches again. A unique constraint on (term, timeslot, classroom)
+backs this up.
+
+``preview_course`` stops before the write and returns the plan with a
+fingerprint of everything the search read. ``commit_plan`` reloads in a
+transaction and writes exactly that plan, or raises ``StalePlan`` when the
+fingerprint no longer matches (a slot or room was taken in between).
+
+Each run counts why candidate slots were rejected (``teacher_busy``,
+``batch_busy``, ``day_limit``, ``no_room``, ``teacher_unavailable``,
+``no_lab_block``). With tracing enabled
+(``ATMA_SCHEDULER['TRACE']``) every candidate slot and its outcome is kept
+as well, and the run is stored as a ``SchedulingRun`` with the trace packed
+into a compressed binary blob.
+
+Every run reports its duration to ``metrics``. Sessions are counted as
+placed when they are written, and as failures, labelled with the main
+rejection reason, when a search leaves them unplaced.
+"""
+import hashlib
+import time
+import zlib
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from . import events, grids, metrics, occupancy, timegrid
+from .models import Course, Schedule, SchedulingRun, TeacherAvailability, Term
+
+# Outcome of a candidate slot, stored by index in packed traces (append only)
+OUTCOMES = ['placed', 'teacher_busy', 'batch_busy', 'day_limit', 'no_room', 'teacher_unavailable', 'no_lab_block']
+REJECTIONS = OUTCOMES[1:]
+
+MAX_SESSIONS_PER_DAY = 2
+
+
+def trace_enabled():
+    return getattr(settings, 'ATMA_SCHEDULER', {}).get('TRACE', False)
+
+
+def pack_trace(entries):
+    """Pack ``(timeslot_id, outcome, resource_id)`` triples into a compressed blob."""
+    flat = array('q')
+    for timeslot_id, outcome, resource_id in entries:
+        flat.extend((timeslot_id, OUTCOMES.index(outcome), resource_id or 0))
+    return zlib.compress(flat.tobytes())
+
+
+def unpack_trace(blob):
+    flat = array('q')
+    flat.frombytes(zlib.decompress(bytes(blob)))
+    return [
+        (flat[i], OUTCOMES[flat[i + 1]], flat[i + 2] or None)
+        for i in range(0, len(flat), 3)
+    ]
+
+
+class StalePlan(Exception):
+    """The occupancy a plan was computed from has changed."""
+
+
+class SchedulingResult:
+    def __init__(self, course, required):
+        self.course = course
+        self.required = required
+        self.placements = []  # (timeslot, classroom)
+        self.rejections = {reason: 0 for reason in REJECTIONS}
+        self.trace = []  # (timeslot_id, outcome, resource_id), only when tracing
+        self.timings = {'load': 0.0, 'search': 0.0, 'write': 0.0}
+        self.run = None
+        self.fingerprint = None  # Of the loaded state, to commit a previewed plan
+
+    @property
+    def placed(self):
+        return len(self.placements)
+
+    @property
+    def main_constraint(self):
+        """The rejection reason that blocked the most candidate slots, if any."""
+        reason = max(REJECTIONS, key=lambda r: self.rejections[r])
+        return reason if self.rejections[reason] else None
+
+
+class CourseScheduler:
+    def __init__(self, course, trace=None):
+        self.course = course
+        self.trace = trace_enabled() if trace is None else trace
+        self.result = SchedulingResult(course, course.session_count)
+
+    def reject(self, timeslot_id, reason, resource_id=None):
+        self.result.rejections[reason] += 1
+        if self.trace:
+            self.result.trace.append((timeslot_id, reason, resource_id))
+
+    def run(self, user=None, dry_run=False):
+        phases = [('load', self.load), ('search', self.search)]
+        if not dry_run:
+            phases.append(('write', self.write))
+        self.run_phases(phases)
+        if self.trace and not dry_run:
+            self.result.run = self.save_run(user)
+        self.record_metrics(searched=True, written=not dry_run)
+        return self.result
+
+    def run_phases(self, phases):
+        for name, phase in phases:
+            start = time.perf_counter()
+            phase()
+            self.result.timings[name] = time.perf_counter() - start
+
+    def commit(self, plan, fingerprint):
+        """Write a previewed plan of ``(timeslot_id, classroom_id)`` pairs unchanged."""
+        self.run_phases([('load', self.load)])
+        if self.result.fingerprint != fingerprint:
+            raise StalePlan
+        timeslots = {timeslot.pk: timeslot for timeslot in self.timeslots}
+        rooms = {room.pk: room for room in self.rooms}
+        self.result.placements = [(timeslots[t], rooms[r]) for t, r in plan]
+        self.run_phases([('write', self.write)])
+        self.record_metrics(searched=False, written=True)  # Failures were counted by the preview's search
+        return self.result
+
+    def record_metrics(self, searched, written):
+        result = self.result
+        metrics.SCHEDULER_DURATION.observe(sum(result.timings.values()))
+        if written:
+            metrics.SCHEDULER_PLACEMENTS.inc(result.placed)
+        if searched and result.placed < result.required:
+            metrics.SCHEDULER_FAILURES.inc(result.required - result.placed, reason=result.main_constraint or 'unknown')
+
+    # -------------------------------------------------------------------------
+    # Phases
+    # -------------------------------------------------------------------------
+    def load(self):
+        """Read the busy teacher and batch slots; timeslots and rooms come from the occupancy index."""
+        course = self.course
+        self.index = index = occupancy.get_index()
+        self.timeslots = list(index.timeslots)
+        self.slot_bits = index.bits
+        self.grid_bits = index.grid_bits
+
+        # The teacher's own constraints, as week-grid bitmasks
+        availability = TeacherAvailability.objects.filter(teacher=course.teacher_id).first()
+        if availability:
+            availability.fit_grid()
+            self.unavailable, self.preferred = availability.unavailable, availability.preferred
+        else:
+            self.unavailable = self.preferred = 0
+
+        # Busy slots come from the (active-term) Schedule manager so older
+        # terms never block the current timetable
+        self.teacher_busy = set(
+            Schedule.objects.filter(course__teacher=course.teacher_id).values_list('timeslot_id', flat=True)
+        )
+        batch_ids = set(course.batches.values_list('id', flat=True))
+        self.batch_busy = {}  # timeslot id -> first busy batch
+        if batch_ids:
+            rows = Schedule.objects.filter(course__batches__in=batch_ids).values_list(
+                'timeslot_id', 'course__batches'
+            )
+            for timeslot_id, batch_id in rows:
+                if batch_id in batch_ids:
+                    self.batch_busy.setdefault(timeslot_id, batch_id)
+
+        self.rooms = sorted((room for room in index.rooms if room.availability), key=lambda room: room.pk)
+        # A private copy of the room bitmasks; the shared index is never modified
+        self.room_masks = {room.pk: index.masks[room.pk] for room in self.rooms}
+        self.result.fingerprint = self.fingerprint()
+
+    def fingerprint(self):
+        """Digest of every input the search depends on; equal inputs give the same plan."""
+        state = (
+            self.course.pk, self.course.credits, self.course.lab_blocks, self.course.lab_length,
+            self.unavailable, self.preferred,
+            sorted(self.teacher_busy), sorted(self.batch_busy.items()),
+            [(ts.pk, ts.day, ts.start_time) for ts in self.timeslots],
+            sorted(self.room_masks.items()),
+        )
+        return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
+
+    def search(self):
+        """Place the labs, then round-robin the lectures across the days, in memory."""
+        result = self.result
+
+        # Group the free timeslots by day
+        timeslots_by_day = {}
+        free = 0  # The same free timeslots as a bitmask
+        for timeslot in self.timeslots:
+            if timeslot.pk in self.teacher_busy:
+                self.reject(timeslot.pk, 'teacher_busy', self.course.teacher_id)
+            elif self.unavailable & self.grid_bits[timeslot.pk]:
+                self.reject(timeslot.pk, 'teacher_unavailable', self.course.teacher_id)
+            elif timeslot.pk in self.batch_busy:
+                self.reject(timeslot.pk, 'batch_busy', self.batch_busy[timeslot.pk])
+            else:
+                timeslots_by_day.setdefault(timeslot.day, []).append(timeslot)
+                free |= self.slot_bits[timeslot.pk]
+
+        if self.course.lab_blocks:
+            used = self.search_labs(free)
+            for day in timeslots_by_day:
+                timeslots_by_day[day] = [ts for ts in timeslots_by_day[day] if ts.pk not in used]
+        # Preferred slots first, then the rest in chronological order
+        for day in timeslots_by_day:
+            timeslots_by_day[day].sort(key=lambda ts: (not self.preferred & self.grid_bits[ts.pk], ts.start_time))
+
+        # Start with the day that has the most free slots, then keep the week order
+        days = [day for day in timegrid.get_grid().days if day in timeslots_by_day]
+        if days:
+            start_day = max(days, key=lambda d: len(timeslots_by_day[d]))
+            start_index = days.index(start_day)
+            days = days[start_index:] + days[:start_index]
+
+        day_count = {day: 0 for day in days}
+        preferred_rooms = {}  # The classroom chosen for each day
+        lectures = 0
+
+        while lectures < self.course.credits:
+            progress = False
+            for day in days:
+                if lectures >= self.course.credits:
+                    break
+                if day_count[day] >= MAX_SESSIONS_PER_DAY or not timeslots_by_day[day]:
+                    continue
+
+                timeslot = timeslots_by_day[day].pop(0)
+                bit = self.slot_bits[timeslot.pk]
+                free_rooms = [room for room in self.rooms if not self.room_masks[room.pk] & bit]
+                if not free_rooms:
+                    self.reject(timeslot.pk, 'no_room')
+                    continue
+
+                # Keep the day's classroom if it is free, otherwise take the first free one
+                preferred = preferred_rooms.get(day)
+                if preferred is not None and not self.room_masks[preferred.pk] & bit:
+                    room = preferred
+                else:
+                    room = free_rooms[0]
+                    preferred_rooms[day] = room
+
+                result.placements.append((timeslot, room))
+                self.room_masks[room.pk] |= bit
+                if self.trace:
+                    result.trace.append((timeslot.pk, 'placed', room.pk))
+                day_count[day] += 1
+                lectures += 1
+                progress = True
+
+            if not progress:
+                break
+
+        # Free slots left unused only because their day was full
+        if lectures < self.course.credits:
+            for day in days:
+                if day_count[day] >= MAX_SESSIONS_PER_DAY:
+                    for timeslot in timeslots_by_day[day]:
+                        self.reject(timeslot.pk, 'day_limit')
+
+    def search_labs(self, free):
+        """
+        Place each lab block in the first room and day (one lab per day) with
+        enough consecutive free slots. Return the ids of the timeslots used.
+        """
+        index, length = self.index, self.course.lab_length
+        used, lab_days = set(), set()
+        for _ in range(self.course.lab_blocks):
+            placement = None
+            for day in timegrid.get_grid().days:
+                if day in lab_days:
+                    continue
+                day_free = free & index.day_masks.get(day, 0)
+                for room in self.rooms:
+                    starts = index.block_starts(day_free & ~self.room_masks[room.pk], length)
+                    if starts:
+                        placement = room, index.block((starts & -starts).bit_length() - 1, length)
+                        break
+                if placement:
+                    lab_days.add(day)
+                    break
+            if placement is None:
+                self.reject(0, 'no_lab_block')
+                continue
+
+            room, block = placement
+            mask = index.mask(timeslot.pk for timeslot in block)
+            self.room_masks[room.pk] |= mask
+            free &= ~mask
+            for timeslot in block:
+                self.result.placements.append((timeslot, room))
+                used.add(timeslot.pk)
+                if self.trace:
+                    self.result.trace.append((timeslot.pk, 'placed', room.pk))
+        return used
+
+    def write(self):
+        if not self.result.placements:
+            return
+        term_id = self.course.term_id or Term.get_active().pk
+        chosen = {(timeslot.pk, room.pk) for timeslot, room in self.result.placements}
+        booked = Schedule.all_terms.filter(
+            term_id=term_id,
+            timeslot_id__in={timeslot_id for timeslot_id, _ in chosen},
+            classroom_id__in={room_id for _, room_id in chosen},
+        ).values_list('timeslot_id', 'classroom_id')
+        if chosen.intersection(booked):
+            raise StalePlan
+        # bulk_create skips Schedule.save(), so the term is set here
+        Schedule.objects.bulk_create([
+            Schedule(course=self.course, timeslot=timeslot, classroom=room, term_id=term_id)
+            for timeslot, room in self.result.placements
+        ])
+        grids.invalidate()
+        events.schedules_changed(self.course.pk, [timeslot.pk for timeslot, _ in self.result.placements])
+
+    def save_run(self, user=None):
+        result = self.result
+        return SchedulingRun.objects.create(
+            course=self.course,
+            department_id=self.course.department_id,
+            created_by=user,
+            required=result.required,
+            placed=result.placed,
+            load_ms=result.timings['load'] * 1000,
+            search_ms=result.timings['search'] * 1000,
+            write_ms=result.timings['write'] * 1000,
+            rejections=result.rejections,
+            trace=pack_trace(result.trace),
+        )
+
+
+@transaction.atomic
+def schedule_course(course, user=None, trace=None):
+    """Place the sessions of ``course`` and return a ``SchedulingResult``."""
+    try:
+        return CourseScheduler(course, trace=trace).run(user=user)
+    except StalePlan:
+        # Another process booked one of the rooms: search again on fresh occupancy
+        occupancy.clear()
+        return CourseScheduler(course, trace=trace).run(user=user)
+
+
+def preview_course(course):
+    """Plan the sessions of ``course`` without writing anything."""
+    return CourseScheduler(course, trace=False).run(dry_run=True)
+
+
+@transaction.atomic
+def commit_plan(course, plan, fingerprint):
+    """
+    Write a plan from ``preview_course`` if nothing it was computed from has
+    changed; raise ``StalePlan`` otherwise.
+    """
+    # Serialize commits of the same course, so a plan cannot be written twice
+    Course.all_terms.select_for_update().filter(pk=course.pk).exists()
+    return CourseScheduler(course, trace=False).commit(plan, fingerprint)
+
+
+def bottleneck_summary(runs):
+    """
+    Aggregate stored runs into rejection totals and the resources that
+    blocked the most candidate slots: busy teachers, busy batches and
+    timeslots without a free room.
+    """
+    totals = Counter()
+    teachers = Counter()
+    batches = Counter()
+    roomless_slots = Counter()
+    timings = Counter()
+    required = placed = 0
+    runs = list(runs)
+
+    for run in runs:
+        required += run.required
+        placed += run.placed
+        totals.update(run.rejections)
+        timings.update({'load': run.load_ms, 'search': run.search_ms, 'write': run.write_ms})
+        for timeslot_id, outcome, resource_id in unpack_trace(run.trace):
+            if outcome in ('teacher_busy', 'teacher_unavailable'):
+                teachers[resource_id] += 1
+            elif outcome == 'batch_busy':
+                batches[resource_id] += 1
+            elif outcome == 'no_room':
+                roomless_slots[timeslot_id] += 1
+
+    return {
+        'runs': len(runs),
+        'required': required,
+        'placed': placed,
+        'rejections': {reason: totals[reason] for reason in REJECTIONS},
+        'avg_ms': {phase: timings[phase] / len(runs) if runs else 0.0 for phase in ('load', 'search', 'write')},
+        'teachers': teachers.most_common(10),
+        'batches': batches.most_common(10),
+        'roomless_slots': roomless_slots.most_common(10),
+    }
@@ -30,7 +30,7 @@ class BatchSerializer(serializers.ModelSerializer):
 class ClassroomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Classroom
-        fields = ['id', 'name', 'capacity', 'availability']
+        fields = ['id', 'name', 'capacity', 'availability', 'department']
 
 class TimeSlotSerializer(serializers.ModelSerializer):
     class Meta:
@@ -52,7 +52,10 @@ class CourseSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Course
-        fields = ['id', 'name', 'code', 'credits', 'teacher', 'department', 'batches', 'elective_students']
+        fields = [
+            'id', 'name', 'code', 'credits', 'lab_blocks', 'lab_length', 'teacher', 'department', 'batches',
+            'elective_seats', 'elective_seats_taken', 'elective_students',
+        ]
 
 class ScheduleSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
@@ -0,0 +1,136 @@
+"""
+Session and message storage benchmark for the ``benchmark_sessions`` command.
+
+Runs the main flows of a student, a teacher and an HOD (login, their pages,
+an action that leaves a flash message, logout) with Django's test client,
+once per session profile in ``settings.ATMA_SESSION_PROFILES``, and counts
+per request the queries, the database writes and the ``django_session``
+reads and writes. Halfway through each flow an admin saves a department,
+a roles change that must not cost the sessions anything (``authz``).
+
+Everything happens in one transaction that is rolled back, on a synthetic
+institution seeded inside it, so the real data is never touched.
+"""
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import grids, occupancy, synthetic
+from .models import Course, Department, User
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+ROLES_CHANGED = 'roles_changed'  # Flow step: an admin saves a department
+
+
+def flows(data):
+    """``{flow: [(endpoint, method, path, post data) or ROLES_CHANGED]}`` for the seeded users."""
+    department = Department.objects.get(code=data['departments'][0])
+    hod = department.hod
+    teacher = User.objects.filter(department=department, role='teacher').exclude(pk=hod.pk).first()
+    student = User.objects.filter(department=department, role='student').first()
+    course = Course.objects.filter(department=department, teacher=teacher).first()
+    own = Course.objects.filter(department=department, teacher=hod).first() or course
+
+    def login(user):
+        return ('login', 'post', reverse('login'), {'username': user.username, 'password': data['password']})
+
+    def get(endpoint, *args):
+        return (endpoint, 'get', reverse(endpoint, args=args), None)
+
+    logout = ('logout', 'get', reverse('logout'), None)
+    return {
+        'student': [
+            login(student), get('home'), get('view_timetable'), get('course_detail', course.pk),
+            ROLES_CHANGED,
+            get('view_timetable'), get('student_electives'), get('course_detail', course.pk), logout,
+        ],
+        'teacher': [
+            login(teacher), get('teacher_home'), get('teacher_timetable'), get('free_rooms'),
+            ROLES_CHANGED,
+            ('teacher_availability_cell', 'post', reverse('teacher_availability_cell', args=['Monday', 'A']), {}),
+            get('teacher_availability'), get('teacher_timetable'), logout,
+        ],
+        'hod': [
+            login(hod), get('home'), get('hod-manage-courses'),
+            ('hod-schedule-course', 'post', reverse('hod-schedule-course', args=[own.pk]), {}),
+            get('hod-manage-courses'),  # Shows the flash message
+            ROLES_CHANGED,
+            get('hod-scheduling-bottlenecks'), get('hod-manage-courses'), logout,
+        ],
+    }
+
+
+def run_flow(steps, department):
+    """Run one flow in a fresh client and count the queries of each request."""
+    client = Client()
+    counts = {'requests': 0, 'queries': 0, 'writes': 0, 'session_reads': 0, 'session_writes': 0}
+    for step in steps:
+        if step == ROLES_CHANGED:
+            department.save()
+            continue
+        endpoint, method, path, data = step
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(path, data)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{endpoint} returned {response.status_code}")
+        counts['requests'] += 1
+        for query in queries.captured_queries:
+            sql = query['sql']
+            counts['queries'] += 1
+            write = sql.startswith(WRITES)
+            counts['writes'] += write
+            if '"django_session"' in sql:
+                counts['session_writes' if write else 'session_reads'] += 1
+    return counts
+
+
+def _per_request(counts):
+    requests = counts['requests'] or 1
+    return {key: round(value / requests, 2) for key, value in counts.items() if key != 'requests'}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_profile(profile, size='small', seed=0):
+    """Run every flow with one session profile and report the counts."""
+    report = None
+    try:
+        with override_settings(ALLOWED_HOSTS=['testserver'], **settings.ATMA_SESSION_PROFILES[profile]), \
+                transaction.atomic():
+            data = synthetic.generate(prefix='sessionbench', size=size, seed=seed)
+            department = Department.objects.get(code=data['departments'][0])
+            report = {'flows': {}}
+            totals = {}
+            for name, steps in flows(data).items():
+                counts = run_flow(steps, department)
+                report['flows'][name] = {**counts, 'per_request': _per_request(counts)}
+                for key, value in counts.items():
+                    totals[key] = totals.get(key, 0) + value
+            report['total'] = {**totals, 'per_request': _per_request(totals)}
+            raise _Rollback
+    except _Rollback:
+        pass
+    finally:
+        # The index may hold rows of the rolled-back transaction
+        occupancy.clear()
+        grids.invalidate()
+    return report
+
+
+def run(profiles, size='small', seed=0):
+    """Run every profile and compare each one's totals with the first."""
+    start = time.perf_counter()
+    reports = {profile: run_profile(profile, size=size, seed=seed) for profile in profiles}
+    base = reports[profiles[0]]['total']
+    for report in reports.values():
+        report['change'] = {
+            key: report['total'][key] - base[key]
+            for key in ('queries', 'writes', 'session_reads', 'session_writes')
+        }
+    return {'size': size, 'elapsed_s': round(time.perf_counter() - start, 2), 'profiles': reports}
@@ -1,32 +1,85 @@
-from django.db.models.signals import post_migrate
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_migrate, pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import TimeSlot, Department, Batch
+from . import electives, events, grids, usernames
+from .models import TimeSlot, Department, Batch, Classroom, Student, Course, Schedule, Term, User, TeacherAvailability
 
 @receiver(post_migrate)
 def populate_timeslots(sender, **kwargs):
     if sender.name != "timetable":
         return
 
-    DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-    SLOT_CHOICES = {
-        'A': ('08:00:00', '09:00:00'),
-        'B': ('09:00:00', '10:00:00'),
-        'C': ('10:00:00', '11:00:00'),
-        'D': ('11:00:00', '12:00:00'),
-        'E': ('12:00:00', '13:00:00'),
-        'F': ('14:00:00', '15:00:00'),
-        'G': ('15:00:00', '16:00:00'),
-        'H': ('16:00:00', '17:00:00'),
-    }
-
-    # Check if timeslots are already populated
-    if TimeSlot.objects.exists():
-        return  # Skip population if data exists
-
-    for day in DAYS_OF_WEEK:
-        for slot, (start, end) in SLOT_CHOICES.items():
-            TimeSlot.objects.create(
-                day=day,
-                slot=slot,
-            )
-    print("TimeSlots populated successfully.")
\ No newline at end of file
+    # Rows for every cell of the configured grid (bulk_create skips signals)
+    if any(TimeSlot.objects.sync_grid()):
+        grids.invalidate()
+        print("TimeSlots populated successfully.")
+    # Availability masks written on an older grid layout
+    TeacherAvailability.objects.fit_grid()
+
+
+# Any change that can alter what a timetable grid shows makes cached grids stale
+TIMETABLE_MODELS = (Department, Batch, Classroom, TimeSlot, Course, Schedule, Term)
+
+def invalidate_timetable_grids(sender, **kwargs):
+    grids.invalidate()
+
+for model in TIMETABLE_MODELS:
+    post_save.connect(invalidate_timetable_grids, sender=model, dispatch_uid=f'grids_save_{model.__name__}')
+    post_delete.connect(invalidate_timetable_grids, sender=model, dispatch_uid=f'grids_delete_{model.__name__}')
+
+for through in (Course.batches.through, Course.elective_students.through):
+    m2m_changed.connect(invalidate_timetable_grids, sender=through, dispatch_uid=f'grids_m2m_{through.__name__}')
+
+# A student's batch only shows in that student's grid: signups and profile
+# saves leave every other grid (and the occupancy index) cached
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def forget_student_grid(sender, instance, **kwargs):
+    transaction.on_commit(partial(grids.forget_student, instance.pk), robust=True)
+
+
+# Enrollments changed through the M2M API (admin) bypass the seat counter
+@receiver(m2m_changed, sender=Course.elective_students.through)
+def recount_elective_seats(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_electives = list(sender.objects.filter(student=instance).values_list('course_id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            course_ids = [instance.pk]
+        elif action == 'post_clear':
+            course_ids = instance.__dict__.pop('_cleared_electives', [])
+        else:
+            course_ids = pk_set
+        electives.recount_seats(course_ids)
+
+
+# Live timetable updates: publish the changed cells once the change commits
+@receiver(pre_save, sender=Schedule)
+def publish_moved_schedule(sender, instance, **kwargs):
+    if not instance._state.adding:
+        old = Schedule.all_terms.filter(pk=instance.pk).values_list('course_id', 'timeslot_id').first()
+        if old and old != (instance.course_id, instance.timeslot_id):
+            events.schedules_changed(old[0], [old[1]])
+
+@receiver(post_save, sender=Schedule)
+def publish_saved_schedule(sender, instance, **kwargs):
+    events.schedules_changed(instance.course_id, [instance.timeslot_id])
+
+@receiver(pre_delete, sender=Schedule)
+def publish_deleted_schedule(sender, instance, origin=None, **kwargs):
+    # A deleted course publishes all its sessions at once
+    if getattr(origin, 'model', type(origin)) is not Course:
+        events.schedules_changed(instance.course_id, [instance.timeslot_id])
+
+@receiver(pre_delete, sender=Course)
+def publish_deleted_course(sender, instance, origin=None, **kwargs):
+    events.course_deleted(instance)
+
+
+# Names created in this process are taken right away, before the next refresh
+@receiver(post_save, sender=User)
+def add_username(sender, instance, created, **kwargs):
+    if created:
+        usernames.index.add(instance.username)
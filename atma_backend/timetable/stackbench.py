@@ -0,0 +1,112 @@
+"""
+In-process WSGI vs ASGI throughput benchmark for the ``benchmark_stacks``
+command.
+
+A plan is a list of ``(endpoint, path, cookie header)`` GET requests. The
+WSGI runner pushes it through Django's ``WSGIHandler`` from a pool of
+``concurrency`` threads, the way a threaded WSGI server would. The ASGI
+runner sends it through ``ASGIHandler`` as coroutines on one event loop,
+with at most ``concurrency`` requests in flight. No sockets are involved,
+so the numbers compare the two Django stacks, not the servers in front.
+
+Both runners return samples in the format of ``loadtest.summarize()``.
+"""
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+HOST = 'localhost'
+
+
+def run_wsgi(plan, concurrency):
+    app = WSGIHandler()
+
+    def call(item):
+        endpoint, path, cookie = item
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': HOST,
+            'HTTP_COOKIE': cookie,
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+        }
+        status = []
+        start = time.perf_counter()
+        result = app(environ, lambda line, headers, exc_info=None: status.append(int(line[:3])))
+        try:
+            b''.join(result)
+        finally:
+            result.close()  # Sends request_finished, which closes the DB connection
+        return (endpoint, time.perf_counter() - start, status[0] == 200, status[0])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(call, plan))
+    return samples, time.perf_counter() - start
+
+
+async def _asgi_call(app, item, semaphore):
+    endpoint, path, cookie = item
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    body_sent = False
+    finished = asyncio.Event()
+    status = 0
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()  # Django listens for a disconnect until the response is done
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    async with semaphore:
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        elapsed = time.perf_counter() - start
+    finished.set()
+    return (endpoint, elapsed, status == 200, status)
+
+
+def run_asgi(plan, concurrency):
+    app = ASGIHandler()
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(_asgi_call(app, item, semaphore) for item in plan))
+
+    start = time.perf_counter()
+    samples = asyncio.run(main())
+    return samples, time.perf_counter() - start
+
+
+RUNNERS = {'wsgi': run_wsgi, 'asgi': run_asgi}
@@ -0,0 +1,25 @@
+// Live timetable: listen for changed cells and re-fetch only those cells.
+// The stream is served by timetable_events (see timetable/events.py).
+document.addEventListener('DOMContentLoaded', function() {
+  const timetable = document.querySelector('[data-events-url]');
+  if (!timetable || !window.EventSource) {
+    return;
+  }
+
+  const source = new EventSource(timetable.dataset.eventsUrl);
+
+  source.addEventListener('cells', function(event) {
+    JSON.parse(event.data).cells.forEach(function([day, slot]) {
+      const cell = document.getElementById(`cell-${day}-${slot}`);
+      if (cell) {
+        htmx.ajax('GET', cell.dataset.cellUrl, {target: cell, swap: 'outerHTML'});
+      }
+    });
+  });
+
+  // Too much changed (or the change log expired): reload the whole page
+  source.addEventListener('reset', function() {
+    source.close();
+    window.location.reload();
+  });
+});
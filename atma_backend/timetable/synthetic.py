@@ -0,0 +1,216 @@
+"""
+Synthetic institution generator for load tests and benchmarks.
+
+``generate()`` creates departments with HODs, teachers, students, classrooms
+and courses, and places every course into a clash-free timetable in memory,
+all through ``bulk_create``. Everything it creates is tagged with a prefix
+(usernames, department codes, course codes and classroom names) so
+``remove()`` can delete it again without touching real data.
+
+All synthetic users share one password, which is hashed only once.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from . import events, grids
+from .models import User, Student, Department, Classroom, Course, Schedule, TimeSlot, Term
+from .provisioning import bulk_create_departments
+
+SIZES = {
+    'small': {'departments': 2, 'teachers': 4, 'courses_per_teacher': 2, 'students_per_batch': 10, 'classrooms': 8},
+    'medium': {'departments': 4, 'teachers': 8, 'courses_per_teacher': 2, 'students_per_batch': 30, 'classrooms': 20},
+    'large': {'departments': 10, 'teachers': 12, 'courses_per_teacher': 3, 'students_per_batch': 60, 'classrooms': 60},
+}
+
+DEFAULT_PASSWORD = 'synthetic-pass'
+
+
+@transaction.atomic
+def generate(prefix='syn', size='small', seed=0, password=DEFAULT_PASSWORD, electives_per_student=1,
+             batch_size=500, **overrides):
+    """
+    Create a synthetic institution and return a summary dict with the
+    usernames per role, the created course ids and row counts.
+
+    ``size`` picks one of ``SIZES``; keyword ``overrides`` replace single
+    values (e.g. ``students_per_batch=5``).
+    """
+    config = {**SIZES[size], **overrides}
+    rng = random.Random(seed)
+    tag = prefix.upper()
+    password_hash = make_password(password)
+    term = Term.get_active()
+
+    # Departments and their year-wise batches
+    departments = bulk_create_departments(
+        [
+            Department(name=f"Synthetic {tag} {d}", code=f"{tag}{d}")
+            for d in range(config['departments'])
+        ],
+        batch_size=batch_size,
+    )
+    batches = {
+        department.pk: list(department.batches.order_by('year'))
+        for department in departments
+    }
+
+    # Teachers; the first teacher of each department is its HOD
+    teachers = User.objects.bulk_create(
+        [
+            User(
+                username=f"{prefix}_t{d}_{i}", password=password_hash, role='teacher',
+                first_name='Teacher', last_name=f"{d}-{i}", department=department,
+            )
+            for d, department in enumerate(departments)
+            for i in range(config['teachers'])
+        ],
+        batch_size=batch_size,
+    )
+    teachers = _with_pks(teachers)
+    teachers_by_department = {}
+    for teacher in teachers:
+        teachers_by_department.setdefault(teacher.department_id, []).append(teacher)
+    for department in departments:
+        department.hod = teachers_by_department[department.pk][0]
+    Department.objects.bulk_update(departments, ['hod'])
+
+    # Students, one profile per user
+    student_rows = [
+        (User(
+            username=f"{prefix}_s{d}_{batch.year}_{i}", password=password_hash, role='student',
+            first_name='Student', last_name=f"{d}-{batch.year}-{i}", department=department,
+        ), batch)
+        for d, department in enumerate(departments)
+        for batch in batches[department.pk]
+        for i in range(config['students_per_batch'])
+    ]
+    student_users = _with_pks(User.objects.bulk_create([user for user, _ in student_rows], batch_size=batch_size))
+    students = Student.objects.bulk_create(
+        [Student(user=user, batch=batch) for user, (_, batch) in zip(student_users, student_rows)],
+        batch_size=batch_size,
+    )
+
+    classrooms = _with_pks(Classroom.objects.bulk_create(
+        [
+            Classroom(name=f"{tag} Room {r}", capacity=rng.choice([40, 60, 80, 120]))
+            for r in range(config['classrooms'])
+        ],
+        batch_size=batch_size,
+    ), key='name')
+
+    # Courses: each teacher teaches a few courses, spread over the batches
+    courses = []
+    course_batch = []
+    for d, department in enumerate(departments):
+        department_batches = batches[department.pk]
+        n = 0
+        for teacher in teachers_by_department[department.pk]:
+            for _ in range(config['courses_per_teacher']):
+                courses.append(Course(
+                    term=term, name=f"Synthetic Course {d}-{n}", code=f"{tag}{d}-{n}",
+                    credits=rng.choice([2, 3, 3, 4]), teacher=teacher, department=department,
+                ))
+                course_batch.append(department_batches[n % len(department_batches)])
+                n += 1
+    courses = _with_pks(Course.objects.bulk_create(courses, batch_size=batch_size), key='code')
+    Course.batches.through.objects.bulk_create(
+        [
+            Course.batches.through(course_id=course.pk, batch_id=batch.pk)
+            for course, batch in zip(courses, course_batch)
+        ],
+        batch_size=batch_size,
+    )
+
+    # Clash-free placement: a teacher, batch or room holds one session per slot
+    timeslots = list(TimeSlot.objects.in_grid().order_by('day', 'slot'))
+    busy = set()
+    schedules = []
+    course_slots = {}
+    for course, batch in zip(courses, course_batch):
+        candidates = timeslots[:]
+        rng.shuffle(candidates)
+        placed = 0
+        for timeslot in candidates:
+            if placed == course.credits:
+                break
+            if ('teacher', course.teacher_id, timeslot.pk) in busy or ('batch', batch.pk, timeslot.pk) in busy:
+                continue
+            room = next((c for c in classrooms if ('room', c.pk, timeslot.pk) not in busy), None)
+            if room is None:
+                continue
+            busy.update({
+                ('teacher', course.teacher_id, timeslot.pk),
+                ('batch', batch.pk, timeslot.pk),
+                ('room', room.pk, timeslot.pk),
+            })
+            schedules.append(Schedule(course=course, timeslot=timeslot, classroom=room, term_id=term.pk))
+            course_slots.setdefault(course.pk, set()).add(timeslot.pk)
+            placed += 1
+    Schedule.objects.bulk_create(schedules, batch_size=batch_size)
+
+    # Electives: courses of other batches in the department that do not clash
+    batch_slots = {}
+    for course, batch in zip(courses, course_batch):
+        batch_slots.setdefault(batch.pk, set()).update(course_slots.get(course.pk, ()))
+    courses_by_department = {}
+    for course, batch in zip(courses, course_batch):
+        courses_by_department.setdefault(course.department_id, []).append((course, batch))
+
+    electives = []
+    for student in students:
+        taken = set(batch_slots.get(student.batch_id, ()))
+        options = [
+            course for course, batch in courses_by_department[student.batch.department_id]
+            if batch.pk != student.batch_id
+        ]
+        rng.shuffle(options)
+        chosen = 0
+        for course in options:
+            if chosen == electives_per_student:
+                break
+            slots = course_slots.get(course.pk, set())
+            if slots and not slots & taken:
+                electives.append(Course.elective_students.through(course_id=course.pk, student_id=student.pk))
+                taken |= slots
+                chosen += 1
+    Course.elective_students.through.objects.bulk_create(electives, batch_size=batch_size)
+
+    grids.invalidate()  # bulk_create does not send post_save
+
+    return {
+        'prefix': prefix,
+        'password': password,
+        'departments': [department.code for department in departments],
+        'hods': [department.hod.username for department in departments],
+        'teachers': [teacher.username for teacher in teachers],
+        'students': [user.username for user in student_users],
+        'courses': [course.pk for course in courses],
+        'classrooms': len(classrooms),
+        'schedules': len(schedules),
+        'electives': len(electives),
+    }
+
+
+def _with_pks(objects, key='username'):
+    """Fill in primary keys on backends that cannot return them from bulk_create."""
+    if all(obj.pk is not None for obj in objects):
+        return objects
+    manager = type(objects[0])._default_manager
+    ids = dict(manager.filter(**{f'{key}__in': [getattr(obj, key) for obj in objects]}).values_list(key, 'id'))
+    for obj in objects:
+        obj.pk = ids[getattr(obj, key)]
+    return objects
+
+
+@transaction.atomic
+def remove(prefix='syn'):
+    """Delete everything ``generate()`` created with this prefix."""
+    tag = prefix.upper()
+    with events.bulk_change(reset=False):
+        Course.all_terms.filter(code__startswith=tag, department__code__startswith=tag).delete()
+        User.objects.filter(username__startswith=f"{prefix}_").delete()
+        Department.objects.filter(code__startswith=tag, name__startswith=f"Synthetic {tag} ").delete()
+        Classroom.objects.filter(name__startswith=f"{tag} Room ").delete()
+    grids.invalidate()
@@ -1,5 +1,6 @@
 from django import template
-from django.template.defaultfilters import stringfilter
+
+from timetable import timegrid
 
 register = template.Library()
 
@@ -14,8 +15,9 @@ def split(value, key):
 def filter_by_day(schedules, day):
     """
     Filters schedules by day.
+    Done in Python so prefetched schedules do not trigger a query per day.
     """
-    return schedules.filter(timeslot__day=day)
+    return [schedule for schedule in schedules if schedule.timeslot.day == day]
 
 @register.filter
 def get_item(dictionary, key):
@@ -40,4 +42,9 @@ def add_attribute(field, attr_value):
 @register.filter(name='add')
 def add_strings(value, arg):
     """Concatenate strings."""
-    return str(value) + str(arg)
\ No newline at end of file
+    return str(value) + str(arg)
+
+@register.simple_tag
+def week_days():
+    """The days of the configured time grid, in order."""
+    return timegrid.get_grid().days
@@ -0,0 +1,79 @@
+"""
+Helpers for moving closed academic terms out of the hot timetable tables.
+
+Archiving copies a term's courses and schedules into ``ArchivedCourse`` and
+``ArchivedSchedule`` with a few set-based queries and then deletes the
+originals, so ``Course`` and ``Schedule`` only ever hold live terms.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import events
+from .models import Course, Schedule, ArchivedCourse, ArchivedSchedule
+
+
+@transaction.atomic
+def archive_term(term):
+    """
+    Move every course and schedule of ``term`` into the archive tables.
+    Returns ``(courses, schedules)`` archived.
+    """
+    if term.is_active:
+        raise ValueError("The active term cannot be archived.")
+
+    batch_ids = defaultdict(list)
+    for course_id, batch_id in Course.batches.through.objects.filter(
+        course__term=term
+    ).values_list('course_id', 'batch_id'):
+        batch_ids[course_id].append(batch_id)
+
+    elective_ids = defaultdict(list)
+    for course_id, student_id in Course.elective_students.through.objects.filter(
+        course__term=term
+    ).values_list('course_id', 'student_id'):
+        elective_ids[course_id].append(student_id)
+
+    archived_courses = [
+        ArchivedCourse(
+            term=term,
+            original_id=course['id'],
+            name=course['name'],
+            code=course['code'],
+            credits=course['credits'],
+            lab_blocks=course['lab_blocks'],
+            lab_length=course['lab_length'],
+            teacher_id=course['teacher_id'],
+            department_id=course['department_id'],
+            batch_ids=batch_ids[course['id']],
+            elective_student_ids=elective_ids[course['id']],
+        )
+        for course in Course.all_terms.filter(term=term).values(
+            'id', 'name', 'code', 'credits', 'lab_blocks', 'lab_length', 'teacher_id', 'department_id'
+        )
+    ]
+    ArchivedCourse.objects.bulk_create(archived_courses, batch_size=500)
+    archived_ids = dict(
+        ArchivedCourse.objects.filter(term=term).values_list('original_id', 'id')
+    )
+
+    archived_schedules = [
+        ArchivedSchedule(
+            term=term,
+            course_id=archived_ids[course_id],
+            day=day,
+            slot=slot,
+            classroom_name=classroom_name,
+        )
+        for course_id, day, slot, classroom_name in Schedule.all_terms.filter(term=term).values_list(
+            'course_id', 'timeslot__day', 'timeslot__slot', 'classroom__name'
+        )
+    ]
+    ArchivedSchedule.objects.bulk_create(archived_schedules, batch_size=500)
+
+    # Closed terms are not on anyone's live timetable
+    with events.bulk_change(reset=False):
+        Schedule.all_terms.filter(term=term).delete()
+        Course.all_terms.filter(term=term).delete()
+
+    return len(archived_courses), len(archived_schedules)
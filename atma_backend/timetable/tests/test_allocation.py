@@ -0,0 +1,118 @@
+import itertools
+import random
+
+from django.test import TestCase
+from timetable import allocation, grids
+from timetable.models import User, Department, Batch, Course, Classroom, Schedule, Student, TimeSlot
+
+
+class MinCostAssignmentTestCase(TestCase):
+    """Tests for the Hungarian algorithm"""
+
+    def test_matches_brute_force(self):
+        """Test that the assignment is optimal on small random matrices"""
+        rng = random.Random(7)
+        for n, m in [(1, 1), (2, 3), (3, 3), (4, 6)]:
+            costs = [[rng.randint(0, 50) for _ in range(m)] for _ in range(n)]
+            assignment = allocation.min_cost_assignment(costs)
+            self.assertEqual(len(set(assignment)), n)
+            best = min(
+                sum(costs[i][j] for i, j in enumerate(columns))
+                for columns in itertools.permutations(range(m), n)
+            )
+            self.assertEqual(sum(costs[i][j] for i, j in enumerate(assignment)), best)
+
+
+class RoomAllocationTestCase(TestCase):
+    """Tests for the institution-wide room allocator"""
+
+    def setUp(self):
+        self.slot = {(ts.day, ts.slot): ts for ts in TimeSlot.objects.all()}
+        self.cs = self.department('CS')
+        self.ee = self.department('EE')
+
+    def department(self, code):
+        department = Department.objects.create(name=code, code=code)
+        department.teacher = User.objects.create(username=f'{code}-teacher', role='teacher', department=department)
+        return department
+
+    def course(self, department, code, students):
+        batch = Batch.objects.create(department=department, year=5 + Batch.objects.filter(year__gte=5).count())
+        for i in range(students):
+            user = User.objects.create(username=f'{code}-{i}', role='student', department=department)
+            Student.objects.create(user=user, batch=batch)
+        course = Course.objects.create(
+            name=code, code=code, credits=2, teacher=department.teacher, department=department
+        )
+        course.batches.add(batch)
+        return course
+
+    def place(self, course, cell, room):
+        return Schedule.objects.create(course=course, timeslot=self.slot[cell], classroom=room)
+
+    def test_big_classes_get_big_rooms(self):
+        """Test that sessions swap rooms so every class fits, then the swap is written"""
+        small = Classroom.objects.create(name='Small', capacity=10)
+        large = Classroom.objects.create(name='Large', capacity=60)
+        big = self.place(self.course(self.cs, 'CS-BIG', 40), ('Monday', 'A'), small)
+        tiny = self.place(self.course(self.ee, 'EE-TINY', 5), ('Monday', 'A'), large)
+
+        report = allocation.allocate()
+        self.assertEqual(report['moved'], 2)
+        self.assertEqual(report['seats_short'], {'before': 30, 'after': 0})
+        big.refresh_from_db()
+        self.assertEqual(big.classroom, small)  # Nothing written without apply
+
+        version = grids.current_version()
+        report = allocation.allocate(apply=True)
+        big.refresh_from_db()
+        tiny.refresh_from_db()
+        self.assertEqual((big.classroom, tiny.classroom), (large, small))
+        self.assertNotEqual(grids.current_version(), version)
+        self.assertEqual(allocation.allocate()['moved'], 0)
+
+    def test_lab_block_keeps_one_room(self):
+        """Test that a lab block moves as a whole instead of changing rooms between its slots"""
+        mid = Classroom.objects.create(name='Mid', capacity=40)
+        large = Classroom.objects.create(name='Large', capacity=60)
+        lab = self.course(self.cs, 'CS-LAB', 40)
+        Course.objects.filter(pk=lab.pk).update(lab_blocks=1, lab_length=2)
+        sessions = [self.place(lab, ('Monday', slot), large) for slot in 'AB']
+        self.place(self.course(self.ee, 'EE-MID', 40), ('Monday', 'A'), mid)
+
+        report = allocation.allocate(apply=True)
+        self.assertEqual(report['seats_short']['after'], 0)
+        rooms = {Schedule.objects.get(pk=session.pk).classroom for session in sessions}
+        self.assertEqual(len(rooms), 1)
+        monday_a = Schedule.objects.filter(timeslot=self.slot['Monday', 'A'])
+        self.assertEqual(monday_a.values('classroom').distinct().count(), 2)
+
+    def test_home_rooms_and_unavailable_rooms(self):
+        """Test that sessions leave unavailable rooms and prefer their department's rooms"""
+        cs_room = Classroom.objects.create(name='CS Hall', capacity=30, department=self.cs)
+        shared = Classroom.objects.create(name='Shared', capacity=30)
+        closed = Classroom.objects.create(name='Closed', capacity=30, availability=False)
+        ee_session = self.place(self.course(self.ee, 'EE-1', 20), ('Monday', 'A'), cs_room)
+        cs_session = self.place(self.course(self.cs, 'CS-1', 20), ('Monday', 'A'), closed)
+
+        report = allocation.allocate(apply=True)
+        self.assertEqual(report['poorly_placed'], {'before': 2, 'after': 0})
+        ee_session.refresh_from_db()
+        cs_session.refresh_from_db()
+        self.assertEqual((cs_session.classroom, ee_session.classroom), (cs_room, shared))
+
+    def test_bad_rooms_are_shared_fairly(self):
+        """Test that when good rooms run short, the bad ones rotate between departments"""
+        good = Classroom.objects.create(name='Good', capacity=50)
+        bad = Classroom.objects.create(name='Bad', capacity=20)
+        cs = self.course(self.cs, 'CS-1', 30)
+        ee = self.course(self.ee, 'EE-1', 30)
+        for cell in [('Monday', 'A'), ('Tuesday', 'A')]:
+            self.place(cs, cell, good)
+            self.place(ee, cell, bad)
+
+        report = allocation.allocate()
+        self.assertEqual(report['poorly_placed']['after'], 2)
+        departments = report['departments']
+        self.assertEqual((departments['CS']['poorly_placed_after'], departments['EE']['poorly_placed_after']), (1, 1))
+        self.assertEqual(departments['CS']['quota'], 1)
@@ -0,0 +1,120 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from timetable import api, electives
+from timetable.models import User, Department, Batch, Course, Classroom, Schedule, Student, TimeSlot
+
+
+class ApiTestCase(TestCase):
+    """Tests for the JWT-authenticated JSON API"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create_user(
+            username='teacher', password='pw', role='teacher', department=self.department,
+            first_name='Ada', last_name='Lovelace',
+        )
+        self.other_teacher = User.objects.create_user(username='other', password='pw', role='teacher', department=self.department)
+        self.batch = Batch.objects.filter(department=self.department).order_by('year').first()
+        user = User.objects.create_user(username='student', password='pw', role='student', department=self.department)
+        self.student = Student.objects.create(user=user, batch=self.batch)
+        room = Classroom.objects.create(name='Room 101', capacity=50)
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=1, teacher=self.teacher, department=self.department,
+        )
+        self.course.batches.add(self.batch)
+        self.slot = TimeSlot.objects.get(day='Tuesday', slot='B')
+        Schedule.objects.create(course=self.course, timeslot=self.slot, classroom=room)
+        self.room = room
+
+    def token(self, username):
+        response = self.client.post(reverse('api-token'), {'username': username, 'password': 'pw'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get(self, url, access, **headers):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {access}", **headers)
+
+    def test_token_pair_carries_claims(self):
+        """Test that the access token holds the role and batch the views need"""
+        tokens = self.token('student')
+        claims = RefreshToken(tokens['refresh']).access_token
+        self.assertEqual(claims[api.ROLE_CLAIM], 'student')
+        self.assertEqual(claims[api.BATCH_CLAIM], self.batch.pk)
+
+    def test_requests_need_a_token(self):
+        """Test that the API refuses requests without a valid bearer token"""
+        self.assertEqual(self.client.get(reverse('api-my-timetable')).status_code, 401)
+        self.assertEqual(self.get(reverse('api-my-timetable'), 'not-a-token').status_code, 401)
+
+    def test_timetable_grid_without_session_or_user_lookup(self):
+        """Test that a cached timetable is served with no session or user query"""
+        access = self.token('student')['access']
+        self.get(reverse('api-my-timetable'), access)  # Warm the grid cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(reverse('api-my-timetable'), access)
+        self.assertEqual(queries.captured_queries, [])
+
+        payload = response.json()
+        day = payload['days'].index('Tuesday')
+        slot = [code for code, _, _ in payload['slots']].index('B')
+        self.assertEqual(payload['cells'][day][slot], [self.course.pk, self.room.pk])
+        self.assertEqual(payload['courses'][str(self.course.pk)]['code'], 'CS201')
+        self.assertEqual(payload['slots'][0], ['A', '08:00', '09:00'])
+
+    def test_unchanged_timetable_is_not_modified(self):
+        """Test that the ETag answers 304 until the timetable changes"""
+        access = self.token('teacher')['access']
+        response = self.get(reverse('api-my-timetable'), access)
+        etag = response['ETag']
+        self.assertEqual(self.get(reverse('api-my-timetable'), access, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Schedule.objects.create(course=self.course, timeslot=TimeSlot.objects.get(day='Monday', slot='A'), classroom=self.room)
+        response = self.get(reverse('api-my-timetable'), access, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_elective_registration_changes_the_etag(self):
+        """Test that registering for an elective, which bumps no timetable version, still changes the ETag"""
+        elective = Course.objects.create(
+            name='Graphics', code='CS301', credits=1, elective_seats=5,
+            teacher=self.other_teacher, department=self.department,
+        )
+        Schedule.objects.create(course=elective, timeslot=TimeSlot.objects.get(day='Monday', slot='A'), classroom=self.room)
+        access = self.token('student')['access']
+        etag = self.get(reverse('api-my-timetable'), access)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            electives.register(self.student, elective.pk)
+        response = self.get(reverse('api-my-timetable'), access, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(str(elective.pk), response.json()['courses'])
+
+    def test_my_courses(self):
+        """Test that students get their core courses and teachers the courses they teach"""
+        courses = self.get(reverse('api-my-courses'), self.token('student')['access']).json()['courses']
+        self.assertEqual([(c['code'], c['elective']) for c in courses], [('CS201', False)])
+        courses = self.get(reverse('api-my-courses'), self.token('other')['access']).json()['courses']
+        self.assertEqual(courses, [])
+
+    def test_course_detail(self):
+        """Test the course payload and that teachers only see their own courses"""
+        url = reverse('api-course-detail', args=[self.course.pk])
+        payload = self.get(url, self.token('student')['access']).json()
+        self.assertEqual(payload['teacher'], 'Ada Lovelace')
+        self.assertEqual(payload['sessions'], [['Tuesday', 'B', 'Room 101']])
+        self.assertEqual(self.get(url, self.token('other')['access']).status_code, 403)
+
+    def test_refresh_reissues_current_claims(self):
+        """Test that refreshing picks up a role change and refuses deactivated users"""
+        refresh = self.token('other')['refresh']
+        User.objects.filter(username='other').update(role='admin')
+        response = self.client.post(reverse('api-token-refresh'), {'refresh': refresh}, content_type='application/json')
+        access = AccessToken(response.json()['access'])
+        self.assertEqual(access[api.ROLE_CLAIM], 'admin')
+
+        User.objects.filter(username='other').update(is_active=False)
+        response = self.client.post(reverse('api-token-refresh'), {'refresh': refresh}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
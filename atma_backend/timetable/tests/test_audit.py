@@ -0,0 +1,97 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from timetable.audit import run_audit
+from timetable.models import User, Department, Batch, Course, Student, TimeSlot, Classroom, Schedule
+
+class AuditTestCase(TestCase):
+    """Tests for the timetable integrity audit"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.batch = Batch.objects.get(department=self.department, year=1)
+
+        # The audit never logs in, so users don't need passwords
+        self.teacher1 = User.objects.create(username='teacher1', role='teacher', department=self.department)
+        self.teacher2 = User.objects.create(username='teacher2', role='teacher', department=self.department)
+        student_user = User.objects.create(username='student', role='student', department=self.department)
+        self.student = Student.objects.create(user=student_user, batch=self.batch)
+
+        self.room1 = Classroom.objects.create(name='Room 101', capacity=50)
+        self.room2 = Classroom.objects.create(name='Room 102', capacity=50)
+        self.closed_room = Classroom.objects.create(name='Room 103', capacity=50, availability=False)
+
+        self.core = Course.objects.create(
+            name='Core', code='CS101', credits=3, teacher=self.teacher1, department=self.department
+        )
+        self.core.batches.add(self.batch)
+        self.elective = Course.objects.create(
+            name='Elective', code='CS301', credits=3, teacher=self.teacher2, department=self.department
+        )
+        self.elective.elective_students.add(self.student)
+
+        self.monday_a = TimeSlot.objects.get(day='Monday', slot='A')
+        self.monday_b = TimeSlot.objects.get(day='Monday', slot='B')
+
+    def test_clean_timetable(self):
+        """Test that a conflict-free timetable reports no violations"""
+        Schedule.objects.create(course=self.core, timeslot=self.monday_a, classroom=self.room1)
+        Schedule.objects.create(course=self.elective, timeslot=self.monday_b, classroom=self.room1)
+
+        report = run_audit()
+        self.assertEqual(report['total_violations'], 0)
+
+    def test_detects_every_violation_class(self):
+        """Test that each violation class is found"""
+        # The student's elective collides with their core course (a room cannot be
+        # double-booked any more: the unique constraint on Schedule refuses it)
+        Schedule.objects.create(course=self.core, timeslot=self.monday_a, classroom=self.room1)
+        Schedule.objects.create(course=self.elective, timeslot=self.monday_a, classroom=self.room2)
+
+        # teacher1 and the batch get a second course in Monday B
+        other = Course.objects.create(
+            name='Other', code='CS102', credits=1, teacher=self.teacher1, department=self.department
+        )
+        other.batches.add(self.batch)
+        Schedule.objects.create(course=self.core, timeslot=self.monday_b, classroom=self.room1)
+        Schedule.objects.create(course=other, timeslot=self.monday_b, classroom=self.room2)
+        Schedule.objects.create(course=other, timeslot=TimeSlot.objects.get(day='Friday', slot='H'),
+                                classroom=self.closed_room)
+
+        report = run_audit()
+        counts = report['counts']
+        self.assertEqual(counts['room_double_booked'], 0)
+        self.assertEqual(counts['teacher_clash'], 1)
+        self.assertEqual(counts['batch_clash'], 1)
+        self.assertEqual(counts['elective_clash'], 1)
+        self.assertEqual(counts['unavailable_room'], 1)
+        self.assertEqual(counts['over_scheduled'], 1)
+
+        clash = report['violations']['elective_clash'][0]
+        self.assertEqual(clash['student_id'], self.student.pk)
+        self.assertEqual((clash['day'], clash['slot']), ('Monday', 'A'))
+
+    def test_audit_uses_one_query_per_check(self):
+        """Test that the audit is set-based rather than a Python loop"""
+        for slot in TimeSlot.objects.all()[:10]:
+            Schedule.objects.create(course=self.core, timeslot=slot, classroom=self.room1)
+
+        with self.assertNumQueries(6):
+            run_audit()
+
+    def test_audit_command(self):
+        """Test the JSON output and exit status of the audit command"""
+        Schedule.objects.create(course=self.core, timeslot=self.monday_a, classroom=self.room1)
+        Schedule.objects.create(course=self.elective, timeslot=self.monday_a, classroom=self.room2)
+
+        out = StringIO()
+        call_command('audit_timetable', '--check', 'elective_clash', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(list(report['violations']), ['elective_clash'])
+        self.assertEqual(report['total_violations'], 1)
+
+        with self.assertRaises(CommandError):
+            call_command('audit_timetable', '--fail-on-violation', stdout=StringIO())
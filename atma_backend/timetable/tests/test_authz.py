@@ -0,0 +1,72 @@
+from unittest import mock
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import path, reverse
+from timetable import authz, urls
+from timetable.models import User, Department
+from timetable.views import async_views
+
+# The async views as asgi.py routes them, next to every other page
+urlpatterns = [path('async/teacher/timetable/', async_views.teacher_timetable)] + urls.urlpatterns
+
+
+class AuthzTestCase(TestCase):
+    """Tests for the request-scoped role and HOD authorization"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.hod = User.objects.create_user(username='hod', password='pw', role='teacher', department=self.department)
+        self.teacher = User.objects.create_user(username='teacher', password='pw', role='teacher', department=self.department)
+        self.department.hod = self.hod
+        self.department.save()
+
+    def test_access_is_worked_out_once_per_request(self):
+        """Test that the view and the navbar share one HOD check"""
+        self.client.login(username='hod', password='pw')
+        with mock.patch('timetable.authz.resolve', wraps=authz.resolve) as resolve:
+            self.assertEqual(self.client.get(reverse('hod-manage-courses')).status_code, 200)
+        self.assertEqual(resolve.call_count, 1)
+
+    def test_changing_the_hod_invalidates_sessions(self):
+        """Test that a new HOD takes effect on the next request of an existing session"""
+        self.client.login(username='hod', password='pw')
+        self.assertEqual(self.client.get(reverse('hod-manage-courses')).status_code, 200)
+
+        self.department.hod = self.teacher
+        self.department.save()
+        response = self.client.get(reverse('hod-manage-courses'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+    def test_model_backend_sessions_stay_logged_in(self):
+        """Test that sessions logged in through Django's ModelBackend still work"""
+        self.client.force_login(self.hod, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('hod-manage-courses')).status_code, 200)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_async_page_renders_the_navbar_on_asgi(self):
+        """Test that an async view's navbar works out the access without a sync query"""
+        client = AsyncClient()
+        await client.aforce_login(self.hod)
+        response = await client.get('/async/teacher/timetable/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('hod-manage-courses'))
+
+    def test_non_hod_is_turned_away(self):
+        """Test that pages redirect home and HTMX endpoints answer 403 for non-HODs"""
+        self.client.login(username='teacher', password='pw')
+        response = self.client.get(reverse('hod-manage-courses'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        response = self.client.get(reverse('htmx-course-list'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_anonymous_htmx_request_is_sent_to_login(self):
+        """Test that anonymous users of HTMX endpoints are redirected to the login page"""
+        response = self.client.get(reverse('htmx-course-list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('/login/'))
+
+    def test_backend_loads_the_department(self):
+        """Test that the user comes with their department in a single query"""
+        backend = authz.DepartmentModelBackend()
+        with self.assertNumQueries(1):
+            user = backend.get_user(self.hod.pk)
+            self.assertEqual(user.department.hod_id, self.hod.pk)
@@ -0,0 +1,97 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from timetable import grids, schedbench, scheduler, timegrid
+from timetable.models import User, Department, Course, Classroom, TeacherAvailability, TimeSlot
+
+class TeacherAvailabilityTestCase(TestCase):
+    """Tests for teacher unavailable/preferred slots and their use in scheduling"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=3, teacher=self.teacher, department=self.department
+        )
+        Classroom.objects.create(name='Room 101', capacity=50)
+        self.client = Client()
+        self.client.force_login(self.teacher)
+
+    def set_cells(self, state, cells):
+        availability, _ = TeacherAvailability.objects.get_or_create(teacher=self.teacher)
+        for day, slot in cells:
+            availability.set_state(TimeSlot.grid_position(day, slot), state)
+        availability.save()
+
+    def test_masks_round_trip(self):
+        """Test that masks wider than 64 bits survive the database"""
+        availability = TeacherAvailability.objects.create(teacher=self.teacher, unavailable=1 << 70, preferred=5)
+        availability.refresh_from_db()
+        self.assertEqual(availability.unavailable, 1 << 70)
+        self.assertEqual(availability.preferred, 5)
+        self.assertEqual(availability.state(0), TeacherAvailability.PREFERRED)
+        self.assertEqual(availability.state(1), TeacherAvailability.AVAILABLE)
+
+    def test_unavailable_slots_are_never_used(self):
+        """Test that unavailable slots are a hard constraint"""
+        mornings = [(day, slot) for day in timegrid.get_grid().days for slot in 'ABCD']
+        self.set_cells(TeacherAvailability.UNAVAILABLE, mornings)
+        result = scheduler.schedule_course(self.course, trace=False)
+        self.assertEqual(result.placed, 3)
+        self.assertEqual(result.rejections['teacher_unavailable'], len(mornings))
+        for timeslot, _ in result.placements:
+            self.assertNotIn((timeslot.day, timeslot.slot), mornings)
+
+    def test_preferred_slots_come_first(self):
+        """Test that preferred slots are filled before earlier free ones"""
+        preferred = [('Monday', 'G'), ('Tuesday', 'H'), ('Wednesday', 'F')]
+        self.set_cells(TeacherAvailability.PREFERRED, preferred)
+        result = scheduler.schedule_course(self.course, trace=False)
+        self.assertEqual(sorted((ts.day, ts.slot) for ts, _ in result.placements), sorted(preferred))
+
+    def test_editor_cycles_cell_states(self):
+        """Test that the grid editor cycles available, preferred, unavailable"""
+        self.assertContains(self.client.get(reverse('teacher_availability')), 'availability-Monday-A')
+        url = reverse('teacher_availability_cell', args=['Monday', 'A'])
+        position = TimeSlot.grid_position('Monday', 'A')
+
+        response = self.client.post(url, HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'availability-preferred')
+        self.assertEqual(self.teacher.slot_availability.state(position), TeacherAvailability.PREFERRED)
+
+        self.client.post(url, HTTP_HX_REQUEST='true')
+        self.teacher.slot_availability.refresh_from_db()
+        self.assertEqual(self.teacher.slot_availability.state(position), TeacherAvailability.UNAVAILABLE)
+
+        response = self.client.post(url, HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'availability-available')
+
+    def test_masks_follow_grid_shape_change(self):
+        """Test that a grid with more slots per day moves the stored bits to the same cells"""
+        self.set_cells(TeacherAvailability.UNAVAILABLE, [('Tuesday', 'A'), ('Friday', 'H')])
+        self.set_cells(TeacherAvailability.PREFERRED, [('Monday', 'C')])
+        friday_h = TimeSlot.grid_position('Friday', 'H')
+
+        with override_settings(ATMA_TIME_GRID=schedbench.grid_config(4, 12)):
+            TimeSlot.objects.sync_grid()
+            grids.invalidate()
+            availability = TeacherAvailability.objects.get(teacher=self.teacher)
+            self.assertTrue(availability.fit_grid())
+            self.assertEqual(availability.state(TimeSlot.grid_position('Tuesday', 'A')), TeacherAvailability.UNAVAILABLE)
+            self.assertEqual(availability.state(TimeSlot.grid_position('Monday', 'C')), TeacherAvailability.PREFERRED)
+            # Friday is gone; the cell its old bit now lands on stays free
+            self.assertEqual(availability.unavailable, 1 << TimeSlot.grid_position('Tuesday', 'A'))
+            self.assertEqual(availability.state(friday_h), TeacherAvailability.AVAILABLE)
+
+            self.assertEqual(TeacherAvailability.objects.fit_grid(), 1)
+            self.assertEqual(TeacherAvailability.objects.fit_grid(), 0)
+            cells = [(ts.day, ts.slot) for ts, _ in scheduler.preview_course(self.course).placements]
+            self.assertIn(('Monday', 'C'), cells)
+            self.assertNotIn(('Tuesday', 'A'), cells)
+
+    def test_editor_rejects_unknown_cells_and_students(self):
+        """Test that unknown cells 404 and students are refused"""
+        self.assertEqual(self.client.post(reverse('teacher_availability_cell', args=['Sunday', 'A'])).status_code, 404)
+        student = User.objects.create(username='student', role='student', department=self.department)
+        self.client.force_login(student)
+        response = self.client.post(reverse('teacher_availability_cell', args=['Monday', 'A']))
+        self.assertEqual(response.status_code, 403)
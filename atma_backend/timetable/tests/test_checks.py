@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase, override_settings
+from timetable import checks
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}}
+
+
+class SharedCacheCheckTestCase(SimpleTestCase):
+    """Tests for the shared cache system check"""
+
+    @override_settings(ATMA_WORKERS=1, CACHES=LOCMEM)
+    def test_single_worker_may_use_local_memory(self):
+        """Test that one worker process can keep the per-process cache"""
+        self.assertEqual(checks.check_shared_cache(None), [])
+
+    @override_settings(ATMA_WORKERS=4, CACHES=LOCMEM)
+    def test_several_workers_need_a_shared_cache(self):
+        """Test that several workers with a per-process cache fail the check"""
+        self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['timetable.E001'])
+
+    @override_settings(ATMA_WORKERS=4, CACHES=REDIS)
+    def test_shared_cache_passes(self):
+        """Test that a shared cache satisfies the check for several workers"""
+        self.assertEqual(checks.check_shared_cache(None), [])
@@ -0,0 +1,153 @@
+from django.test import TestCase
+from django.urls import reverse
+from timetable import electives, grids, regbench
+from timetable.models import User, Department, Batch, Course, Classroom, Schedule, Student, TimeSlot
+
+
+class ElectiveRegistrationTestCase(TestCase):
+    """Tests for elective registration with seat limits and clash checks"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        first, second = Batch.objects.filter(department=self.department).order_by('year')[:2]
+        self.students = []
+        for i in range(3):
+            user = User.objects.create(username=f'student{i}', role='student', department=self.department)
+            self.students.append(Student.objects.create(user=user, batch=first))
+        self.student = self.students[0]
+        self.slot = {(ts.day, ts.slot): ts for ts in TimeSlot.objects.all()}
+
+        self.core = self.course('CS101', first, [('Monday', 'A')])
+        self.elective = self.course('CS301', second, [('Tuesday', 'B')], seats=2)
+        self.clashing = self.course('CS302', second, [('Monday', 'A')], seats=10)
+
+    def course(self, code, batch, cells, seats=None):
+        course = Course.objects.create(
+            name=code, code=code, credits=len(cells), elective_seats=seats,
+            teacher=self.teacher, department=self.department,
+        )
+        course.batches.add(batch)
+        room = Classroom.objects.create(name=f'Room {code}', capacity=50)  # Clashing courses need their own rooms
+        for cell in cells:
+            Schedule.objects.create(course=course, timeslot=self.slot[cell], classroom=room)
+        return course
+
+    def test_register_takes_a_seat(self):
+        """Test that registering adds the enrollment and counts the seat"""
+        electives.register(self.student, self.elective.pk)
+        self.elective.refresh_from_db()
+        self.assertEqual(self.elective.elective_seats_taken, 1)
+        self.assertEqual(self.elective.elective_seats_left, 1)
+        self.assertTrue(self.elective.is_elective_for(self.student))
+
+    def test_seats_are_never_oversold(self):
+        """Test that the conditional update turns away registrations once the seats are gone"""
+        electives.register(self.students[0], self.elective.pk)
+        electives.register(self.students[1], self.elective.pk)
+        with self.assertRaises(electives.ElectiveFull):
+            electives.register(self.students[2], self.elective.pk)
+        self.elective.refresh_from_db()
+        self.assertEqual(self.elective.elective_seats_taken, 2)
+        self.assertEqual(self.elective.elective_students.count(), 2)
+        self.assertEqual(regbench.oversold('CS'), [])
+
+    def test_clash_is_rejected(self):
+        """Test that an elective meeting in a slot of the student's timetable is refused"""
+        with self.assertRaises(electives.ElectiveClash):
+            electives.register(self.student, self.clashing.pk)
+        self.clashing.refresh_from_db()
+        self.assertEqual(self.clashing.elective_seats_taken, 0)
+        rows = {course.code: (registered, clash) for course, registered, clash in electives.options(self.student)}
+        self.assertEqual(rows, {'CS301': (False, None), 'CS302': (False, 'CS101')})
+
+    def test_electives_clash_with_each_other(self):
+        """Test that a registered elective is part of the student's timetable for later checks"""
+        other = self.course('CS303', self.elective.batches.get(), [('Tuesday', 'B')], seats=10)
+        electives.register(self.student, self.elective.pk)
+        with self.assertRaises(electives.ElectiveClash):
+            electives.register(self.student, other.pk)
+
+    def test_closed_core_and_repeat_registrations(self):
+        """Test that core, closed and already registered courses cannot be registered"""
+        self.core.elective_seats = 10
+        self.core.save()
+        with self.assertRaises(electives.RegistrationError):
+            electives.register(self.student, self.core.pk)
+        self.elective.elective_seats = None
+        self.elective.save()
+        with self.assertRaises(electives.RegistrationError):
+            electives.register(self.student, self.elective.pk)
+
+        self.elective.elective_seats = 2
+        self.elective.save()
+        electives.register(self.student, self.elective.pk)
+        with self.assertRaises(electives.RegistrationError):
+            electives.register(self.student, self.elective.pk)
+
+    def test_drop_gives_the_seat_back(self):
+        """Test that dropping removes the enrollment and frees the seat"""
+        electives.register(self.student, self.elective.pk)
+        electives.drop(self.student, self.elective.pk)
+        self.elective.refresh_from_db()
+        self.assertEqual(self.elective.elective_seats_taken, 0)
+        with self.assertRaises(electives.RegistrationError):
+            electives.drop(self.student, self.elective.pk)
+
+    def test_admin_changes_recount_seats(self):
+        """Test that enrollments changed through the M2M API keep the counter in step"""
+        self.elective.elective_students.add(self.students[0], self.students[1])
+        self.elective.refresh_from_db()
+        self.assertEqual(self.elective.elective_seats_taken, 2)
+        self.students[0].elective_courses.clear()
+        self.elective.refresh_from_db()
+        self.assertEqual(self.elective.elective_seats_taken, 1)
+
+    def test_registration_refreshes_the_student_grid(self):
+        """Test that only the registering student's cached grid is dropped"""
+        version = grids.current_version()
+        self.assertEqual(grids.student_grid(self.student)['Tuesday'], {})
+        with self.captureOnCommitCallbacks(execute=True):
+            electives.register(self.student, self.elective.pk)
+        self.assertEqual(grids.current_version(), version)
+        self.assertEqual(grids.student_grid(self.student)['Tuesday']['B'].course, self.elective)
+
+    def test_registration_views(self):
+        """Test the elective page and registering over HTMX"""
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('student_electives'))
+        self.assertContains(response, 'CS301')
+        self.assertContains(response, 'Clashes with CS101')
+
+        response = self.client.post(reverse('register_elective', args=[self.elective.pk]), HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'student/partials/elective_list.html')
+        self.assertContains(response, 'Registered for CS301.')
+        response = self.client.post(reverse('register_elective', args=[self.clashing.pk]), HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'CS302 clashes with your timetable.')
+        response = self.client.post(reverse('drop_elective', args=[self.elective.pk]), HTTP_HX_REQUEST='true')
+        self.assertContains(response, 'Dropped CS301.')
+
+        self.client.force_login(self.teacher)
+        response = self.client.post(reverse('register_elective', args=[self.elective.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class RegistrationBenchmarkTestCase(TestCase):
+    """Tests for the registration benchmark setup and report"""
+
+    def test_prepare_and_summarize(self):
+        """Test that seats are opened below demand and registrations never oversell"""
+        plan = regbench.prepare('rb', seed=1)
+        self.assertTrue(Course.objects.filter(code__startswith='RB', elective_seats__isnull=False).exists())
+        samples = []
+        for student, course_ids in plan:
+            for course_id in course_ids:
+                try:
+                    electives.register(student, course_id)
+                    samples.append(('registered', 0.001))
+                    break
+                except electives.ElectiveFull:
+                    samples.append(('full', 0.001))
+        report = regbench.summarize(samples, 1.0)
+        self.assertGreater(report['outcomes']['registered'], 0)
+        self.assertEqual(regbench.oversold('rb'), [])
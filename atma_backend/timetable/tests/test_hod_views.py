@@ -133,6 +133,31 @@ class HODViewsTestCase(TestCase):
         # Check that course is deleted
         self.assertFalse(Course.objects.filter(id=self.course.id).exists())
     
+    def test_schedule_course_htmx_returns_row(self):
+        """Test that an HTMX schedule request returns only the course row and toasts"""
+        self.client.login(username='hod', password='hod123')
+        response = self.client.post(
+            reverse('hod-schedule-course', kwargs={'course_id': self.course.id}), HTTP_HX_REQUEST='true'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'<tr id="course-row-{self.course.id}">')
+        self.assertContains(response, 'Room 101')
+        self.assertContains(response, "Successfully added 3 schedules")
+        self.assertNotContains(response, 'course-list-body')
+    
+    def test_delete_course_htmx_restores_empty_state(self):
+        """Test that deleting the last course over HTMX sends the empty state and a toast"""
+        self.client.login(username='hod', password='hod123')
+        response = self.client.delete(
+            reverse('hod-delete-course', kwargs={'course_id': self.course.id}), HTTP_HX_REQUEST='true'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'id="course-list-empty"')
+        self.assertContains(response, "Course deleted successfully.")
+        self.assertFalse(Course.objects.filter(id=self.course.id).exists())
+    
     def test_htmx_create_course_get(self):
         """Test HTMX course creation form (GET request)"""
         self.client.login(username='hod', password='hod123')
@@ -165,9 +190,12 @@ class HODViewsTestCase(TestCase):
             HTTP_HX_REQUEST='true'  # Simulate HTMX request
         )
         
-        # Should have HX-Redirect header
-        self.assertIn('HX-Redirect', response)
-        self.assertEqual(response['HX-Redirect'], reverse('hod-manage-courses'))
+        # Should append only the new row and close the modal
+        self.assertTemplateUsed(response, 'hod/partials/course_action.html')
+        self.assertContains(response, 'hx-swap-oob="beforeend:#course-list-body"')
+        self.assertContains(response, 'CS999')
+        self.assertContains(response, "created successfully")
+        self.assertEqual(response['HX-Trigger'], 'closeModal')
         
         # Check that a new course was created
         self.assertEqual(Course.objects.count(), course_count + 1)
@@ -209,9 +237,11 @@ class HODViewsTestCase(TestCase):
             HTTP_HX_REQUEST='true'  # Simulate HTMX request
         )
         
-        # Should have HX-Redirect header
-        self.assertIn('HX-Redirect', response)
-        self.assertEqual(response['HX-Redirect'], reverse('hod-manage-courses'))
+        # Should replace only this course's row out of band
+        self.assertContains(response, f'id="course-row-{self.course.id}" hx-swap-oob="true"')
+        self.assertContains(response, 'Updated Course Name')
+        self.assertContains(response, 'hx-swap-oob="beforeend:#toast-container"')
+        self.assertEqual(response['HX-Trigger'], 'closeModal')
         
         # Verify the course was updated
         updated_course = Course.objects.get(id=self.course.id)
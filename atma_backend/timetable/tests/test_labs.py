@@ -0,0 +1,74 @@
+from django.test import TestCase
+from timetable import occupancy, scheduler
+from timetable.forms import CreateCourseForm
+from timetable.models import User, Department, Course, Classroom, Schedule, TeacherAvailability, TimeSlot
+
+class LabSchedulingTestCase(TestCase):
+    """Tests for lab blocks of consecutive slots"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.course = Course.objects.create(
+            name='Operating Systems', code='CS301', credits=3, lab_blocks=1, lab_length=3,
+            teacher=self.teacher, department=self.department,
+        )
+        self.room = Classroom.objects.create(name='Lab 1', capacity=40)
+        self.slot = {(ts.day, ts.slot): ts for ts in TimeSlot.objects.all()}
+
+    def only_free(self, cells):
+        """Make the teacher unavailable everywhere except ``cells``."""
+        unavailable = 0
+        for day, slot in self.slot:
+            if (day, slot) not in cells:
+                unavailable |= 1 << TimeSlot.grid_position(day, slot)
+        TeacherAvailability.objects.create(teacher=self.teacher, unavailable=unavailable)
+
+    def test_block_starts_respect_breaks(self):
+        """Test that runs of free slots never cross lunch or the end of a day"""
+        index = occupancy.get_index()
+        mask = index.mask(self.slot[('Monday', s)].pk for s in 'DEFG')
+        starts = index.block_starts(mask, 2)
+        self.assertEqual(starts, index.mask([self.slot[('Monday', 'D')].pk, self.slot[('Monday', 'F')].pk]))
+        self.assertEqual(index.block_starts(mask, 3), 0)
+        evening_and_morning = index.mask([self.slot[('Monday', 'H')].pk, self.slot[('Tuesday', 'A')].pk])
+        self.assertEqual(index.block_starts(evening_and_morning, 2), 0)
+
+    def test_lab_is_one_contiguous_block(self):
+        """Test that a lab takes consecutive slots of one day in one room"""
+        result = scheduler.schedule_course(self.course, trace=False)
+        self.assertEqual(result.required, 6)
+        self.assertEqual(result.placed, 6)
+        lab = [(ts, room) for ts, room in result.placements][:3]
+        self.assertEqual(len({ts.day for ts, _ in lab}), 1)
+        self.assertEqual(len({room for _, room in lab}), 1)
+        for (first, _), (second, _) in zip(lab, lab[1:]):
+            self.assertEqual(first.end_time, second.start_time)
+        self.assertEqual(Schedule.objects.filter(course=self.course).count(), 6)
+
+    def test_lab_skips_the_lunch_break(self):
+        """Test that a lab around lunch lands after it"""
+        self.course.credits = 0
+        self.only_free({('Monday', s) for s in 'DEFGH'})
+        result = scheduler.schedule_course(self.course, trace=False)
+        self.assertEqual([ts.slot for ts, _ in result.placements], ['F', 'G', 'H'])
+
+    def test_lab_without_a_block_is_rejected(self):
+        """Test that scattered free slots are not used for a lab"""
+        self.course.credits = 0
+        self.only_free({('Monday', 'A'), ('Monday', 'C'), ('Tuesday', 'E'), ('Tuesday', 'F')})
+        result = scheduler.schedule_course(self.course, trace=False)
+        self.assertEqual(result.placed, 0)
+        self.assertEqual(result.rejections['no_lab_block'], 1)
+
+    def test_form_accepts_lab_pattern(self):
+        """Test that the course form stores the lab pattern and limits labs to one per day"""
+        data = {'name': 'Networks', 'code': 'CS302', 'credits': 3, 'teacher': self.teacher.pk,
+                'batches': [self.department.batches.first().pk], 'lab_blocks': 1, 'lab_length': 2}
+        form = CreateCourseForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse(CreateCourseForm({**data, 'lab_blocks': 6}).is_valid())
+        del data['lab_blocks'], data['lab_length']
+        form = CreateCourseForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save(commit=False).lab_blocks, 0)
@@ -0,0 +1,162 @@
+import asyncio
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, Client, AsyncClient
+from django.urls import reverse
+from timetable import events, scheduler
+from timetable.models import User, Department, Batch, Course, Classroom, Schedule, Student, TimeSlot
+
+
+class LiveUpdatesTestCase(TestCase):
+    """Tests for the live timetable channels and the SSE endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.batch = Batch.objects.get(department=self.department, year=1)
+        self.student_user = User.objects.create(username='student', role='student', department=self.department)
+        self.student = Student.objects.create(user=self.student_user, batch=self.batch)
+        self.elective_user = User.objects.create(username='elective', role='student', department=self.department)
+        self.elective = Student.objects.create(
+            user=self.elective_user, batch=Batch.objects.get(department=self.department, year=2)
+        )
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=2, teacher=self.teacher, department=self.department
+        )
+        self.course.batches.add(self.batch)
+        self.course.elective_students.add(self.elective)
+        self.room = Classroom.objects.create(name='Room 101', capacity=50)
+        self.slot = TimeSlot.objects.order_by('pk').first()
+        self.cell = (self.slot.day, self.slot.slot)
+
+    def changes(self, channels, cursor):
+        cells, reset, cursor = events.read(channels, cursor)
+        return cells, reset
+
+    def test_schedule_change_reaches_batch_teacher_and_electives(self):
+        """Test that a saved schedule is published to everyone who sees it, once committed"""
+        channels = events.student_channels(self.student) + events.teacher_channels(self.teacher) \
+            + events.student_channels(self.elective)
+        cursor = events.parse_cursor(events.current_cursor(channels), channels)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Schedule.objects.create(course=self.course, timeslot=self.slot, classroom=self.room)
+            self.assertEqual(self.changes(channels, cursor), (set(), False))  # Not committed yet
+        self.assertEqual(len(callbacks), 1)
+
+        for channel in ('batch:%d' % self.batch.pk, 'teacher:%d' % self.teacher.pk, 'student:%d' % self.elective.pk):
+            self.assertEqual(self.changes([channel], cursor), ({self.cell}, False), channel)
+        other_batch = 'batch:%d' % self.elective.batch_id
+        self.assertEqual(self.changes([other_batch], cursor), (set(), False))
+
+    def test_scheduler_and_course_deletion_publish(self):
+        """Test that bulk-created and cascade-deleted sessions are published in one event each"""
+        channel = 'batch:%d' % self.batch.pk
+        cursor = {channel: 0}
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            result = scheduler.schedule_course(self.course, trace=False)
+        self.assertEqual(len(callbacks), 1)
+        placed = {(timeslot.day, timeslot.slot) for timeslot, _ in result.placements}
+        cells, reset, cursor = events.read([channel], cursor)
+        self.assertEqual(cells, placed)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.course.delete()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(events.read([channel], cursor)[:2], (placed, False))
+
+    def test_bulk_change_resets_and_gaps_reset(self):
+        """Test that bulk rewrites and lost log entries make clients reset"""
+        channels = events.student_channels(self.student)
+        cursor = events.parse_cursor(events.current_cursor(channels), channels)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with events.bulk_change():
+                Schedule.objects.create(course=self.course, timeslot=self.slot, classroom=self.room)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.changes(channels, cursor), (set(), True))
+
+        channel = 'batch:%d' % self.batch.pk
+        for _ in range(events.LOG_SIZE + 1):
+            events.publish({channel: {self.cell}})
+        self.assertEqual(self.changes([channel], {channel: 0}), (set(), True))
+
+        # A sequence taken but not logged yet is waited for, not treated as a gap
+        seq = cache.get(events._seq_key(channel))
+        cache.incr(events._seq_key(channel))
+        self.assertEqual(events.read([channel], {channel: seq}), (set(), False, {channel: seq}))
+
+    def test_polling_response_and_cell(self):
+        """Test the one-shot stream served under WSGI and the cell partial"""
+        client = Client()
+        client.force_login(self.student_user)
+        cursor = client.get(reverse('view_timetable')).context['events_cursor']
+        Schedule.objects.create(course=self.course, timeslot=self.slot, classroom=self.room)
+        events.publish({'batch:%d' % self.batch.pk: {self.cell}})
+
+        response = client.get(reverse('timetable_events'), {'cursor': cursor})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        self.assertIn(f'retry: {events.RETRY_MS}', body)
+        self.assertIn('event: cells\ndata: {"cells": [["%s", "%s"]]}' % self.cell, body)
+
+        # Reconnecting with the last id sees nothing new
+        last_id = body.split('id: ')[1].split('\n')[0]
+        body = client.get(reverse('timetable_events'), HTTP_LAST_EVENT_ID=last_id).content.decode()
+        self.assertNotIn('event:', body)
+
+        response = client.get(reverse('timetable_cell', args=self.cell))
+        self.assertContains(response, f'id="cell-{self.cell[0]}-{self.cell[1]}"')
+        self.assertContains(response, 'CS201')
+        self.assertEqual(client.get(reverse('timetable_cell', args=['Someday', 'A'])).status_code, 404)
+
+    def test_users_without_timetable_get_no_stream(self):
+        """Test that EventSource is told not to reconnect for users without a timetable"""
+        client = Client()
+        client.force_login(User.objects.create(username='new', role='student', department=self.department))
+        self.assertEqual(client.get(reverse('timetable_events')).status_code, 204)
+
+    async def test_asgi_stream_wakes_on_publish(self):
+        """Test that an open stream is woken by the broker instead of waiting for its poll"""
+        client = AsyncClient()
+        await client.aforce_login(self.teacher)
+        response = await client.get(reverse('timetable_events'))
+        content = response.streaming_content
+        self.assertEqual(await anext(content), f'retry: {events.RETRY_MS}\n\n'.encode())
+        self.assertEqual(await anext(content), b': keep-alive\n\n')
+        self.assertEqual(events.broker.connections(), 1)
+
+        events.publish({'teacher:%d' % self.teacher.pk: {self.cell}})
+        message = await asyncio.wait_for(anext(content), timeout=2)
+        self.assertIn(b'event: cells', message)
+
+        # A client disconnect cancels the response task, which unsubscribes the stream
+        waiting = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(events.broker.connections(), 0)
+
+    async def test_asgi_stream_polls_for_other_processes(self):
+        """Test that a change published by another process, which the broker never sees, arrives on the next poll"""
+        client = AsyncClient()
+        await client.aforce_login(self.teacher)
+        with mock.patch.object(events, 'POLL_INTERVAL', 0.05):
+            response = await client.get(reverse('timetable_events'))
+            content = response.streaming_content
+            await anext(content)  # retry
+            await anext(content)  # keep-alive
+
+            with mock.patch.object(events.broker, 'notify'):
+                events.publish({'teacher:%d' % self.teacher.pk: {self.cell}})
+            message = await asyncio.wait_for(anext(content), timeout=2)
+            self.assertIn(b'event: cells', message)
+
+            waiting = asyncio.ensure_future(anext(content))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+        self.assertEqual(events.broker.connections(), 0)
@@ -0,0 +1,97 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, LiveServerTestCase
+from timetable import loadtest, synthetic
+from timetable.audit import run_audit
+from timetable.models import User, Department, Course, Schedule, Classroom, Student
+
+class SyntheticDataTestCase(TestCase):
+    """Tests for the synthetic institution generator"""
+
+    def test_generate_and_remove(self):
+        """Test that generated data is complete, clash-free and removable"""
+        summary = synthetic.generate(prefix='t', size='small', students_per_batch=2)
+
+        self.assertEqual(len(summary['departments']), 2)
+        self.assertEqual(len(summary['hods']), 2)
+        self.assertEqual(Student.objects.filter(user__username__startswith='t_').count(), 16)
+        self.assertEqual(Department.objects.get(code='T0').hod.username, summary['hods'][0])
+        self.assertEqual(Schedule.objects.count(), summary['schedules'])
+        self.assertGreater(summary['electives'], 0)
+        self.assertEqual(run_audit()['total_violations'], 0)
+        self.assertTrue(User.objects.get(username=summary['students'][0]).check_password(synthetic.DEFAULT_PASSWORD))
+
+        synthetic.remove('t')
+        self.assertFalse(User.objects.filter(username__startswith='t_').exists())
+        self.assertFalse(Department.objects.exists())
+        self.assertFalse(Course.all_terms.exists())
+        self.assertFalse(Classroom.objects.exists())
+
+    def test_generate_is_deterministic(self):
+        """Test that the same seed produces the same timetable"""
+        def placements():
+            return sorted(Schedule.objects.values_list('course__code', 'timeslot_id', 'classroom__name'))
+
+        synthetic.generate(prefix='t', seed=3, students_per_batch=1)
+        first = placements()
+        synthetic.remove('t')
+        synthetic.generate(prefix='t', seed=3, students_per_batch=1)
+        self.assertEqual(placements(), first)
+
+
+class LoadTestStatsTestCase(TestCase):
+    """Tests for the load-test report aggregation"""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 95), 95)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([], 50), 0.0)
+
+    def test_summarize(self):
+        """Test per-endpoint throughput and error rates"""
+        samples = [
+            ('view_timetable', 0.010, True, 200),
+            ('view_timetable', 0.030, True, 200),
+            ('login', 0.200, False, 200),
+            ('login', 0.100, True, 302),
+        ]
+        report = loadtest.summarize(samples, elapsed=2.0)
+
+        self.assertEqual(report['overall']['requests'], 4)
+        self.assertEqual(report['overall']['throughput_rps'], 2.0)
+        self.assertEqual(report['endpoints']['login']['error_rate'], 0.5)
+        self.assertEqual(report['endpoints']['login']['status_codes'], {'200': 1, '302': 1})
+        self.assertEqual(report['endpoints']['view_timetable']['latency_ms']['p50'], 10.0)
+        self.assertEqual(report['endpoints']['view_timetable']['latency_ms']['max'], 30.0)
+
+
+class LoadTestCommandTestCase(LiveServerTestCase):
+    """Tests for the loadtest command against a live server"""
+
+    def test_loadtest_command(self):
+        """Test that every flow runs without errors and the data is cleaned up"""
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command(
+            'loadtest', url=self.live_server_url, users=2, hod_share=0.5, iterations=1,
+            output=path, stderr=io.StringIO(),
+        )
+        with open(path) as f:
+            report = json.load(f)
+
+        self.assertEqual(report['config']['hod_users'], 1)
+        self.assertEqual(report['overall']['errors'], 0)
+        self.assertEqual(
+            set(report['endpoints']),
+            {'login_page', 'login', 'view_timetable', 'course_detail', 'manage_courses', 'schedule_course'},
+        )
+        self.assertFalse(User.objects.filter(username__startswith='loadtest_').exists())
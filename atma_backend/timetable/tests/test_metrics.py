@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from timetable import grids, metrics
+from timetable.models import User, Department, Batch, Course, Student, TimeSlot, Classroom, Schedule
+
+class MetricsRegistryTestCase(TestCase):
+    """Tests for the metric types and the text exposition"""
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+        self.requests = metrics.Counter('test_requests_total', "Requests.", ['view'], registry=self.registry)
+        self.latency = metrics.Histogram('test_latency_seconds', "Latency.", buckets=(0.1, 1.0), registry=self.registry)
+
+    def test_counter_exposition(self):
+        """Test that counters are rendered with their labels"""
+        self.requests.inc(view='home')
+        self.requests.inc(2, view='home')
+        text = metrics.render(self.registry.snapshot())
+
+        self.assertIn('# HELP test_requests_total Requests.', text)
+        self.assertIn('# TYPE test_requests_total counter', text)
+        self.assertIn('test_requests_total{view="home"} 3.0', text)
+
+    def test_histogram_exposition(self):
+        """Test that histogram buckets are cumulative and end with +Inf"""
+        for value in (0.05, 0.5, 5):
+            self.latency.observe(value)
+        text = metrics.render(self.registry.snapshot())
+
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_sum 5.55', text)
+        self.assertIn('test_latency_seconds_count 3', text)
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes in label values cannot break the format"""
+        self.requests.inc(view='a"b')
+        self.assertIn(r'view="a\"b"', metrics.render(self.registry.snapshot()))
+
+    def test_multiprocess_merge(self):
+        """Test that a scrape sums the values written by every worker"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        self.requests.inc(view='home')
+        self.latency.observe(0.5)
+        other_worker = self.registry.snapshot()  # Same values, as if from a second process
+        Path(directory, 'metrics_999999.json').write_text(json.dumps(other_worker))
+
+        with override_settings(ATMA_METRICS={'ENABLED': True, 'MULTIPROCESS_DIR': directory}):
+            merged = metrics.collect(self.registry)
+
+        self.assertTrue(Path(directory, f'metrics_{os.getpid()}.json').exists())
+        self.assertEqual(merged['test_requests_total']['samples'], [[['home'], 2]])
+        self.assertEqual(merged['test_latency_seconds']['samples'][0][1], [0, 2, 0, 1.0])
+
+
+METRICS_ON = {'ENABLED': True, 'ALLOWED_IPS': ['127.0.0.1']}
+
+
+@override_settings(ATMA_METRICS=METRICS_ON)
+class MetricsEndpointTestCase(TestCase):
+    """Tests for the /metrics endpoint and the instrumented views"""
+
+    def setUp(self):
+        metrics.REGISTRY.reset()
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.batch = Batch.objects.get(department=self.department, year=2)
+        self.hod = User.objects.create(username='hod', role='teacher', department=self.department)
+        self.department.hod = self.hod
+        self.department.save()
+        self.student_user = User.objects.create(username='student', role='student', department=self.department)
+        self.student = Student.objects.create(user=self.student_user, batch=self.batch)
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=2, teacher=self.hod, department=self.department
+        )
+        self.course.batches.add(self.batch)
+
+    def get_client(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_metrics_endpoint(self):
+        """Test that request latency and query counts are exposed per URL name"""
+        client = self.get_client(self.student_user)
+        client.get(reverse('view_timetable'))
+        response = client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('atma_request_duration_seconds_count{url_name="view_timetable",method="GET"} 1', text)
+        self.assertGreater(metrics.REQUEST_QUERIES.get(url_name='view_timetable'), 0)
+
+    @override_settings(ATMA_METRICS={'ENABLED': False})
+    def test_metrics_disabled(self):
+        """Test that the endpoint is hidden when metrics are disabled"""
+        self.assertEqual(Client().get(reverse('metrics')).status_code, 404)
+
+    def test_metrics_are_restricted(self):
+        """Test that only staff and allowed scrapers can read the metrics"""
+        self.assertEqual(Client(REMOTE_ADDR='10.0.0.8').get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.get_client(self.student_user).get(reverse('metrics'), REMOTE_ADDR='10.0.0.8').status_code, 403)
+        staff = User.objects.create(username='ops', role='admin', is_staff=True)
+        self.assertEqual(self.get_client(staff).get(reverse('metrics'), REMOTE_ADDR='10.0.0.8').status_code, 200)
+
+    def test_timetable_cache_hits_and_misses(self):
+        """Test that repeated timetable views hit the cache until data changes"""
+        client = self.get_client(self.student_user)
+        client.get(reverse('view_timetable'))
+        client.get(reverse('view_timetable'))
+        self.assertEqual(metrics.TIMETABLE_CACHE.get(kind='student', result='miss'), 1)
+        self.assertEqual(metrics.TIMETABLE_CACHE.get(kind='student', result='hit'), 1)
+
+        # A new session invalidates the cached grid
+        Schedule.objects.create(
+            course=self.course,
+            timeslot=TimeSlot.objects.get(day='Monday', slot='A'),
+            classroom=Classroom.objects.create(name='Room 101', capacity=50),
+        )
+        response = client.get(reverse('view_timetable'))
+        self.assertEqual(metrics.TIMETABLE_CACHE.get(kind='student', result='miss'), 2)
+        self.assertEqual(response.context['timetable_data']['Monday']['A'].course, self.course)
+
+    def test_student_changes_keep_other_grids(self):
+        """Test that a signup keeps cached grids and a batch change refreshes only that student's"""
+        Schedule.objects.create(
+            course=self.course,
+            timeslot=TimeSlot.objects.get(day='Monday', slot='A'),
+            classroom=Classroom.objects.create(name='Room 101', capacity=50),
+        )
+        client = self.get_client(self.student_user)
+        client.get(reverse('view_timetable'))
+        version = grids.current_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(username='newcomer', role='student', department=self.department)
+            Student.objects.create(user=user, batch=self.batch)
+        self.assertEqual(grids.current_version(), version)
+        client.get(reverse('view_timetable'))
+        self.assertEqual(metrics.TIMETABLE_CACHE.get(kind='student', result='hit'), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.batch = Batch.objects.get(department=self.department, year=1)
+            self.student.save()
+        self.assertEqual(grids.current_version(), version)
+        response = client.get(reverse('view_timetable'))
+        self.assertEqual(metrics.TIMETABLE_CACHE.get(kind='student', result='miss'), 2)
+        self.assertNotIn('A', response.context['timetable_data']['Monday'])
+
+    def test_scheduler_metrics(self):
+        """Test that scheduling runs record duration, placements and failures"""
+        client = self.get_client(self.hod)
+        client.get(reverse('hod-schedule-course', args=[self.course.id]))
+        self.assertEqual(metrics.SCHEDULER_DURATION.count(), 1)
+        self.assertEqual(metrics.SCHEDULER_FAILURES.get(reason='no_room'), 2)
+
+        Classroom.objects.create(name='Room 101', capacity=50)
+        client.get(reverse('hod-schedule-course', args=[self.course.id]))
+        self.assertEqual(metrics.SCHEDULER_DURATION.count(), 2)
+        self.assertEqual(metrics.SCHEDULER_PLACEMENTS.get(), 2)
+
+        # A preview only times its search; the commit counts what it writes
+        other = Course.objects.create(
+            name='Databases', code='CS202', credits=2, teacher=self.hod, department=self.department
+        )
+        response = client.get(reverse('hod-schedule-preview', args=[other.id]), HTTP_HX_REQUEST='true')
+        self.assertEqual(metrics.SCHEDULER_PLACEMENTS.get(), 2)
+        client.post(reverse('hod-schedule-commit', args=[other.id]), {'plan': response.context['plan']})
+        self.assertEqual(metrics.SCHEDULER_DURATION.count(), 4)
+        self.assertEqual(metrics.SCHEDULER_PLACEMENTS.get(), 4)
+        self.assertEqual(metrics.SCHEDULER_FAILURES.get(reason='no_room'), 2)
@@ -0,0 +1,165 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+from timetable.middleware import ProfilingMiddleware, QueryBudgetExceeded, QueryBudgetWarning
+from timetable.models import User, Department, ProfileCapture
+
+METRICS_ON = {'ENABLED': True, 'BUDGETS': {}, 'ON_BUDGET_EXCEEDED': 'warn'}
+
+class RequestMetricsMiddlewareTestCase(TestCase):
+    """Tests for the per-request query budget and timing middleware"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(
+            username='teacher', role='teacher', department=self.department
+        )
+
+    def get_client(self):
+        # Middleware is loaded per client handler, after override_settings applies
+        client = Client()
+        client.force_login(self.teacher)
+        return client
+
+    def test_disabled_by_default(self):
+        """Test that no timing header is added when the middleware is disabled"""
+        response = self.get_client().get(reverse('teacher_home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(ATMA_REQUEST_METRICS=METRICS_ON)
+    def test_server_timing_header_and_log(self):
+        """Test that query count and timings are reported"""
+        with self.assertLogs('timetable.requests', level='INFO') as logs:
+            response = self.get_client().get(reverse('teacher_home'))
+
+        header = response['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertIn('tpl;dur=', header)
+        self.assertIn('total;dur=', header)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['url_name'], 'teacher_home')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertIn(f"{record['queries']} queries", header)
+
+    @override_settings(ATMA_REQUEST_METRICS={**METRICS_ON, 'BUDGETS': {'teacher_home': 1}})
+    def test_budget_warns(self):
+        """Test that exceeding a budget warns by default"""
+        with self.assertLogs('timetable.requests', level='INFO'):
+            with self.assertWarns(QueryBudgetWarning):
+                self.get_client().get(reverse('teacher_home'))
+
+    @override_settings(ATMA_REQUEST_METRICS={
+        **METRICS_ON, 'BUDGETS': {'teacher_home': {'queries': 1}}, 'ON_BUDGET_EXCEEDED': 'raise',
+    })
+    def test_budget_raises(self):
+        """Test that exceeding a budget fails when configured to raise"""
+        with self.assertLogs('timetable.requests', level='INFO'):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.get_client().get(reverse('teacher_home'))
+
+    @override_settings(ATMA_REQUEST_METRICS={**METRICS_ON, 'BUDGETS': {'teacher_home': 100}})
+    def test_within_budget(self):
+        """Test that a request within its budget passes silently"""
+        with self.assertLogs('timetable.requests', level='INFO') as logs:
+            response = self.get_client().get(reverse('teacher_home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r.levelname for r in logs.records], ['INFO'])
+
+
+class ProfilingMiddlewareTestCase(TestCase):
+    """Tests for on-demand cProfile captures"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(
+            username='teacher', role='teacher', department=self.department
+        )
+
+    def get_client(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def profiling(self, enabled=True):
+        return override_settings(ATMA_PROFILING={
+            'ENABLED': enabled, 'DIR': self.directory, 'TOP_N': 10,
+            'HEADER': 'X-Profile', 'QUERY_PARAM': '_profile',
+        })
+
+    def test_staff_request_is_profiled(self):
+        """Test that a staff user's flagged request is captured"""
+        self.teacher.is_staff = True
+        self.teacher.save()
+
+        with self.profiling():
+            response = self.get_client(self.teacher).get(reverse('teacher_home'), HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        capture = ProfileCapture.objects.get()
+        self.assertEqual(response['X-Profile-Capture'], str(capture.pk))
+        self.assertEqual(capture.url_name, 'teacher_home')
+        self.assertIn('cumulative', capture.summary)
+        self.assertTrue(Path(capture.prof_file).exists())
+        self.assertEqual(len(list(Path(self.directory).glob('*.txt'))), 1)
+
+    def test_query_flag_is_profiled(self):
+        """Test that the query parameter works like the header"""
+        self.teacher.is_staff = True
+        self.teacher.save()
+
+        with self.profiling():
+            self.get_client(self.teacher).get(reverse('teacher_home'), {'_profile': '1'})
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+
+    def test_non_staff_request_is_not_profiled(self):
+        """Test that everyone else sees no behavior change"""
+        with self.profiling():
+            response = self.get_client(self.teacher).get(reverse('teacher_home'), HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Capture', response)
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_async_view_is_not_profiled(self):
+        """Test that async views are passed through instead of profiling their coroutine"""
+        self.teacher.is_staff = True
+
+        async def view(request):
+            return HttpResponse()
+
+        request = RequestFactory().get('/', HTTP_X_PROFILE='1')
+        request.user = self.teacher
+        with self.profiling():
+            middleware = ProfilingMiddleware(lambda request: HttpResponse())
+            self.assertIsNone(middleware.process_view(request, view, (), {}))
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_disabled_profiling(self):
+        """Test that nothing is captured when profiling is disabled"""
+        self.teacher.is_staff = True
+        self.teacher.save()
+
+        with self.profiling(enabled=False):
+            self.get_client(self.teacher).get(reverse('teacher_home'), HTTP_X_PROFILE='1')
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_admin_lists_captures(self):
+        """Test that captures show up in the admin"""
+        admin = User.objects.create(username='admin', role='admin', is_staff=True, is_superuser=True)
+        ProfileCapture.objects.create(
+            user=admin, method='GET', path='/teacher/', url_name='teacher_home',
+            duration_ms=12.5, prof_file='x.prof', summary='...'
+        )
+        response = self.get_client(admin).get(reverse('admin:timetable_profilecapture_changelist'))
+        self.assertContains(response, '/teacher/')
@@ -221,3 +221,34 @@ class ModelTestCase(TestCase):
         
         # Now it should be an elective for the student
         self.assertTrue(elective_course.is_elective_for(self.student))
+
+    def test_department_save_query_count(self):
+        """Test that batches are only provisioned on insert or year-count changes"""
+        # Insert: one query for the department, one for all of its batches
+        with self.assertNumQueries(2):
+            department = Department.objects.create(name='Physics', code='PH')
+        self.assertEqual(department.batches.count(), 4)
+
+        # A rename is a single UPDATE
+        department = Department.objects.get(pk=department.pk)
+        department.name = 'Applied Physics'
+        with self.assertNumQueries(1):
+            department.save()
+
+        # Growing the year count adds the missing batches only
+        department.num_years = 5
+        with self.assertNumQueries(2):
+            department.save()
+        self.assertEqual(
+            list(department.batches.order_by('year').values_list('year', flat=True)),
+            [1, 2, 3, 4, 5]
+        )
+
+    def test_timeslot_build_week(self):
+        """Test that bulk-built timeslots carry the same times as save()"""
+        week = TimeSlot.build_week()
+        self.assertEqual(len(week), TimeSlot.objects.count())
+
+        saved = {(ts.day, ts.slot): (ts.start_time, ts.end_time) for ts in TimeSlot.objects.all()}
+        for ts in week:
+            self.assertEqual(saved[(ts.day, ts.slot)], (ts.start_time, ts.end_time))
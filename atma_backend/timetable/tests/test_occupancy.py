@@ -0,0 +1,80 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from timetable import occupancy, scheduler
+from timetable.models import User, Department, Course, Classroom, Schedule, TimeSlot
+
+class OccupancyIndexTestCase(TestCase):
+    """Tests for the room occupancy bitmaps and the free-room search"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=3, teacher=self.teacher, department=self.department
+        )
+        self.small = Classroom.objects.create(name='Room 101', capacity=30)
+        self.large = Classroom.objects.create(name='Hall 1', capacity=120)
+        self.closed = Classroom.objects.create(name='Lab 2', capacity=80, availability=False)
+        self.slot = {(ts.day, ts.slot): ts for ts in TimeSlot.objects.all()}
+        Schedule.objects.create(course=self.course, timeslot=self.slot[('Thursday', 'D')], classroom=self.large)
+
+    def test_bits_follow_the_week(self):
+        """Test that timeslots get one bit each, in day and time order"""
+        index = occupancy.get_index()
+        self.assertEqual(len(index.bits), TimeSlot.objects.count())
+        self.assertEqual(index.timeslots[0], self.slot[('Monday', 'A')])
+        self.assertEqual(index.timeslots[-1], self.slot[('Friday', 'H')])
+        self.assertEqual(index.booked(self.large.pk), [self.slot[('Thursday', 'D')].pk])
+
+    def test_free_rooms_filters(self):
+        """Test the capacity, availability and slot range filters"""
+        index = occupancy.get_index()
+        thursday = index.slot_range('Thursday', 'C', 'E')
+        self.assertEqual(thursday, [self.slot[('Thursday', s)].pk for s in 'CDE'])
+        self.assertEqual(index.free_rooms(thursday), [self.small])
+        self.assertEqual(index.free_rooms(thursday, min_capacity=40), [])
+        self.assertEqual(index.free_rooms(thursday, available_only=False), [self.small, self.closed])
+        self.assertEqual(index.free_rooms([self.slot[('Thursday', 'C')].pk], min_capacity=40), [self.large])
+
+    def test_lookups_do_not_query(self):
+        """Test that the index is only rebuilt after a timetable change"""
+        index = occupancy.get_index()
+        with self.assertNumQueries(0):
+            self.assertIs(occupancy.get_index(), index)
+        Schedule.objects.create(course=self.course, timeslot=self.slot[('Monday', 'A')], classroom=self.small)
+        with self.assertNumQueries(3):
+            index = occupancy.get_index()
+        self.assertFalse(index.is_free(self.small.pk, [self.slot[('Monday', 'A')].pk]))
+
+    def test_scheduler_does_not_modify_the_index(self):
+        """Test that the scheduler books rooms in its own copy of the bitmaps"""
+        searcher = scheduler.CourseScheduler(self.course, trace=False)
+        searcher.load()
+        index = occupancy.get_index()
+        searcher.search()
+        self.assertEqual(searcher.result.placed, 3)
+        self.assertEqual(index.booked(self.small.pk), [])
+        self.assertEqual(index.booked(self.large.pk), [self.slot[('Thursday', 'D')].pk])
+
+    def test_free_rooms_view(self):
+        """Test the search page and its HTMX partial"""
+        client = Client()
+        client.force_login(self.teacher)
+        url = reverse('free_rooms')
+        search = {'day': 'Thursday', 'first_slot': 'E', 'last_slot': 'C', 'min_capacity': 20}
+
+        response = client.get(url, search)
+        self.assertTemplateUsed(response, 'teacher/free_rooms.html')
+        self.assertEqual(response.context['rooms'], [self.small])
+
+        response = client.get(url, {**search, 'include_unavailable': 'on'}, HTTP_HX_REQUEST='true')
+        self.assertTemplateNotUsed(response, 'teacher/free_rooms.html')
+        self.assertContains(response, 'Lab 2')
+        self.assertNotContains(response, 'Hall 1')
+
+    def test_free_rooms_requires_teacher(self):
+        """Test that students are sent home"""
+        student = User.objects.create(username='student', role='student', department=self.department)
+        client = Client()
+        client.force_login(student)
+        self.assertRedirects(client.get(reverse('free_rooms')), reverse('home'), fetch_redirect_response=False)
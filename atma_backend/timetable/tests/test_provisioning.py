@@ -0,0 +1,101 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from timetable.models import User, Department, Batch, Student
+from timetable.provisioning import hash_passwords, bulk_create_users, bulk_create_departments
+
+class ProvisioningTestCase(TestCase):
+    """Tests for bulk user provisioning"""
+
+    def setUp(self):
+        self.department = Department.objects.create(
+            name='Computer Science',
+            code='CS'
+        )
+        self.batch = Batch.objects.get(
+            department=self.department,
+            year=1
+        )
+
+    def test_hash_passwords_in_process_pool(self):
+        """Test that hashes produced by worker processes verify"""
+        hashes = hash_passwords(['alpha123', 'beta123', None], workers=2)
+
+        self.assertEqual(len(hashes), 3)
+        user = User(username='hashcheck')
+        user.password = hashes[0]
+        self.assertTrue(user.check_password('alpha123'))
+        user.password = hashes[1]
+        self.assertTrue(user.check_password('beta123'))
+        user.password = hashes[2]
+        self.assertFalse(user.has_usable_password())
+
+    def test_bulk_create_users(self):
+        """Test that users and student profiles are created in bulk"""
+        rows = [
+            {'username': 's1', 'password': 'pass12345', 'role': 'student',
+             'department': self.department, 'batch': self.batch},
+            {'username': 't1', 'password': 'pass12345', 'role': 'teacher',
+             'department': self.department},
+            {'username': 'a1', 'password': 'pass12345', 'role': 'admin',
+             'department': self.department},
+        ]
+        users = bulk_create_users(rows, workers=1)
+
+        self.assertEqual(len(users), 3)
+        self.assertTrue(all(user.pk for user in users))
+
+        student = Student.objects.get(user__username='s1')
+        self.assertEqual(student.batch, self.batch)
+        self.assertFalse(Student.objects.filter(user__username='t1').exists())
+
+        # Admins never keep a department, as in User.save()
+        self.assertIsNone(User.objects.get(username='a1').department)
+        self.assertTrue(self.client.login(username='s1', password='pass12345'))
+
+    def test_bulk_create_departments(self):
+        """Test that departments and all their batches are created in two INSERTs"""
+        departments = [
+            Department(name='Mathematics', code='MA'),
+            Department(name='Physics', code='PH', num_years=5),
+        ]
+        # Two INSERTs, wrapped in the savepoint pair of the atomic block
+        with self.assertNumQueries(4):
+            bulk_create_departments(departments)
+
+        self.assertEqual(Batch.objects.filter(department__code='MA').count(), 4)
+        self.assertEqual(Batch.objects.filter(department__code='PH').count(), 5)
+
+    def test_provision_users_command(self):
+        """Test the provision_users management command with a CSV file"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("username,password,first_name,last_name,email,role,department,year\n")
+            f.write("stud1,pass12345,Stu,One,,student,CS,1\n")
+            f.write("stud2,pass12345,Stu,Two,,student,CS,1\n")
+        self.addCleanup(os.remove, f.name)
+
+        out = StringIO()
+        call_command('provision_users', f.name, '--workers', '1', stdout=out)
+
+        self.assertIn('Provisioned 2 users', out.getvalue())
+        self.assertEqual(self.batch.students.count(), 2)
+
+        # Importing the same file again must fail on the duplicate usernames
+        with self.assertRaises(CommandError):
+            call_command('provision_users', f.name, '--workers', '1', stdout=StringIO())
+
+    def test_provision_users_rejects_bad_year(self):
+        """Test that a non-numeric year fails with a CommandError naming the line"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("username,password,first_name,last_name,email,role,department,year\n")
+            f.write("stud1,pass12345,Stu,One,,student,CS,1\n")
+            f.write("stud2,pass12345,Stu,Two,,student,CS,first\n")
+        self.addCleanup(os.remove, f.name)
+
+        with self.assertRaisesMessage(CommandError, "Line 3: year 'first'"):
+            call_command('provision_users', f.name, '--workers', '1', stdout=StringIO())
+        self.assertFalse(User.objects.filter(username__in=['stud1', 'stud2']).exists())
@@ -0,0 +1,185 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from timetable import synthetic, urls, usernames
+from timetable.models import User, Department, Course, Student
+
+# Budget per URL name: (max queries, max response bytes), measured on a
+# medium institution (4 departments, 200 courses). Query budgets are exact:
+# the route's most expensive request must run exactly that many queries, and
+# a cheaper variant (another role, an HTMX partial) states its own exact
+# count, so a template that adds a query per row fails here with the SQL
+# listed, and so does a page that got cheaper without lowering its budget.
+# Lower a budget when a page gets cheaper; raise it only deliberately.
+BUDGETS = {
+    'home': (5, 7_000),
+    'login': (0, 6_000),
+    'signup': (1, 10_000),
+    'logout': (4, 0),
+    'select_batch': (5, 0),
+    'view_timetable': (7, 30_000),
+    'course_detail': (6, 2_500),
+    'student_electives': (8, 20_000),
+    'register_elective': (12, 20_000),
+    'drop_elective': (10, 20_000),
+    'teacher_home': (3, 8_000),
+    'teacher_timetable': (5, 25_000),
+    'teacher_course_detail': (6, 2_500),
+    'free_rooms': (5, 10_000),
+    'teacher_availability': (3, 18_000),
+    'teacher_availability_cell': (9, 500),
+    'hod-manage-courses': (6, 130_000),
+    'hod-schedule-course': (18, 5_000),
+    'hod-schedule-preview': (10, 10_000),
+    'hod-schedule-commit': (16, 5_000),
+    'hod-delete-course': (14, 2_000),
+    'hod-scheduling-bottlenecks': (3, 5_000),
+    'check_username': (1, 100),
+    'htmx-edit-course': (20, 7_000),
+    'htmx-create-course': (15, 7_000),
+    'htmx-course-list': (6, 125_000),
+    'api-token': (2, 1_000),
+    'api-token-refresh': (1, 1_000),
+    'api-my-timetable': (1, 5_000),
+    'api-my-courses': (1, 2_000),
+    'api-course-detail': (4, 1_000),
+    'metrics': (0, 100_000),
+    'timetable_events': (3, 200),
+    'timetable_cell': (3, 1_000),
+}
+
+
+class QueryBudgetTestCase(TestCase):
+    """Query-count and response-size budgets for every route"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = synthetic.generate(
+            prefix='qb', size='medium', teachers=10, courses_per_teacher=5, students_per_batch=5,
+        )
+        cls.department = Department.objects.get(code='QB0')
+        cls.hod = cls.department.hod
+        cls.teacher = User.objects.filter(department=cls.department, role='teacher').exclude(pk=cls.hod.pk).first()
+        cls.student = Student.objects.filter(batch__department=cls.department).select_related('user').first()
+        cls.course = Course.objects.filter(department=cls.department, teacher=cls.teacher).first()
+        cls.new_user = User.objects.create(username='qb_new_student', role='student', department=cls.department)
+
+    def setUp(self):
+        cache.clear()  # Measure cold caches
+
+    def measure(self, url_name, user=None, method='get', args=None, data=None, queries=None, **extra):
+        """Request a URL and fail with the captured SQL unless it runs exactly its budget (or ``queries``)."""
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        max_queries, max_bytes = BUDGETS[url_name]
+        if queries is not None:
+            self.assertLessEqual(queries, max_queries, f"{url_name}: expected count is over the budget")
+            max_queries = queries
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(reverse(url_name, args=args), data, **extra)
+
+        self.assertLess(response.status_code, 400, f"{url_name} returned {response.status_code}")
+        executed = len(queries.captured_queries)
+        if executed != max_queries:
+            sql = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(queries.captured_queries, 1))
+            self.fail(f"{url_name}: {executed} queries, budget is exactly {max_queries}\n{sql}")
+        size = len(response.content)
+        self.assertLessEqual(size, max_bytes, f"{url_name}: response is {size} bytes, budget is {max_bytes}")
+        return response
+
+    def test_every_route_has_a_budget(self):
+        """Test that new routes cannot be added without a budget"""
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(sorted(names - set(BUDGETS)), [], "Routes without a query budget")
+
+    @override_settings(ATMA_METRICS={'ENABLED': True, 'ALLOWED_IPS': ['127.0.0.1']})
+    def test_anonymous_routes(self):
+        """Test the pages reachable without logging in"""
+        self.measure('home', queries=0)
+        self.measure('login')
+        self.measure('signup')
+        usernames.index.rebuild()  # Steady state: the filter is loaded, a taken name costs one query
+        self.measure('check_username', method='post', data={'username': 'qb_t0_1'})
+        self.measure('metrics')
+
+    def test_student_routes(self):
+        """Test the student pages"""
+        user = self.student.user
+        self.measure('home', user)
+        self.measure('view_timetable', user)
+        self.measure('course_detail', user, args=[self.course.pk])
+        self.measure('timetable_events', user)
+        self.measure('timetable_cell', user, args=['Monday', 'A'])
+        batch = self.department.batches.first()
+        self.measure('select_batch', self.new_user, method='post', data={'batch_id': batch.pk})
+        self.measure('logout', user)
+
+    def test_elective_routes(self):
+        """Test elective registration: the list, then registering and dropping over HTMX"""
+        user = self.student.user
+        Course.objects.filter(department=self.department).exclude(batches=self.student.batch).update(elective_seats=10)
+        # The medium timetable is packed, so the one that fits is not scheduled yet
+        elective = Course.objects.create(
+            name='Budget Elective', code='QB-ELE', credits=2, elective_seats=10,
+            teacher=self.teacher, department=self.department,
+        )
+        htmx = {'HTTP_HX_REQUEST': 'true'}
+        self.measure('student_electives', user)
+        response = self.measure('register_elective', user, method='post', args=[elective.pk], **htmx)
+        self.assertEqual(response.context['notice'], f"Registered for {elective.code}.")
+        self.measure('drop_elective', user, method='post', args=[elective.pk], **htmx)
+
+    def test_teacher_routes(self):
+        """Test the teacher pages"""
+        self.measure('home', self.teacher, queries=2)
+        self.measure('teacher_home', self.teacher)
+        self.measure('teacher_timetable', self.teacher)
+        self.measure('teacher_course_detail', self.teacher, args=[self.course.pk])
+        self.measure('timetable_events', self.teacher, queries=2)
+        self.measure('timetable_cell', self.teacher, args=['Monday', 'A'], queries=2)
+        search = {'day': 'Thursday', 'first_slot': 'C', 'last_slot': 'E', 'min_capacity': 40}
+        self.measure('free_rooms', self.teacher, data=search)
+        self.measure('free_rooms', self.teacher, data=search, queries=2, HTTP_HX_REQUEST='true')
+        self.measure('teacher_availability', self.teacher)
+        self.measure('teacher_availability_cell', self.teacher, method='post', args=['Monday', 'A'])
+
+    def test_api_routes(self):
+        """Test the JSON API: tokens, then the student's timetable (cold grid cache), courses and a course"""
+        json = 'application/json'
+        credentials = {'username': self.student.user.username, 'password': synthetic.DEFAULT_PASSWORD}
+        tokens = self.measure('api-token', method='post', data=credentials, content_type=json).json()
+        self.measure('api-token-refresh', method='post', data={'refresh': tokens['refresh']}, content_type=json)
+        bearer = {'HTTP_AUTHORIZATION': f"Bearer {tokens['access']}"}
+        self.measure('api-my-timetable', **bearer)
+        self.measure('api-my-courses', **bearer)
+        self.measure('api-course-detail', args=[self.course.pk], **bearer)
+
+    def test_hod_routes(self):
+        """Test the HOD pages, HTMX partials and actions"""
+        self.measure('home', self.hod, queries=2)
+        self.measure('hod-manage-courses', self.hod)
+        self.measure('htmx-course-list', self.hod, HTTP_HX_REQUEST='true')
+        self.measure('htmx-edit-course', self.hod, args=[self.course.pk], queries=7, HTTP_HX_REQUEST='true')
+        self.measure('htmx-create-course', self.hod, queries=4, HTTP_HX_REQUEST='true')
+        self.measure('hod-scheduling-bottlenecks', self.hod)
+        self.measure('hod-schedule-course', self.hod, method='post', args=[self.course.pk], queries=14)
+        self.measure('hod-delete-course', self.hod, method='post', args=[self.course.pk], queries=13)
+
+    def test_hod_htmx_actions(self):
+        """Test that HTMX course actions stay O(1): they render one row, not the list"""
+        courses = list(Course.objects.filter(department=self.department).exclude(pk=self.course.pk)[:2])
+        batch = self.department.batches.first()
+        form = {'name': 'Budget Course', 'code': 'QB-NEW', 'credits': 3, 'teacher': self.teacher.pk, 'batches': [batch.pk]}
+        htmx = {'HTTP_HX_REQUEST': 'true'}
+        self.measure('hod-schedule-course', self.hod, method='post', args=[courses[0].pk], **htmx)
+        self.measure('htmx-edit-course', self.hod, method='post', args=[courses[1].pk],
+                     data={**form, 'code': courses[1].code}, **htmx)
+        self.measure('htmx-create-course', self.hod, method='post', data=form, **htmx)
+        self.measure('hod-delete-course', self.hod, method='post', args=[courses[0].pk], **htmx)
+        preview = self.measure('hod-schedule-preview', self.hod, args=[courses[1].pk], **htmx)
+        self.measure('hod-schedule-commit', self.hod, method='post', args=[courses[1].pk],
+                     data={'plan': preview.context['plan']}, **htmx)
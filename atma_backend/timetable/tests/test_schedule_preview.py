@@ -0,0 +1,87 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from timetable import scheduler
+from timetable.models import User, Department, Batch, Course, Classroom, Schedule
+
+class SchedulePreviewTestCase(TestCase):
+    """Tests for dry-run scheduling and committing a previewed plan"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.hod = User.objects.create(username='hod', role='teacher', department=self.department)
+        self.department.hod = self.hod
+        self.department.save()
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=3, teacher=self.teacher, department=self.department
+        )
+        self.course.batches.add(Batch.objects.get(department=self.department, year=1))
+        self.other = Course.objects.create(
+            name='Databases', code='CS202', credits=1, teacher=self.hod, department=self.department
+        )
+        self.room = Classroom.objects.create(name='Room 101', capacity=50)
+        self.client = Client()
+        self.client.force_login(self.hod)
+
+    def preview(self):
+        response = self.client.get(reverse('hod-schedule-preview', args=[self.course.pk]), HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'hod/partials/schedule_preview.html')
+        return response
+
+    def commit(self, plan):
+        return self.client.post(
+            reverse('hod-schedule-commit', args=[self.course.pk]), {'plan': plan}, HTTP_HX_REQUEST='true'
+        )
+
+    def test_preview_writes_nothing(self):
+        """Test that a dry run places sessions in memory only"""
+        response = self.preview()
+        self.assertEqual(response.context['result'].placed, 3)
+        self.assertContains(response, 'Room 101', count=3)
+        self.assertFalse(Schedule.objects.exists())
+
+    def test_commit_writes_the_previewed_plan(self):
+        """Test that committing saves exactly the previewed placements"""
+        response = self.preview()
+        planned = sorted((ts.pk, room.pk) for ts, room in response.context['result'].placements)
+
+        response = self.commit(response.context['plan'])
+
+        self.assertEqual(response['HX-Trigger'], 'closeModal')
+        self.assertContains(response, f'id="course-row-{self.course.pk}" hx-swap-oob="true"')
+        saved = sorted(Schedule.objects.filter(course=self.course).values_list('timeslot_id', 'classroom_id'))
+        self.assertEqual(saved, planned)
+
+    def test_stale_plan_is_not_written(self):
+        """Test that a plan is refused once its slots or rooms were taken"""
+        response = self.preview()
+        timeslot, room = response.context['result'].placements[0]
+        Schedule.objects.create(course=self.other, timeslot=timeslot, classroom=room)
+
+        response = self.commit(response.context['plan'])
+
+        self.assertTrue(response.context['stale'])
+        self.assertFalse(Schedule.objects.filter(course=self.course).exists())
+        self.assertNotIn(timeslot, [ts for ts, _ in response.context['result'].placements])
+
+    def test_plan_cannot_be_committed_twice(self):
+        """Test that the first commit makes the same plan stale"""
+        plan = self.preview().context['plan']
+        self.commit(plan)
+        self.commit(plan)
+        self.assertEqual(Schedule.objects.filter(course=self.course).count(), 3)
+
+    def test_tampered_plan_is_rejected(self):
+        """Test that plans are signed and bound to their course"""
+        plan = self.preview().context['plan']
+        self.assertEqual(self.commit(plan + 'x').status_code, 400)
+        response = self.client.post(reverse('hod-schedule-commit', args=[self.other.pk]), {'plan': plan})
+        self.assertEqual(response.status_code, 400)
+
+    def test_commit_plan_raises_when_stale(self):
+        """Test the scheduler API directly"""
+        result = scheduler.preview_course(self.course)
+        plan = [(ts.pk, room.pk) for ts, room in result.placements]
+        with self.assertRaises(scheduler.StalePlan):
+            scheduler.commit_plan(self.course, plan, 'not-the-fingerprint')
+        self.assertEqual(scheduler.commit_plan(self.course, plan, result.fingerprint).placed, 3)
@@ -0,0 +1,132 @@
+from django.contrib.messages import get_messages
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from timetable import grids, occupancy, scheduler
+from timetable.models import User, Department, Batch, Course, Classroom, Schedule, TimeSlot, SchedulingRun
+
+class SchedulerTraceTestCase(TestCase):
+    """Tests for the scheduler phases and its decision trace"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.hod = User.objects.create(username='hod', role='teacher', department=self.department)
+        self.department.hod = self.hod
+        self.department.save()
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.batch = Batch.objects.get(department=self.department, year=1)
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=3, teacher=self.teacher, department=self.department
+        )
+        self.course.batches.add(self.batch)
+        self.other = Course.objects.create(
+            name='Databases', code='CS202', credits=3, teacher=self.hod, department=self.department
+        )
+        self.room = Classroom.objects.create(name='Room 101', capacity=50)
+        self.slots = list(TimeSlot.objects.order_by('pk'))
+
+    def test_pack_trace_round_trip(self):
+        """Test that traces survive packing"""
+        entries = [(1, 'placed', 7), (2, 'no_room', None), (3, 'batch_busy', 4)]
+        self.assertEqual(scheduler.unpack_trace(scheduler.pack_trace(entries)), entries)
+
+    def test_query_count_does_not_grow_with_credits(self):
+        """Test that the search runs in memory, so queries do not depend on the course size"""
+        self.course.credits = 1
+        with self.assertNumQueries(11) as small:
+            scheduler.schedule_course(self.course, trace=False)
+        self.other.credits = 6
+        self.other.batches.add(Batch.objects.get(department=self.department, year=2))
+        with self.assertNumQueries(len(small.captured_queries)):
+            scheduler.schedule_course(self.other, trace=False)
+        self.assertEqual(Schedule.objects.filter(course=self.other).count(), 6)
+
+    def test_room_booked_by_another_worker_is_not_double_booked(self):
+        """Test that a room booked behind the occupancy index's back is re-checked before writing"""
+        occupancy.get_index()
+        timeslot, room = scheduler.preview_course(self.course).placements[0]
+        # bulk_create sends no signals, so the index keeps its version, as in another process
+        Schedule.objects.bulk_create([
+            Schedule(course=self.other, timeslot=timeslot, classroom=room, term_id=self.other.term_id)
+        ])
+
+        result = scheduler.schedule_course(self.course, trace=False)
+
+        self.assertEqual(result.placed, 3)
+        self.assertNotIn((timeslot, room), result.placements)
+        self.assertEqual(Schedule.objects.filter(timeslot=timeslot, classroom=room).count(), 1)
+
+    def test_rejection_reasons(self):
+        """Test that busy teachers and busy batches are told apart"""
+        teacher_slot, batch_slot, second_batch_slot = self.slots[0], self.slots[1], self.slots[2]
+        Schedule.objects.create(course=Course.objects.create(
+            name='Other', code='CS203', credits=1, teacher=self.teacher, department=self.department,
+        ), timeslot=teacher_slot, classroom=self.room)
+        Schedule.objects.create(course=self.other, timeslot=batch_slot, classroom=self.room)
+        self.other.batches.add(self.batch)
+        Schedule.objects.create(course=self.other, timeslot=second_batch_slot, classroom=self.room)
+
+        result = scheduler.schedule_course(self.course, trace=True)
+
+        self.assertEqual(result.placed, 3)
+        trace = {timeslot_id: (outcome, resource) for timeslot_id, outcome, resource in result.trace}
+        self.assertEqual(trace[teacher_slot.pk], ('teacher_busy', self.teacher.pk))
+        self.assertEqual(trace[batch_slot.pk], ('batch_busy', self.batch.pk))
+        self.assertEqual(result.rejections['teacher_busy'], 1)
+        self.assertEqual(result.rejections['batch_busy'], 2)
+        self.assertEqual([e for e in result.trace if e[1] == 'placed'][0][2], self.room.pk)
+
+    def test_no_room_and_day_limit(self):
+        """Test that room shortages and the per-day limit are recorded"""
+        # update() skips signals, so the occupancy index is invalidated by hand
+        Classroom.objects.update(availability=False)
+        grids.invalidate()
+        result = scheduler.schedule_course(self.course, trace=True)
+        self.assertEqual(result.placed, 0)
+        self.assertEqual(result.main_constraint, 'no_room')
+
+        Classroom.objects.update(availability=True)
+        grids.invalidate()
+        self.course.credits = 12  # More than 2 per day over 5 days
+        result = scheduler.schedule_course(self.course, trace=True)
+        self.assertEqual(result.placed, 10)
+        self.assertEqual(result.rejections['day_limit'], len(self.slots) - 10)
+
+    def test_run_is_stored_only_when_tracing(self):
+        """Test that traced runs are stored with their phase timings"""
+        scheduler.schedule_course(self.course, trace=False)
+        self.assertFalse(SchedulingRun.objects.exists())
+
+        Schedule.objects.all().delete()
+        result = scheduler.schedule_course(self.course, user=self.hod, trace=True)
+        run = SchedulingRun.objects.get()
+        self.assertEqual(run, result.run)
+        self.assertEqual((run.placed, run.required), (3, 3))
+        self.assertEqual(scheduler.unpack_trace(run.trace), result.trace)
+        self.assertGreaterEqual(run.load_ms, 0)
+
+    @override_settings(ATMA_SCHEDULER={'TRACE': True})
+    def test_view_explains_failure_and_summarizes_bottlenecks(self):
+        """Test that the HOD sees the blocking constraint and the bottleneck page"""
+        client = Client()
+        client.force_login(self.hod)
+        Classroom.objects.update(availability=False)
+
+        response = client.get(reverse('hod-schedule-course', args=[self.course.id]))
+        message = str(list(get_messages(response.wsgi_request))[0])
+        self.assertIn("No suitable timeslots", message)
+        self.assertIn("no classroom is free", message)
+
+        response = client.get(reverse('hod-scheduling-bottlenecks'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['summary']['runs'], 1)
+        self.assertIn("Rooms are the bottleneck", response.context['advice'])
+        # Like before, the run stops after a full round without progress: one slot per day
+        self.assertEqual(len(response.context['roomless_slots']), 5)
+
+    def test_bottlenecks_requires_hod(self):
+        """Test that only the HOD can see the bottleneck page"""
+        client = Client()
+        client.force_login(self.teacher)
+        self.assertRedirects(
+            client.get(reverse('hod-scheduling-bottlenecks')), reverse('home'), fetch_redirect_response=False
+        )
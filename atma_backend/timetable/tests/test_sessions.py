@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from timetable import sessionbench
+from timetable.models import User, Department
+
+CACHED = settings.ATMA_SESSION_PROFILES['cached']
+
+
+def session_queries(queries):
+    return [q['sql'] for q in queries.captured_queries if '"django_session"' in q['sql']]
+
+
+class SessionProfileTestCase(TestCase):
+    """Tests for the session and message storage profiles"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.hod = User.objects.create_user(username='hod', password='pw', role='teacher', department=self.department)
+        self.department.hod = self.hod
+        self.department.save()
+
+    def get(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return session_queries(queries)
+
+    @override_settings(**CACHED)
+    def test_cached_sessions_skip_the_session_table(self):
+        """Test that logged-in pages are served without reading django_session"""
+        self.client.login(username='hod', password='pw')
+        self.assertEqual(self.get('hod-manage-courses'), [])
+
+    @override_settings(**CACHED)
+    def test_roles_change_costs_the_session_nothing(self):
+        """Test that appointing a new HOD takes effect without reading or writing the session table"""
+        self.client.login(username='hod', password='pw')
+        self.assertEqual(self.get('hod-manage-courses'), [])
+        self.department.hod = None
+        self.department.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('hod-manage-courses'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(session_queries(queries), [])
+
+    @override_settings(**CACHED)
+    def test_flash_messages_live_in_a_cookie(self):
+        """Test that a flash message reaches the next page without touching the session table"""
+        self.client.login(username='hod', password='pw')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('hod-delete-course', args=[999]))
+            page = self.client.get(response['Location'])
+        self.assertContains(page, "Course does not exist.")
+        self.assertEqual(session_queries(queries), [])
+
+    def test_benchmark_compares_profiles(self):
+        """Test that the benchmark counts fewer session reads for the cached profile"""
+        report = sessionbench.run(['db', 'cached'])
+        db, cached = report['profiles']['db'], report['profiles']['cached']
+        self.assertEqual(set(db['flows']), {'student', 'teacher', 'hod'})
+        self.assertEqual(db['total']['requests'], cached['total']['requests'])
+        self.assertLess(cached['total']['session_reads'], db['total']['session_reads'])
+        self.assertLessEqual(cached['total']['session_writes'], db['total']['session_writes'])
+        self.assertLess(cached['change']['queries'], 0)
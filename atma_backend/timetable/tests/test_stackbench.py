@@ -0,0 +1,90 @@
+from django.http import Http404
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, TransactionTestCase, AsyncRequestFactory, Client, override_settings
+from django.urls import reverse
+from timetable import loadtest, stackbench
+from timetable.models import User, Department, Batch, Course, Classroom, Schedule, Student, TimeSlot
+from timetable.views import async_views
+
+
+def create_timetable(test):
+    test.department = Department.objects.create(name='Computer Science', code='CS')
+    test.teacher = User.objects.create(username='teacher', role='teacher', department=test.department)
+    test.student_user = User.objects.create(username='student', role='student', department=test.department)
+    test.batch = Batch.objects.get(department=test.department, year=1)
+    Student.objects.create(user=test.student_user, batch=test.batch)
+    test.course = Course.objects.create(
+        name='Algorithms', code='CS201', credits=3, teacher=test.teacher, department=test.department
+    )
+    test.course.batches.add(test.batch)
+    room = Classroom.objects.create(name='Room 101', capacity=50)
+    Schedule.objects.create(course=test.course, timeslot=TimeSlot.objects.first(), classroom=room)
+
+
+class AsyncViewsTestCase(TestCase):
+    """Tests for the async timetable and course detail views"""
+
+    def setUp(self):
+        create_timetable(self)
+        self.factory = AsyncRequestFactory()
+
+    def get(self, view, user, *args):
+        request = self.factory.get('/')
+
+        async def auser():
+            return user
+        request.user = user
+        request.auser = auser
+        return view(request, *args)
+
+    async def test_student_timetable(self):
+        """Test that the async student timetable shows the scheduled course"""
+        response = await self.get(async_views.view_timetable, self.student_user)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'CS201')
+
+    async def test_teacher_views(self):
+        """Test the async teacher timetable and the ownership check on course details"""
+        response = await self.get(async_views.teacher_timetable, self.teacher)
+        self.assertContains(response, 'CS201')
+        response = await self.get(async_views.teacher_course_detail, self.teacher, self.course.pk)
+        self.assertContains(response, 'Algorithms')
+        response = await self.get(async_views.teacher_course_detail, self.student_user, self.course.pk)
+        self.assertEqual(response.status_code, 403)
+
+    async def test_course_detail_and_login(self):
+        """Test that missing courses 404 and anonymous users are sent to login"""
+        response = await self.get(async_views.course_detail, self.student_user, self.course.pk)
+        self.assertContains(response, 'Algorithms')
+        with self.assertRaises(Http404):
+            await self.get(async_views.course_detail, self.student_user, self.course.pk + 100)
+        response = await self.get(async_views.view_timetable, AnonymousUser())
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(ALLOWED_HOSTS=[stackbench.HOST])
+class StackBenchTestCase(TransactionTestCase):
+    """Tests for the in-process WSGI and ASGI runners"""
+
+    def setUp(self):
+        create_timetable(self)
+        student, teacher = Client(), Client()
+        student.force_login(self.student_user)
+        teacher.force_login(self.teacher)
+        student_cookie = f"sessionid={student.cookies['sessionid'].value}"
+        teacher_cookie = f"sessionid={teacher.cookies['sessionid'].value}"
+        self.plan = [
+            ('view_timetable', reverse('view_timetable'), student_cookie),
+            ('course_detail', reverse('course_detail', args=[self.course.pk]), student_cookie),
+            ('teacher_timetable', reverse('teacher_timetable'), teacher_cookie),
+            ('teacher_course_detail', reverse('teacher_course_detail', args=[self.course.pk]), teacher_cookie),
+        ] * 3
+
+    def test_runners_serve_every_request(self):
+        """Test that both stacks answer the plan and summarize like the load test"""
+        for name, runner in stackbench.RUNNERS.items():
+            samples, elapsed = runner(self.plan, concurrency=4)
+            self.assertEqual([status for *_, status in samples], [200] * len(self.plan), name)
+            report = loadtest.summarize(samples, elapsed)
+            self.assertEqual(report['overall']['requests'], len(self.plan))
+            self.assertEqual(report['endpoints']['course_detail']['errors'], 0)
@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from timetable.models import (
+    User, Department, Course, TimeSlot, Classroom, Schedule, Term, ArchivedCourse, ArchivedSchedule,
+)
+
+class TermPartitioningTestCase(TestCase):
+    """Tests for term-scoped courses and schedules"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.room = Classroom.objects.create(name='Room 101', capacity=50)
+        self.slot = TimeSlot.objects.get(day='Monday', slot='A')
+
+        self.course = Course.objects.create(
+            name='Programming', code='CS101', credits=3, teacher=self.teacher, department=self.department
+        )
+        self.schedule = Schedule.objects.create(course=self.course, timeslot=self.slot, classroom=self.room)
+        self.active = Term.get_active()
+
+    def add_old_term(self, code):
+        """Create a closed term holding a copy of CS101 and its schedule"""
+        term = Term.objects.create(code=code, is_closed=True)
+        course = Course.objects.create(
+            term=term, name='Programming', code='CS101', credits=3,
+            teacher=self.teacher, department=self.department
+        )
+        Schedule.objects.create(course=course, timeslot=self.slot, classroom=self.room)
+        return term, course
+
+    def test_new_rows_join_active_term(self):
+        """Test that courses default to the active term and schedules copy it"""
+        self.assertEqual(self.course.term, self.active)
+        self.assertEqual(self.schedule.term_id, self.active.pk)
+
+    def test_default_managers_scope_to_active_term(self):
+        """Test that older terms are invisible to the default managers"""
+        _, old_course = self.add_old_term('2024-AUTUMN')
+
+        self.assertEqual(list(Course.objects.all()), [self.course])
+        self.assertEqual(Schedule.objects.count(), 1)
+        self.assertEqual(list(self.department.courses.all()), [self.course])
+        self.assertEqual(Course.all_terms.count(), 2)
+        self.assertEqual(Schedule.all_terms.count(), 2)
+
+        # The same course code may be reused in another term
+        self.assertEqual(old_course.code, self.course.code)
+
+    def test_hot_query_plan_does_not_grow(self):
+        """Test that history does not change the plan of the timetable query"""
+        hot_query = Schedule.objects.filter(timeslot=self.slot).select_related('course', 'classroom')
+        plan_before = hot_query.explain()
+
+        for year in range(2020, 2025):
+            self.add_old_term(f'{year}-AUTUMN')
+
+        self.assertEqual(hot_query.explain(), plan_before)
+        self.assertEqual(hot_query.count(), 1)
+
+    def test_archive_term_command(self):
+        """Test that archiving moves a closed term to the archive tables"""
+        old_term, old_course = self.add_old_term('2024-AUTUMN')
+
+        out = StringIO()
+        call_command('archive_term', '2024-AUTUMN', stdout=out)
+        self.assertIn('Archived 1 courses and 1 schedules', out.getvalue())
+
+        self.assertFalse(Course.all_terms.filter(term=old_term).exists())
+        self.assertFalse(Schedule.all_terms.filter(term=old_term).exists())
+        archived = ArchivedCourse.objects.get(term=old_term)
+        self.assertEqual((archived.original_id, archived.code), (old_course.id, 'CS101'))
+        self.assertEqual(
+            list(ArchivedSchedule.objects.values_list('day', 'slot', 'classroom_name')),
+            [('Monday', 'A', 'Room 101')]
+        )
+
+        # The active term is untouched and cannot be archived
+        self.assertEqual(Course.objects.count(), 1)
+        with self.assertRaises(CommandError):
+            call_command('archive_term', self.active.code, stdout=StringIO())
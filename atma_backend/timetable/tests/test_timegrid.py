@@ -0,0 +1,78 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from timetable import grids, occupancy, schedbench, scheduler, timegrid
+from timetable.models import User, Department, Course, Classroom, Schedule, TimeSlot
+
+SIX_BY_TWELVE = schedbench.grid_config(6, 12)
+
+
+class TimeGridTestCase(TestCase):
+    """Tests for the configurable time grid"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.course = Course.objects.create(
+            name='Algorithms', code='CS201', credits=3, teacher=self.teacher, department=self.department
+        )
+        Classroom.objects.create(name='Room 101', capacity=50)
+
+    def test_default_grid_matches_timeslots(self):
+        """Test that the default grid has one timeslot row per cell"""
+        grid = timegrid.get_grid()
+        self.assertEqual(TimeSlot.objects.in_grid().count(), grid.size)
+        self.assertEqual(grid.breaks(), [('E', 'F')])
+        self.assertEqual(TimeSlot.objects.sync_grid(), (0, 0))
+
+    def test_invalid_grid_is_rejected(self):
+        """Test that overlapping slots and duplicate codes are configuration errors"""
+        with self.assertRaises(ImproperlyConfigured):
+            timegrid.TimeGrid(['Monday'], [('A', '09:00', '10:00'), ('B', '09:30', '10:30')])
+        with self.assertRaises(ImproperlyConfigured):
+            timegrid.TimeGrid(['Monday'], [('A', '09:00', '10:00'), ('A', '10:00', '11:00')])
+
+    def test_larger_grid_is_synced_and_scheduled(self):
+        """Test that a 6x12 grid gets its timeslots in bulk and the scheduler uses it"""
+        with override_settings(ATMA_TIME_GRID=SIX_BY_TWELVE):
+            created, updated = TimeSlot.objects.sync_grid()
+            grids.invalidate()
+            grid = timegrid.get_grid()
+            self.assertEqual(grid.size, 72)
+            # Monday to Friday existed with slots A-H, at the same times
+            self.assertEqual((created, updated), (72 - 40, 0))
+            self.assertEqual(TimeSlot.objects.in_grid().count(), 72)
+            self.assertEqual(len(occupancy.get_index().timeslots), 72)
+
+            result = scheduler.schedule_course(self.course, trace=False)
+            self.assertEqual(result.placed, 3)
+            days = set(Schedule.objects.filter(course=self.course).values_list('timeslot__day', flat=True))
+            self.assertEqual(len(days), 3)
+
+        # Back on the default grid, the extra rows are kept but ignored
+        self.assertEqual(TimeSlot.objects.in_grid().count(), 40)
+        self.assertEqual(len(occupancy.get_index().timeslots), 40)
+
+    def test_timetable_page_follows_grid(self):
+        """Test that the timetable page shows the configured days and slot times"""
+        self.client.force_login(self.teacher)
+        with override_settings(ATMA_TIME_GRID=SIX_BY_TWELVE):
+            TimeSlot.objects.sync_grid()
+            grids.invalidate()
+            response = self.client.get(reverse('teacher_timetable'))
+        self.assertContains(response, 'Saturday')
+        self.assertContains(response, '19:00 - 20:00')
+
+
+class SchedulerBenchmarkTestCase(TestCase):
+    """Tests for the scheduler scaling benchmark"""
+
+    def test_benchmark_rolls_back(self):
+        """Test that the benchmark reports every grid and leaves no data behind"""
+        report = schedbench.run([(5, 8), (6, 12)])
+        self.assertEqual([g['grid'] for g in report['grids']], ['5x8', '6x12'])
+        for grid in report['grids']:
+            self.assertEqual(grid['placed'], grid['required'])
+            self.assertEqual(grid['queries_per_run']['min'], grid['queries_per_run']['max'])
+        self.assertFalse(User.objects.filter(username__startswith='schedbench_').exists())
+        self.assertEqual(TimeSlot.objects.count(), 40)
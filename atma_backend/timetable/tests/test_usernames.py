@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.db.models.functions import Lower
+from django.test import TestCase, Client, override_settings
+from django.conf import settings
+from django.urls import reverse
+from timetable import usernames
+from timetable.models import User
+
+
+class UsernameCheckTestCase(TestCase):
+    """Tests for the Bloom-filter backed username check"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        User.objects.create(username='Alice', role='student')
+        usernames.index.rebuild()
+
+    def check(self, username):
+        return self.client.post(reverse('check_username'), {'username': username})
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test that every added key is found and few absent keys are"""
+        bloom = usernames.BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+        self.assertTrue(all(f'user{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other{i}' in bloom for i in range(10_000))
+        self.assertLess(false_positives, 300)
+
+    def test_repeated_adds_do_not_fill_the_filter(self):
+        """Test that logins and names already in the filter leave its count alone"""
+        count = usernames.index.bloom.count
+        alice = User.objects.get(username='Alice')
+        self.client.force_login(alice)  # Saves last_login
+        alice.save()
+        usernames.index.add('ALICE')
+        self.assertEqual(usernames.index.bloom.count, count)
+        User.objects.create(username='bob', role='student')
+        self.assertEqual(usernames.index.bloom.count, count + 1)
+
+    def test_free_names_skip_the_database(self):
+        """Test that names missing from the filter are answered without a query"""
+        with self.assertNumQueries(0):
+            self.assertContains(self.check('brand_new_name'), 'Username available')
+        with self.assertNumQueries(1):
+            self.assertContains(self.check('ALICE'), 'Username already taken')
+
+    def test_lookup_uses_the_lowercase_index(self):
+        """Test that the fallback query can use the Lower(username) index"""
+        plan = User.objects.alias(username_lower=Lower('username')).filter(username_lower='alice').explain()
+        self.assertIn('user_username_lower_idx', plan)
+
+    def test_new_users_are_picked_up(self):
+        """Test that saved users are added at once and bulk-created ones on refresh"""
+        User.objects.create(username='bob', role='student')
+        self.assertContains(self.check('Bob'), 'Username already taken')
+
+        User.objects.bulk_create([User(username='carol', role='student')])
+        self.assertContains(self.check('carol'), 'Username available')  # Not refreshed yet
+        usernames.index.refreshed_at = 0
+        self.assertContains(self.check('carol'), 'Username already taken')
+
+    @override_settings(ATMA_USERNAME_CHECK={**settings.ATMA_USERNAME_CHECK, 'RATE_LIMIT': 3})
+    def test_polling_is_rate_limited(self):
+        """Test that a client over the limit gets 429 until the window passes"""
+        for _ in range(3):
+            self.assertEqual(self.check('someone').status_code, 200)
+        response = self.check('someone')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+
+        other = Client(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.post(reverse('check_username'), {'username': 'someone'}).status_code, 200)
+
+    @override_settings(
+        ATMA_USERNAME_CHECK={**settings.ATMA_USERNAME_CHECK, 'RATE_LIMIT': 3},
+        ATMA_CLIENT_IP={'HEADER': 'X-Forwarded-For', 'PROXY_COUNT': 1},
+    )
+    def test_clients_behind_a_proxy_get_their_own_limit(self):
+        """Test that clients sharing the proxy's address are limited by the address the proxy forwards"""
+        def check(forwarded_for):
+            return Client(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for).post(
+                reverse('check_username'), {'username': 'someone'}
+            ).status_code
+
+        for _ in range(3):
+            self.assertEqual(check('203.0.113.5'), 200)
+        self.assertEqual(check('203.0.113.5'), 429)
+        self.assertEqual(check('203.0.113.6'), 200)
+        # A spoofed leading entry does not give the client a fresh bucket
+        self.assertEqual(check('198.51.100.1, 203.0.113.5'), 429)
@@ -0,0 +1,129 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from timetable import versions
+from timetable.models import User, Department, Course, TimeSlot, Classroom, Schedule, Term, TimetableVersion
+
+class TimetableVersionTestCase(TestCase):
+    """Tests for timetable snapshots, restore, diff and copy-forward"""
+
+    def setUp(self):
+        self.department = Department.objects.create(name='Computer Science', code='CS')
+        self.other_department = Department.objects.create(name='Mathematics', code='MA')
+        teacher = User.objects.create(username='teacher', role='teacher', department=self.department)
+        self.teacher = teacher
+        self.term = Term.get_active()
+
+        self.course = Course.objects.create(
+            name='Programming', code='CS101', credits=2, teacher=teacher, department=self.department
+        )
+        self.math = Course.objects.create(
+            name='Calculus', code='MA101', credits=1, teacher=teacher, department=self.other_department
+        )
+        self.room = Classroom.objects.create(name='Room 101', capacity=50)
+        self.slots = list(TimeSlot.objects.order_by('id')[:4])
+
+        Schedule.objects.create(course=self.course, timeslot=self.slots[0], classroom=self.room)
+        Schedule.objects.create(course=self.course, timeslot=self.slots[1], classroom=self.room)
+        Schedule.objects.create(course=self.math, timeslot=self.slots[2], classroom=self.room)
+
+    def test_pack_round_trip(self):
+        """Test that packing and unpacking preserves the sessions"""
+        sessions = [(3, 2, 1), (1, 2, 3), (2 ** 40, 5, 6)]
+        self.assertEqual(versions.unpack_sessions(versions.pack_sessions(sessions)), sorted(sessions))
+
+    def test_snapshot_and_restore(self):
+        """Test that restoring a version rolls back a bad scheduling run"""
+        version = versions.create_snapshot('before', self.term)
+        self.assertEqual(version.session_count, 3)
+
+        Schedule.objects.filter(course=self.course).delete()
+        Schedule.objects.create(course=self.course, timeslot=self.slots[3], classroom=self.room)
+
+        restored, skipped = versions.restore_snapshot(version)
+        self.assertEqual((restored, skipped), (3, []))
+        self.assertEqual(
+            set(Schedule.objects.values_list('course_id', 'timeslot_id')),
+            {(self.course.id, self.slots[0].id), (self.course.id, self.slots[1].id),
+             (self.math.id, self.slots[2].id)}
+        )
+
+    def test_restore_single_department(self):
+        """Test that a department restore leaves other departments alone"""
+        version = versions.create_snapshot('before', self.term)
+        Schedule.objects.all().delete()
+
+        restored, _ = versions.restore_snapshot(version, department=self.department)
+        self.assertEqual(restored, 2)
+        self.assertFalse(Schedule.objects.filter(course=self.math).exists())
+
+    def test_restore_skips_deleted_courses(self):
+        """Test that sessions of deleted courses are skipped on restore"""
+        version = versions.create_snapshot('before', self.term)
+        math_id = self.math.pk
+        self.math.delete()
+
+        restored, skipped = versions.restore_snapshot(version)
+        self.assertEqual((restored, skipped), (2, [(math_id, self.slots[2].id, self.room.id)]))
+
+    def test_restore_skips_deleted_rooms_and_timeslots(self):
+        """Test that sessions pointing at deleted classrooms or timeslots are skipped, not restored"""
+        other_room = Classroom.objects.create(name='Room 102', capacity=30)
+        Schedule.objects.filter(course=self.math).update(classroom=other_room)
+        version = versions.create_snapshot('before', self.term)
+        deleted_room, deleted_slot = other_room.pk, self.slots[1].pk
+        other_room.delete()
+        self.slots[1].delete()
+
+        restored, skipped = versions.restore_snapshot(version)
+        self.assertEqual(restored, 1)
+        self.assertEqual(sorted(skipped), sorted([
+            (self.course.id, deleted_slot, self.room.id),
+            (self.math.id, self.slots[2].id, deleted_room),
+        ]))
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_diff_reports_moves(self):
+        """Test that moved, added and removed sessions are told apart"""
+        version = versions.create_snapshot('before', self.term)
+
+        # Move one CS101 session and drop the MA101 one
+        Schedule.objects.filter(course=self.course, timeslot=self.slots[1]).update(timeslot=self.slots[3])
+        Schedule.objects.filter(course=self.math).delete()
+
+        diff = versions.diff_versions(version)
+        self.assertEqual(diff['unchanged'], 1)
+        self.assertEqual(len(diff['moved']), 1)
+        self.assertEqual(diff['moved'][0]['from']['timeslot_id'], self.slots[1].id)
+        self.assertEqual(diff['moved'][0]['to']['timeslot_id'], self.slots[3].id)
+        self.assertEqual(diff['removed'], [
+            {'course_id': self.math.id, 'timeslot_id': self.slots[2].id, 'classroom_id': self.room.id}
+        ])
+        self.assertEqual(diff['added'], [])
+
+    def test_versions_command(self):
+        """Test that a version copied forward restores into its own, non-active term"""
+        spring = Term.objects.create(code='2026-SPRING')
+        spring_course = Course.all_terms.create(
+            term=spring, name='Programming', code='CS101', credits=2, teacher=self.teacher, department=self.department
+        )
+        active = set(Schedule.objects.values_list('course_id', 'timeslot_id', 'classroom_id'))
+
+        call_command('timetable_versions', 'snapshot', self.term.code, 'final', stdout=StringIO())
+        call_command('timetable_versions', 'copy-forward', self.term.code, 'final', '2026-SPRING', stdout=StringIO())
+        copy = TimetableVersion.objects.get(term=spring, name='final')
+        self.assertEqual(versions.unpack_sessions(copy.data), sorted(active))
+
+        out = StringIO()
+        call_command('timetable_versions', 'restore', '2026-SPRING', 'final', stdout=out)
+        self.assertIn('Restored 2 sessions', out.getvalue())
+        self.assertEqual(
+            set(Schedule.all_terms.filter(term=spring).values_list('course_id', 'timeslot_id')),
+            {(spring_course.id, self.slots[0].id), (spring_course.id, self.slots[1].id)}
+        )
+        self.assertEqual(set(Schedule.objects.values_list('course_id', 'timeslot_id', 'classroom_id')), active)
+
+        out = StringIO()
+        call_command('timetable_versions', 'list', '--term', '2026-SPRING', stdout=out)
+        self.assertIn('2026-SPRING / final', out.getvalue())
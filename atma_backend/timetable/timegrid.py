@@ -0,0 +1,140 @@
+"""
+The weekly time grid, defined once in ``settings.ATMA_TIME_GRID``.
+
+``DAYS`` lists the teaching days in order and ``SLOTS`` the slots of every
+day as ``(code, "HH:MM", "HH:MM")`` in time order. A gap between one slot's
+end and the next slot's start is a break (lunch between E and F by
+default): labs never span it.
+
+``TimeSlot`` rows are generated from the grid in bulk after ``migrate``
+(``signals.populate_timeslots``). Rows of days or slots that were removed
+from the grid are left alone, since schedules may point at them, but they
+are no longer shown or scheduled into.
+
+Bit positions (``position``) are ``day index * slots per day + slot
+index``, so they move when the grid changes shape. Masks stored with them
+(teacher availability) keep the ``layout`` they were written on and are
+moved onto the current grid with ``remap``.
+"""
+import datetime
+import functools
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+MAX_CODE_LENGTH = 4
+
+
+def _time(value):
+    if isinstance(value, datetime.time):
+        return value
+    try:
+        return datetime.time.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ImproperlyConfigured(f"ATMA_TIME_GRID: invalid time {value!r}, use 'HH:MM'.")
+
+
+class TimeGrid:
+    def __init__(self, days, slots):
+        if not days or not slots:
+            raise ImproperlyConfigured("ATMA_TIME_GRID needs at least one day and one slot.")
+        if len(set(days)) != len(days):
+            raise ImproperlyConfigured("ATMA_TIME_GRID: duplicate day.")
+
+        self.days = list(days)
+        self.slots = [(code, _time(start), _time(end)) for code, start, end in slots]
+        self.codes = [code for code, _, _ in self.slots]
+        if len(set(self.codes)) != len(self.codes):
+            raise ImproperlyConfigured("ATMA_TIME_GRID: duplicate slot code.")
+        for code, start, end in self.slots:
+            if not code or len(code) > MAX_CODE_LENGTH:
+                raise ImproperlyConfigured(f"ATMA_TIME_GRID: slot codes are 1-{MAX_CODE_LENGTH} characters.")
+            if start >= end:
+                raise ImproperlyConfigured(f"ATMA_TIME_GRID: slot {code} ends before it starts.")
+        for (code, _, end), (_, start, _) in zip(self.slots, self.slots[1:]):
+            if start < end:
+                raise ImproperlyConfigured(f"ATMA_TIME_GRID: slot {code} overlaps the next one.")
+
+        self.slot_times = {code: (start, end) for code, start, end in self.slots}
+        self._day_index = {day: i for i, day in enumerate(self.days)}
+        self._slot_index = {code: i for i, code in enumerate(self.codes)}
+
+    @property
+    def size(self):
+        return len(self.days) * len(self.slots)
+
+    def __contains__(self, cell):
+        day, slot = cell
+        return day in self._day_index and slot in self._slot_index
+
+    def position(self, day, slot):
+        """Bit position of a (day, slot) cell; ``ValueError`` if it is not in the grid."""
+        try:
+            return self._day_index[day] * len(self.slots) + self._slot_index[slot]
+        except KeyError:
+            raise ValueError(f"{day} {slot} is not in the time grid.")
+
+    @functools.cached_property
+    def layout(self):
+        """The days and slot codes, stored next to bitmasks so ``remap`` can move their bits."""
+        return json.dumps([self.days, self.codes], separators=(',', ':'))
+
+    def remap(self, mask, layout):
+        """Move the bits of ``mask``, stored on ``layout``, to this grid; cells it no longer has are dropped."""
+        if layout == self.layout:
+            return mask
+        days, codes = json.loads(layout)
+        remapped = 0
+        for i, day in enumerate(days):
+            for j, slot in enumerate(codes):
+                if mask >> (i * len(codes) + j) & 1 and (day, slot) in self:
+                    remapped |= 1 << self.position(day, slot)
+        return remapped
+
+    def day_order(self, day):
+        return self._day_index.get(day, len(self.days))
+
+    def labels(self):
+        """``{slot code: "HH:MM - HH:MM"}`` in time order."""
+        return {
+            code: f"{start.strftime('%H:%M')} - {end.strftime('%H:%M')}"
+            for code, start, end in self.slots
+        }
+
+    def breaks(self):
+        """``(after slot, before slot)`` pairs with a gap between them."""
+        return [
+            (code, following)
+            for (code, _, end), (following, start, _) in zip(self.slots, self.slots[1:])
+            if start > end
+        ]
+
+
+@functools.cache
+def get_grid():
+    config = settings.ATMA_TIME_GRID
+    return TimeGrid(config['DAYS'], config['SLOTS'])
+
+
+@receiver(setting_changed)
+def _reset_grid(setting, **kwargs):
+    if setting == 'ATMA_TIME_GRID':
+        get_grid.cache_clear()
+
+
+# Callables for model and form field choices, so the grid is read when used
+# and migrations do not change with the configuration
+
+def day_choices():
+    return [(day, day) for day in get_grid().days]
+
+
+def slot_choices():
+    return list(get_grid().labels().items())
+
+
+def current_layout():
+    return get_grid().layout
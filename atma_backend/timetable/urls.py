@@ -1,5 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from .views import auth_views, hod_views, student_views, teacher_views
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .views import auth_views, hod_views, student_views, teacher_views, metrics_views, async_views, live_views, api_views
+
+# Read-heavy pages have native async versions, used when serving through asgi.py
+if settings.ATMA_ASYNC_VIEWS:
+    view_timetable = async_views.view_timetable
+    course_detail = async_views.course_detail
+    teacher_timetable = async_views.teacher_timetable
+    teacher_course_detail = async_views.teacher_course_detail
+else:
+    view_timetable = student_views.view_timetable
+    course_detail = student_views.course_detail
+    teacher_timetable = teacher_views.view_timetable
+    teacher_course_detail = teacher_views.course_detail
 
 urlpatterns = [
     path('', auth_views.home, name="home"),
@@ -9,22 +23,45 @@ urlpatterns = [
     
     # Student routes
     path('select-batch/', auth_views.select_batch, name='select_batch'),
-    path('timetable/', student_views.view_timetable, name='view_timetable'),
-    path('course-detail/<str:course_id>/', student_views.course_detail, name='course_detail'),
+    path('timetable/', view_timetable, name='view_timetable'),
+    path('course-detail/<str:course_id>/', course_detail, name='course_detail'),
+    path('electives/', student_views.elective_registration, name='student_electives'),
+    path('electives/<int:course_id>/register/', student_views.register_elective, name='register_elective'),
+    path('electives/<int:course_id>/drop/', student_views.drop_elective, name='drop_elective'),
     
     # Teacher routes
     path('teacher/', teacher_views.teacher_home, name='teacher_home'),
-    path('teacher/timetable/', teacher_views.view_timetable, name='teacher_timetable'),
-    path('teacher/course-detail/<str:course_id>/', teacher_views.course_detail, name='teacher_course_detail'),
+    path('teacher/timetable/', teacher_timetable, name='teacher_timetable'),
+    path('teacher/course-detail/<str:course_id>/', teacher_course_detail, name='teacher_course_detail'),
+    path('rooms/free/', teacher_views.free_rooms, name='free_rooms'),
+    path('teacher/availability/', teacher_views.availability, name='teacher_availability'),
+    path('teacher/availability/<str:day>/<str:slot>/', teacher_views.toggle_availability, name='teacher_availability_cell'),
     
     # HOD routes
     path('manage-courses/', hod_views.manage_courses, name='hod-manage-courses'),
     path('schedule-course/<str:course_id>/', hod_views.schedule_course, name='hod-schedule-course'),
+    path('schedule-course/<int:course_id>/preview/', hod_views.schedule_preview, name='hod-schedule-preview'),
+    path('schedule-course/<int:course_id>/commit/', hod_views.commit_schedule, name='hod-schedule-commit'),
     path('delete-course/<str:course_id>/', hod_views.delete_course, name='hod-delete-course'),
+    path('scheduling-bottlenecks/', hod_views.scheduling_bottlenecks, name='hod-scheduling-bottlenecks'),
     
     # HTMX endpoints
-    path('check-username/', hod_views.check_username, name='check_username'),
+    path('check-username/', auth_views.check_username, name='check_username'),
     path('htmx/courses/<int:course_id>/edit/', hod_views.htmx_update_course, name='htmx-edit-course'),
     path('htmx/courses/create/', hod_views.htmx_create_course, name='htmx-create-course'),
     path('hod/htmx/course-list/', hod_views.htmx_course_list, name='htmx-course-list'),
+
+    # Live timetable updates
+    path('timetable/events/', live_views.timetable_events, name='timetable_events'),
+    path('timetable/cell/<str:day>/<str:slot>/', live_views.timetable_cell, name='timetable_cell'),
+
+    # JSON API for the mobile app (JWT bearer tokens)
+    path('api/token/', TokenObtainPairView.as_view(), name='api-token'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='api-token-refresh'),
+    path('api/me/timetable/', api_views.my_timetable, name='api-my-timetable'),
+    path('api/me/courses/', api_views.my_courses, name='api-my-courses'),
+    path('api/courses/<int:course_id>/', api_views.course_detail, name='api-course-detail'),
+
+    # Monitoring
+    path('metrics', metrics_views.metrics_view, name='metrics'),
 ]
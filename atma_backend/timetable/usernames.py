@@ -0,0 +1,118 @@
+"""
+Username availability for the signup form.
+
+Every keystroke in the signup username field asks whether the name is
+free. Most of those names are new, so a process-wide Bloom filter of the
+lowercased usernames answers "available" without touching the database.
+Only a possible hit (a taken name, or a false positive at ``ERROR_RATE``)
+falls back to a query on the ``Lower(username)`` index. The comparison is
+case-insensitive, like the signup form's own uniqueness check.
+
+The filter is refreshed incrementally, fetching only users with an id
+above the last one seen, at most every ``REFRESH_INTERVAL`` seconds; users
+created in this process are added right away by a signal. Deleted or
+renamed users stay in the filter as false positives until the periodic
+rebuild, and new names of renamed users are only picked up by it (the
+signup form's own uniqueness check still refuses them).
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.functions import Lower
+
+from .metrics import USERNAME_CHECKS
+from .models import User
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        # Only keys that set a new bit count towards the capacity, so adding a
+        # name twice does not make the filter look fuller than it is
+        new = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            new = new or not self.bits[position >> 3] & mask
+            self.bits[position >> 3] |= mask
+        if new:
+            self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _config():
+    return settings.ATMA_USERNAME_CHECK
+
+
+class UsernameIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.max_id = 0
+        self.refreshed_at = 0.0
+        self.built_at = 0.0
+
+    def rebuild(self):
+        """Load every username into a filter sized for twice the current users."""
+        with self.lock:
+            names = list(User.objects.order_by().values_list('pk', 'username'))
+            bloom = BloomFilter(max(2 * len(names), _config()['MIN_CAPACITY']), _config()['ERROR_RATE'])
+            for _, username in names:
+                bloom.add(username.lower())
+            self.bloom = bloom
+            self.max_id = max((pk for pk, _ in names), default=0)
+            self.refreshed_at = self.built_at = time.monotonic()
+
+    def refresh(self):
+        """Add users created since the last refresh; rebuild when the filter is full or old."""
+        now = time.monotonic()
+        if self.bloom is None or now - self.built_at > _config()['REBUILD_INTERVAL']:
+            return self.rebuild()
+        with self.lock:
+            new = list(User.objects.filter(pk__gt=self.max_id).order_by().values_list('pk', 'username'))
+            for pk, username in new:
+                self.bloom.add(username.lower())
+                self.max_id = max(self.max_id, pk)
+            self.refreshed_at = now
+            full = self.bloom.count > self.bloom.capacity
+        if full:
+            self.rebuild()
+
+    def add(self, username):
+        if self.bloom is not None:
+            self.bloom.add(username.lower())
+
+    def is_available(self, username):
+        if self.bloom is None or time.monotonic() - self.refreshed_at > _config()['REFRESH_INTERVAL']:
+            self.refresh()
+        key = username.lower()
+        if key not in self.bloom:
+            USERNAME_CHECKS.inc(result='bloom')
+            return True
+        taken = User.objects.alias(username_lower=Lower('username')).filter(username_lower=key).exists()
+        USERNAME_CHECKS.inc(result='db_taken' if taken else 'db_free')
+        return not taken
+
+
+index = UsernameIndex()
+
+
+def is_available(username):
+    return index.is_available(username)
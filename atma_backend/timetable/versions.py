@@ -0,0 +1,173 @@
+"""
+Named timetable versions stored as compact snapshots.
+
+A snapshot is the list of (course_id, timeslot_id, classroom_id) triples of
+every ``Schedule`` row, sorted, packed into a signed 64-bit array and
+zlib-compressed into a single ``TimetableVersion`` row. History therefore
+never adds rows to the ``Schedule`` table that the timetable views query.
+
+Every version belongs to a ``Term`` and restores into that term. A version
+copied forward to a new term still holds the old term's course ids; on
+restore they are matched to the new term's courses by course code.
+"""
+import zlib
+from array import array
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from . import events, grids
+from .models import ArchivedCourse, Classroom, Course, Schedule, TimeSlot, TimetableVersion
+
+
+def pack_sessions(sessions):
+    """Pack an iterable of (course, timeslot, classroom) id triples into bytes."""
+    packed = array('q')
+    for session in sorted(sessions):
+        packed.extend(session)
+    return zlib.compress(packed.tobytes())
+
+
+def unpack_sessions(data):
+    """Inverse of ``pack_sessions``: return a list of id triples."""
+    packed = array('q')
+    packed.frombytes(zlib.decompress(bytes(data)))
+    return [tuple(packed[i:i + 3]) for i in range(0, len(packed), 3)]
+
+
+def current_sessions(department=None, term=None):
+    """Return the live timetable (of ``term``, default active) as id triples, optionally for one department."""
+    schedules = Schedule.objects.all() if term is None else Schedule.all_terms.filter(term=term)
+    if department is not None:
+        schedules = schedules.filter(course__department=department)
+    return list(schedules.values_list('course_id', 'timeslot_id', 'classroom_id'))
+
+
+def create_snapshot(name, term, user=None):
+    """Store the timetable of ``term`` as a named version of it."""
+    sessions = current_sessions(term=term)
+    return TimetableVersion.objects.create(
+        name=name,
+        term=term,
+        created_by=user,
+        session_count=len(sessions),
+        data=pack_sessions(sessions),
+    )
+
+
+def _course_map(term, course_ids):
+    """Map stored course ids to courses of ``term``: the same course, else the one with the same code."""
+    in_term = dict(Course.all_terms.filter(term=term).values_list('code', 'id'))
+    same = set(in_term.values())
+    codes = dict(Course.all_terms.filter(id__in=course_ids - same).values_list('id', 'code'))
+    codes.update(
+        ArchivedCourse.objects.filter(original_id__in=course_ids - same - codes.keys()).values_list('original_id', 'code')
+    )
+    mapping = {course_id: course_id for course_id in course_ids & same}
+    for course_id, code in codes.items():
+        if code in in_term:
+            mapping[course_id] = in_term[code]
+    return mapping
+
+
+@transaction.atomic
+def restore_snapshot(version, department=None):
+    """
+    Replace the timetable of the version's term with the sessions stored in
+    ``version``.
+
+    With a ``department`` only that department's courses are restored and
+    every other schedule is left untouched. Sessions whose course (or a
+    course with its code in the term), timeslot or classroom no longer
+    exists are skipped. Returns ``(restored, skipped)``, the number restored
+    and the skipped id triples.
+    """
+    sessions = unpack_sessions(version.data)
+    term = version.term
+
+    course_map = _course_map(term, {session[0] for session in sessions})
+    courses = Course.all_terms.filter(term=term)
+    if department is not None:
+        courses = courses.filter(department=department)
+    course_ids = set(courses.values_list('id', flat=True))
+    timeslot_ids = set(
+        TimeSlot.objects.filter(id__in={session[1] for session in sessions}).values_list('id', flat=True)
+    )
+    classroom_ids = set(
+        Classroom.objects.filter(id__in={session[2] for session in sessions}).values_list('id', flat=True)
+    )
+
+    schedules = Schedule.all_terms.filter(term=term)
+    with events.bulk_change():
+        if department is None:
+            schedules.delete()
+        else:
+            schedules.filter(course__department=department).delete()
+    restored, skipped = [], []
+    for session in sessions:
+        course_id, timeslot_id, classroom_id = session
+        if course_id not in course_map or timeslot_id not in timeslot_ids or classroom_id not in classroom_ids:
+            skipped.append(session)
+        elif course_map[course_id] in course_ids:
+            restored.append(Schedule(
+                term=term, course_id=course_map[course_id], timeslot_id=timeslot_id, classroom_id=classroom_id,
+            ))
+    Schedule.all_terms.bulk_create(restored, batch_size=500)
+    grids.invalidate()  # bulk_create does not send post_save
+
+    return len(restored), skipped
+
+
+def diff_sessions(old, new):
+    """
+    Compare two lists of id triples in O(n).
+
+    Sessions of the same course that disappear from one place and appear in
+    another are reported as moves; the rest are plain additions or removals.
+    """
+    old_by_course = defaultdict(Counter)
+    new_by_course = defaultdict(Counter)
+    for course_id, timeslot_id, classroom_id in old:
+        old_by_course[course_id][(timeslot_id, classroom_id)] += 1
+    for course_id, timeslot_id, classroom_id in new:
+        new_by_course[course_id][(timeslot_id, classroom_id)] += 1
+
+    result = {'moved': [], 'added': [], 'removed': [], 'unchanged': 0}
+    for course_id in old_by_course.keys() | new_by_course.keys():
+        before = old_by_course[course_id]
+        after = new_by_course[course_id]
+        result['unchanged'] += sum((before & after).values())
+
+        removed = list((before - after).elements())
+        added = list((after - before).elements())
+        # Pair removals with additions of the same course as moves
+        for (from_slot, from_room), (to_slot, to_room) in zip(removed, added):
+            result['moved'].append({
+                'course_id': course_id,
+                'from': {'timeslot_id': from_slot, 'classroom_id': from_room},
+                'to': {'timeslot_id': to_slot, 'classroom_id': to_room},
+            })
+        pairs = min(len(removed), len(added))
+        for timeslot_id, classroom_id in removed[pairs:]:
+            result['removed'].append({'course_id': course_id, 'timeslot_id': timeslot_id, 'classroom_id': classroom_id})
+        for timeslot_id, classroom_id in added[pairs:]:
+            result['added'].append({'course_id': course_id, 'timeslot_id': timeslot_id, 'classroom_id': classroom_id})
+
+    return result
+
+
+def diff_versions(old_version, new_version=None):
+    """Diff two versions; without ``new_version`` compare against the live timetable of its term."""
+    new = unpack_sessions(new_version.data) if new_version is not None else current_sessions(term=old_version.term)
+    return diff_sessions(unpack_sessions(old_version.data), new)
+
+
+def copy_forward(version, term, name=None, user=None):
+    """Seed ``term`` with a copy of an existing version; restore it to fill the term's timetable."""
+    return TimetableVersion.objects.create(
+        name=name or version.name,
+        term=term,
+        created_by=user,
+        session_count=version.session_count,
+        data=version.data,
+    )
@@ -0,0 +1,55 @@
+"""
+JSON API for the mobile app, authenticated with JWT access tokens (see
+``timetable/api.py``). Obtain a token pair at ``api/token/``, send the
+access token as ``Authorization: Bearer <token>`` and get a new one from
+``api/token/refresh/`` when it expires.
+"""
+from django.db.models import Exists, OuterRef, Q
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.response import Response
+
+from .. import api
+from ..models import Course
+
+
+@api_view(['GET'])
+def my_timetable(request):
+    """The user's timetable as a compact grid; 304 while the timetable is unchanged."""
+    found = api.owner(request.user)
+    if found is None:
+        raise NotFound("No timetable for this account.")
+    payload = api.grid_payload(*found)
+    etag = api.grid_etag(payload)
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(payload, headers={'ETag': etag})
+
+
+@api_view(['GET'])
+def my_courses(request):
+    """Courses the user teaches, or takes (core and elective)."""
+    found = api.owner(request.user)
+    if found is None:
+        raise NotFound("No courses for this account.")
+    kind, owner = found
+    if kind == 'teacher':
+        courses = Course.objects.filter(teacher=owner.pk).annotate(elective=Q(elective_seats__isnull=False))
+    else:
+        enrolled = Course.elective_students.through.objects.filter(course=OuterRef('pk'), student=owner.pk)
+        courses = (
+            Course.objects.filter(Q(batches=owner.batch_id) | Q(elective_students=owner.pk))
+            .distinct().annotate(elective=Exists(enrolled))
+        )
+    return Response({'courses': list(courses.order_by('code').values('id', 'code', 'name', 'credits', 'elective'))})
+
+
+@api_view(['GET'])
+def course_detail(request, course_id):
+    """A course with its teacher, batches and sessions; teachers only see their own."""
+    course = get_object_or_404(Course.objects.with_details(), id=course_id)
+    if request.auth.get(api.ROLE_CLAIM) == 'teacher' and course.teacher_id != request.user.pk:
+        raise PermissionDenied()
+    return Response(api.course_payload(course))
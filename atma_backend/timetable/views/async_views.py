@@ -0,0 +1,106 @@
+"""
+Native async versions of the read-heavy student and teacher pages.
+
+They are routed instead of their sync counterparts when ``ATMA_ASYNC_VIEWS``
+is on, which ``asgi.py`` does by default. All database and cache access
+happens up front through the async ORM and cache APIs; templates are then
+rendered from fully loaded objects, so nothing lazy hits the database from
+the event loop.
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect, render
+
+from .. import authz, events, grids
+from ..models import Course, Student, User
+
+
+async def aload_user(request):
+    """
+    The logged-in user with the department (and its HOD) the navbar needs,
+    also set as ``request.user`` so rendering never loads it synchronously.
+    """
+    user = await request.auser()
+    user = await User.objects.select_related('department__hod').aget(pk=user.pk)
+    authz.attach(request, user)
+    return user
+
+
+async def aget_course(course_id):
+    course = await Course.objects.with_details().filter(id=course_id).afirst()
+    if course is None:
+        raise Http404("No Course matches the given query.")
+    return course
+
+
+@login_required
+async def view_timetable(request):
+    """
+    View for displaying a student's timetable.
+    """
+    user = await aload_user(request)
+    student = await Student.objects.select_related('user', 'batch__department').filter(user=user).afirst()
+
+    context = {
+        'user': user,
+        'student': student,
+    }
+
+    if student:
+        context.update({
+            'time_slots': await grids.atime_slot_labels(),
+            'days_of_week': grids.days_of_week(),
+            'timetable_data': await grids.astudent_grid(student),
+            'events_cursor': await events.acurrent_cursor(events.student_channels(student)),
+        })
+
+    return render(request, 'student/timetable.html', context)
+
+
+@login_required
+async def course_detail(request, course_id):
+    """Return course details for modal display"""
+    course = await aget_course(course_id)
+
+    return render(request, 'student/partials/course_detail.html', {
+        'course': course
+    })
+
+
+@login_required
+async def teacher_timetable(request):
+    """
+    View for displaying a teacher's timetable.
+    """
+    user = await aload_user(request)
+    if user.role != 'teacher':
+        return redirect('home')
+
+    context = {
+        'user': user,
+        'time_slots': await grids.atime_slot_labels(),
+        'days_of_week': grids.days_of_week(),
+        'timetable_data': await grids.ateacher_grid(user),
+        'events_cursor': await events.acurrent_cursor(events.teacher_channels(user)),
+        'courses': [course async for course in Course.objects.filter(teacher=user)],
+    }
+
+    return render(request, 'teacher/timetable.html', context)
+
+
+@login_required
+async def teacher_course_detail(request, course_id):
+    """Return course details for modal display"""
+    user = await request.auser()
+    if user.role != 'teacher':
+        return HttpResponse("Unauthorized", status=403)
+
+    course = await aget_course(course_id)
+
+    # Check if the teacher is allowed to view this course
+    if course.teacher_id != user.pk:
+        return HttpResponse("Unauthorized", status=403)
+
+    return render(request, 'teacher/partials/course_detail.html', {
+        'course': course
+    })
@@ -3,18 +3,30 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.urls import reverse
+from django.conf import settings
+from .. import authz, metrics, ratelimit, usernames
 from ..forms import CustomUserCreationForm, CustomAuthenticationForm
-from ..models import Batch, Student, User
+from ..models import Batch, Student
 from django.http import HttpResponse
 
 # Authentication and checking functions
 def check_username(request):
     """Check if username is available"""
+    config = settings.ATMA_USERNAME_CHECK
+    if ratelimit.exceeded(request, 'check_username', config['RATE_LIMIT'], config['RATE_WINDOW']):
+        metrics.USERNAME_CHECKS.inc(result='rate_limited')
+        response = HttpResponse(
+            '<div class="error-feedback">Too many checks, please slow down</div>', status=429
+        )
+        response['Retry-After'] = str(config['RATE_WINDOW'])
+        return response
+
     username = request.POST.get('username', '')
     if not username:
         return HttpResponse("")
     
-    if User.objects.filter(username=username).exists():
+    # Most names typed during signup are free; those never reach the database
+    if not usernames.is_available(username):
         return HttpResponse(
             '<div class="error-feedback">Username already taken</div>'
         )
@@ -44,7 +56,7 @@ def home(request):
                     messages.error(request, "Your account doesn't have a department. Please contact admin.")
             return render(request, 'student/home.html', context)
         
-        elif request.user.department and request.user == request.user.department.hod:
+        elif authz.access(request).is_hod:
             return render(request, 'hod/home.html', context)
     
         elif request.user.role == 'teacher':
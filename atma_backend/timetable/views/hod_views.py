@@ -1,189 +1,194 @@
-from django.http import HttpResponse
+from django.core import signing
+from django.http import HttpResponseBadRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.contrib.auth.decorators import login_required
-from ..models import User, Course, Schedule, TimeSlot, Classroom
+from .. import grids, scheduler
+from ..authz import hod_required
+from ..models import User, Course, Schedule, TimeSlot, Batch, SchedulingRun
 from ..forms import CreateCourseForm
-from django.urls import reverse
-
-# Authentication and checking functions
-def check_username(request):
-    """Check if username is available"""
-    username = request.POST.get('username', '')
-    if not username:
-        return HttpResponse("")
-    
-    if User.objects.filter(username=username).exists():
-        return HttpResponse(
-            '<div class="error-feedback">Username already taken</div>'
-        )
-    return HttpResponse(
-        '<div class="success-feedback">Username available</div>'
-    )
-
 
 # HOD views for course management
+@hod_required
 def manage_courses(request):
-    # Check if the user is authenticated and is a HOD
-    if request.user.is_authenticated and hasattr(request.user, 'department') and request.user == request.user.department.hod:
-        # Fetch courses for the HOD's department
-        courses = request.user.department.courses.all()
-        context = {
-            'courses': courses,
-        }
-        return render(request, 'hod/manage_courses.html', context)
-    else:
-        # Redirect to home if not authorized
-        return redirect('home')
-
-def schedule_course(request, course_id):
-    # Check if the user is authenticated and is a HOD
-    if request.user.is_authenticated \
-      and hasattr(request.user, 'department') \
-      and request.user.department \
-      and request.user == request.user.department.hod:
-        # Fetch the course by ID
-        try:
-            course = Course.objects.get(id=course_id, department=request.user.department)
-        except Course.DoesNotExist:
-            return redirect('hod-manage-courses')
-    
-        # Determine how many schedules we need to create based on credits
-        required_schedules = course.credits
-        schedules_created = 0
+    # Fetch courses for the HOD's department
+    courses = Course.objects.with_details().filter(department=request.user.department)
+    context = {
+        'courses': courses,
+    }
+    return render(request, 'hod/manage_courses.html', context)
 
-        # Get all available timeslots after filtering out teacher and batch conflicts
-        all_timeslots = TimeSlot.objects.all()
+def course_action_response(request, course=None, swap=None, empty=False, trigger=None):
+    """
+    Answer an HTMX course action with only the affected row and the
+    messages as toasts, instead of re-rendering the whole course list.
+    """
+    if course is not None:
+        course = Course.objects.with_details().get(pk=course.pk)
+    response = render(request, 'hod/partials/course_action.html', {
+        'course': course,
+        'swap': swap,
+        'empty': empty,
+    })
+    if trigger:
+        response['HX-Trigger'] = trigger
+    return response
 
-        teacher_busy_timeslots = TimeSlot.objects.filter(
-            schedules__course__teacher=course.teacher
-        )
-        available_timeslots = all_timeslots.exclude(id__in=teacher_busy_timeslots)
+REJECTION_LABELS = {
+    'teacher_busy': "the teacher is busy",
+    'batch_busy': "a batch already has a class",
+    'day_limit': "the day already has 2 classes of the course",
+    'no_room': "no classroom is free",
+    'teacher_unavailable': "the teacher is unavailable",
+    'no_lab_block': "no room has enough consecutive free slots for the lab",
+}
 
-        if course.batches.exists():
-            batch_ids = course.batches.values_list('id', flat=True)
-            batch_busy_timeslots = TimeSlot.objects.filter(
-                schedules__course__batches__id__in=batch_ids
-            ).distinct()
-            available_timeslots = available_timeslots.exclude(id__in=batch_busy_timeslots)
-            
-        # Group available timeslots by day. (Assuming each TimeSlot has a 'day' attribute.)
-        timeslots_by_day = {}
-        for ts in available_timeslots:
-            day = ts.day  # e.g. 'Monday', 'Tuesday', etc.
-            timeslots_by_day.setdefault(day, []).append(ts)
+def blocked_by(result):
+    """Explain the constraint that rejected the most candidate slots."""
+    reason = result.main_constraint
+    if reason is None:
+        return ""
+    return f" Most slots were rejected because {REJECTION_LABELS[reason]} ({result.rejections[reason]} slots)."
 
-        # Optionally sort timeslots within each day by start time.
-        for day in timeslots_by_day:
-            timeslots_by_day[day] = sorted(timeslots_by_day[day], key=lambda ts: ts.start_time)
-
-        # Define the standard chronological order for days.
-        standard_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+@hod_required
+def schedule_course(request, course_id):
+    # Fetch the course by ID
+    try:
+        course = Course.objects.get(id=course_id, department=request.user.department)
+    except Course.DoesNotExist:
+        return redirect('hod-manage-courses')
 
-        # Filter to only include days that have available timeslots.
-        available_days = [day for day in standard_days if day in timeslots_by_day]
+    result = scheduler.schedule_course(course, user=request.user)
+    schedules_created = result.placed
+    required_schedules = result.required
 
-        if available_days:
-            # Find the day with the most available timeslots.
-            start_day = max(available_days, key=lambda d: len(timeslots_by_day[d]))
-            # Rotate the available_days list so that start_day is first.
-            start_index = available_days.index(start_day)
-            days = available_days[start_index:] + available_days[:start_index]
-        else:
-            days = []  # No available days
+    # Provide feedback to the user based on the outcome.
+    if schedules_created == required_schedules:
+        messages.success(request, f"Successfully added {schedules_created} schedules for course {course.name}.")
+    elif schedules_created > 0:
+        messages.warning(request, f"Could only add {schedules_created} out of {required_schedules} required schedules for course {course.name}.{blocked_by(result)}")
+    else:
+        messages.error(request, f"No suitable timeslots and classrooms found for this course.{blocked_by(result)}")
 
-        # Initialize a counter for how many classes have been scheduled per day.
-        day_schedule_count = { day: 0 for day in days }
-        preferred_classrooms = {}  # Dictionary to store the chosen classroom for each day
+    if request.htmx:
+        return course_action_response(request, course)
+    return redirect('hod-manage-courses')
 
-        # Determine how many schedules need to be created (based on course credits).
-        required_schedules = course.credits
-        schedules_created = 0
+PLAN_SALT = 'timetable.schedule-plan'
+PLAN_MAX_AGE = 60 * 60
 
-        # Round-robin assignment across days.
-        while schedules_created < required_schedules:
-            progress = False  # To check if we managed to assign any schedule in this round.
-            for day in days:
-                if schedules_created >= required_schedules:
-                    break
+def schedule_preview_response(request, course, stale=False):
+    """Run the scheduler without writing and render the proposed placements."""
+    result = scheduler.preview_course(course)
+    grid = {day: {} for day in grids.days_of_week()}
+    for timeslot, room in result.placements:
+        grid.setdefault(timeslot.day, {})[timeslot.slot] = room
+    plan = signing.dumps({
+        'course': course.pk,
+        'plan': [[timeslot.pk, room.pk] for timeslot, room in result.placements],
+        'fingerprint': result.fingerprint,
+    }, salt=PLAN_SALT)
+    return render(request, 'hod/partials/schedule_preview.html', {
+        'course': course,
+        'result': result,
+        'blocked_by': blocked_by(result) if result.placed < result.required else "",
+        'grid': grid,
+        'time_slots': grids.time_slot_labels(),
+        'plan': plan,
+        'stale': stale,
+    })
 
-                # Only try to schedule if this day has less than 2 classes for the course.
-                if day_schedule_count[day] < 2 and timeslots_by_day[day]:
-                    # Pop the next available timeslot from this day.
-                    timeslot = timeslots_by_day[day].pop(0)
+@hod_required(forbidden=True)
+def schedule_preview(request, course_id):
+    """Show where the scheduler would place a course, without saving anything."""
+    course = get_object_or_404(Course, id=course_id, department=request.user.department)
+    return schedule_preview_response(request, course)
 
-                    # Find available classrooms for the chosen timeslot.
-                    busy_classrooms = Classroom.objects.filter(schedules__timeslot=timeslot)
-                    available_classrooms = Classroom.objects.exclude(id__in=busy_classrooms).filter(availability=True)
+@hod_required(forbidden=True)
+def commit_schedule(request, course_id):
+    """Save a previewed plan exactly, or show a fresh preview if it went stale."""
+    if request.method != "POST":
+        return redirect('hod-manage-courses')
+    course = get_object_or_404(Course, id=course_id, department=request.user.department)
+    try:
+        data = signing.loads(request.POST.get('plan', ''), salt=PLAN_SALT, max_age=PLAN_MAX_AGE)
+    except signing.BadSignature:
+        return HttpResponseBadRequest("Invalid or expired plan.")
+    if data['course'] != course.pk:
+        return HttpResponseBadRequest("The plan is for another course.")
 
-                    if available_classrooms.exists():
-                        if day in preferred_classrooms:
-                            preferred = preferred_classrooms[day]
-                        else:
-                            preferred = None
+    try:
+        result = scheduler.commit_plan(course, data['plan'], data['fingerprint'])
+    except scheduler.StalePlan:
+        if request.htmx:
+            return schedule_preview_response(request, course, stale=True)
+        messages.error(request, "The timetable changed since the preview. Preview the course again.")
+        return redirect('hod-manage-courses')
 
-                        # If the preferred classroom is available, use it.
-                        if preferred and available_classrooms.filter(id=preferred.id).exists():
-                            classroom = preferred
-                        else:
-                            # Otherwise, choose the first available classroom.
-                            classroom = available_classrooms.first()
-                            # Immediately update the preferred classroom for this day.
-                            preferred_classrooms[day] = classroom
-                        
-                        Schedule.objects.create(course=course, timeslot=timeslot, classroom=classroom)
-                        day_schedule_count[day] += 1
-                        schedules_created += 1
-                        progress = True
+    messages.success(request, f"Added {result.placed} schedules for course {course.name}.")
+    if request.htmx:
+        return course_action_response(request, course, swap='replace', trigger='closeModal')
+    return redirect('hod-manage-courses')
 
-            # If no progress was made during a full round, break to prevent an infinite loop.
-            if not progress:
-                break
+@hod_required
+def scheduling_bottlenecks(request):
+    """Summarize traced scheduling runs: which resources blocked the most slots."""
+    runs = list(SchedulingRun.objects.filter(department=request.user.department).select_related('course')[:50])
+    summary = scheduler.bottleneck_summary(runs)
 
-        # Provide feedback to the user based on the outcome.
-        if schedules_created == required_schedules:
-            messages.success(request, f"Successfully added {schedules_created} schedules for course {course.name}.")
-        elif schedules_created > 0:
-            messages.warning(request, f"Could only add {schedules_created} out of {required_schedules} required schedules for course {course.name}.")
-        else:
-            messages.error(request, "No suitable timeslots and classrooms found for this course.")
+    # Resolve the ids in the summary to objects for display
+    teachers = User.objects.in_bulk([pk for pk, _ in summary['teachers']])
+    batches = Batch.objects.select_related('department').in_bulk([pk for pk, _ in summary['batches']])
+    timeslots = TimeSlot.objects.in_bulk([pk for pk, _ in summary['roomless_slots']])
 
-        return redirect('hod-manage-courses')
+    rejections = summary['rejections']
+    teacher = rejections['teacher_busy'] + rejections['teacher_unavailable']
+    if not summary['runs']:
+        advice = None
+    elif rejections['no_room'] > teacher + rejections['batch_busy']:
+        advice = "Rooms are the bottleneck: add classrooms or free up the busiest slots."
+    elif teacher >= rejections['batch_busy']:
+        advice = "Teacher availability is the bottleneck: rebalance courses across teachers."
     else:
-        # Redirect to home if not authorized
-        return redirect('home')
+        advice = "Batch timetables are the bottleneck: spread the batches' courses more evenly."
+
+    context = {
+        'summary': summary,
+        'advice': advice,
+        'tracing': scheduler.trace_enabled(),
+        'teachers': [(teachers.get(pk), count) for pk, count in summary['teachers']],
+        'batches': [(batches.get(pk), count) for pk, count in summary['batches']],
+        'roomless_slots': [(timeslots.get(pk), count) for pk, count in summary['roomless_slots']],
+        'recent_runs': runs[:10],
+    }
+    return render(request, 'hod/scheduling_bottlenecks.html', context)
 
+@hod_required
 def delete_course(request, course_id):
-    # Check if the user is authenticated and is a HOD
-    if request.user.is_authenticated and hasattr(request.user, 'department') and request.user == request.user.department.hod:
-        # Fetch the course by ID
-        try:
-            course = Course.objects.get(id=course_id, department=request.user.department)
-            course.delete()
-            messages.success(request, "Course deleted successfully.")
-        except Course.DoesNotExist:
-            messages.error(request, "Course does not exist.")
-        
-        return redirect('hod-manage-courses')
-    else:
-        # Redirect to home if not authorized
-        return redirect('home')
+    # Fetch the course by ID
+    try:
+        course = Course.objects.get(id=course_id, department=request.user.department)
+        course.delete()
+        messages.success(request, "Course deleted successfully.")
+    except Course.DoesNotExist:
+        messages.error(request, "Course does not exist.")
+    
+    if request.htmx:
+        # The button swaps its row away; restore the empty state after the last course
+        empty = not Course.objects.filter(department=request.user.department).exists()
+        return course_action_response(request, empty=empty)
+    return redirect('hod-manage-courses')
 
 # HTMX views for course management
-@login_required
+@hod_required(forbidden=True)
 def htmx_update_course(request, course_id):
     """Handle both displaying and processing the course edit form"""
-    # Check if user is HOD of the department
-    if not (hasattr(request.user, 'department') and 
-            request.user == request.user.department.hod):
-        return HttpResponse("Unauthorized", status=403)
-        
     course = get_object_or_404(Course, id=course_id, 
                               department=request.user.department)
     
-    # Store the original values of credits, teacher, and batches
+    # Store the original values of credits, labs, teacher, and batches
     original_credits = course.credits
-    original_teacher = course.teacher
+    original_labs = (course.lab_blocks, course.lab_length)
+    original_teacher = course.teacher_id
     original_batches = list(course.batches.all())
     
     if request.method == "POST":
@@ -191,15 +196,16 @@ def htmx_update_course(request, course_id):
         if form.is_valid():
             updated_course = form.save(commit=False)
             
-            # Check if credits, teacher, or batches have been modified
+            # Check if credits, labs, teacher, or batches have been modified
             if (
                 updated_course.credits != original_credits or
-                updated_course.teacher != original_teacher or
+                (updated_course.lab_blocks, updated_course.lab_length) != original_labs or
+                updated_course.teacher_id != original_teacher or
                 list(form.cleaned_data['batches']) != original_batches
             ):
                 # Remove all schedules associated with the course
                 Schedule.objects.filter(course=course).delete()
-                messages.warning(request, "Course schedules have been reset due to changes in credits, teacher, or batches.")
+                messages.warning(request, "Course schedules have been reset due to changes in credits, labs, teacher, or batches.")
             else:
                 # Only show success message if schedules weren't reset
                 messages.success(request, f"Course '{updated_course.name}' updated successfully!")
@@ -208,24 +214,19 @@ def htmx_update_course(request, course_id):
             updated_course.save()
             form.save_m2m()
             
-            # Redirect to manage courses page to show toast notifications
-            response = HttpResponse()
-            response['HX-Redirect'] = reverse('hod-manage-courses')
-            return response
+            # Replace just this course's row and show the messages as toasts
+            if request.htmx:
+                return course_action_response(request, updated_course, swap='replace', trigger='closeModal')
+            return redirect('hod-manage-courses')
     else:
         form = CreateCourseForm(instance=course, request=request)
     
     context = {'form': form, 'task': 'Update', 'course': course}
     return render(request, 'hod/partials/course_form.html', context)
 
-@login_required
+@hod_required(forbidden=True)
 def htmx_create_course(request):
     """Handle both displaying and processing the course creation form"""
-    # Check if user is HOD of the department
-    if not (hasattr(request.user, 'department') and 
-            request.user == request.user.department.hod):
-        return HttpResponse("Unauthorized", status=403)
-    
     if request.method == "POST":
         form = CreateCourseForm(request.POST, request=request)
         if form.is_valid():
@@ -237,26 +238,21 @@ def htmx_create_course(request):
             # Add success message
             messages.success(request, f"Course '{course.name}' created successfully!")
             
-            # Redirect to manage courses page to show toast notifications
-            response = HttpResponse()
-            response['HX-Redirect'] = reverse('hod-manage-courses')
-            return response
+            # Append the new row and show the message as a toast
+            if request.htmx:
+                return course_action_response(request, course, swap='append', trigger='closeModal')
+            return redirect('hod-manage-courses')
     else:
         form = CreateCourseForm(request=request)
     
     context = {'form': form, 'task': 'Create'}
     return render(request, 'hod/partials/course_form.html', context)
 
-@login_required
+@hod_required(forbidden=True)
 def htmx_course_list(request):
     """Return the updated course list partial for HTMX requests"""
-    # Check if user is HOD of the department
-    if not (hasattr(request.user, 'department') and 
-            request.user == request.user.department.hod):
-        return HttpResponse("Unauthorized", status=403)
-    
     # Fetch courses for the HOD's department
-    courses = request.user.department.courses.all()
+    courses = Course.objects.with_details().filter(department=request.user.department)
     
     # Render only the course list partial
     return render(request, 'hod/partials/course_list.html', {
@@ -0,0 +1,72 @@
+"""
+Live timetable updates: the server-sent events stream and the single-cell
+partial the page swaps in when a cell changes (see ``timetable/events.py``).
+"""
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+
+from .. import events, grids
+from ..models import Student
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',  # Don't let a proxy buffer the stream
+}
+
+
+async def achannels(user):
+    if user.role == 'teacher':
+        return events.teacher_channels(user)
+    student = await Student.objects.filter(user=user).afirst()
+    return events.student_channels(student) if student else None
+
+
+@login_required
+async def timetable_events(request):
+    """
+    Stream "cells changed" events for the user's timetable.
+
+    On ASGI the stream stays open and idles on the event loop. A WSGI
+    worker would be tied up by every open stream, so there the response
+    carries what changed so far and the browser reconnects after
+    ``events.RETRY_MS``, which turns it into cheap polling.
+    """
+    user = await request.auser()
+    channels = await achannels(user)
+    if channels is None:
+        return HttpResponse(status=204)  # Tells EventSource not to reconnect
+
+    cursor = events.parse_cursor(
+        request.headers.get('Last-Event-ID') or request.GET.get('cursor'), channels
+    )
+    if isinstance(request, ASGIRequest):
+        return StreamingHttpResponse(
+            events.stream(channels, cursor), content_type='text/event-stream', headers=SSE_HEADERS
+        )
+
+    cells, reset, cursor = await events.aread(channels, cursor)
+    body = f"retry: {events.RETRY_MS}\n\n" + events.message(cells, reset, cursor)
+    return HttpResponse(body, content_type='text/event-stream', headers=SSE_HEADERS)
+
+
+@login_required
+def timetable_cell(request, day, slot):
+    """Render one cell of the user's timetable for an HTMX swap."""
+    if day not in grids.days_of_week():
+        raise Http404("Unknown day.")
+
+    if request.user.role == 'teacher':
+        grid = grids.teacher_grid(request.user)
+        template = 'teacher/partials/timetable_cell.html'
+    else:
+        student = get_object_or_404(Student, user=request.user)
+        grid = grids.student_grid(student)
+        template = 'student/partials/timetable_cell.html'
+
+    return render(request, template, {
+        'day': day,
+        'slot_id': slot,
+        'schedule': grid.get(day, {}).get(slot),
+    })
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, Http404
+from .. import metrics
+
+def metrics_view(request):
+    """Expose application metrics in the Prometheus text format to staff and allowed scrapers."""
+    config = getattr(settings, 'ATMA_METRICS', {})
+    if not config.get('ENABLED'):
+        raise Http404("Metrics are disabled.")
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in config.get('ALLOWED_IPS', ())):
+        raise PermissionDenied
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
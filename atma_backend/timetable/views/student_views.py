@@ -1,8 +1,11 @@
 # Add this to your existing views file
 from django.shortcuts import get_object_or_404
-from django.shortcuts import render
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from ..models import Student, TimeSlot, Schedule, Course
+from django.http import HttpResponse
+from django.views.decorators.http import require_POST
+from .. import electives, events, grids
+from ..models import Student, Course
 
 @login_required
 def view_timetable(request):
@@ -20,37 +23,12 @@ def view_timetable(request):
     }
 
     if student:
-        # Get unique time slots ordered by slot letter
-        slots = TimeSlot.objects.values_list('slot', flat=True).distinct().order_by('slot')
-        time_slots = {}
-        for slot in slots:
-            # Get any time slot with this letter to get the time range
-            time_slot = TimeSlot.objects.filter(slot=slot).first()
-            time_slots[slot] = f"{time_slot.start_time.strftime('%H:%M')} - {time_slot.end_time.strftime('%H:%M')}"
-        
-        # Get the days of the week in the correct order
-        days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        
-        # Get all courses for the student (both core and elective)
-        courses = student.full_course_list
-        
-        # Initialize the timetable data structure
-        timetable_data = {}
-        for day in days_of_week:
-            timetable_data[day] = {}
-        
-        # Populate timetable data
-        for course in courses:
-            schedules = Schedule.objects.filter(course=course)
-            for schedule in schedules:
-                day = schedule.timeslot.day
-                slot = schedule.timeslot.slot
-                timetable_data[day][slot] = schedule
-        
+        # The grid is cached per student and rebuilt in one query on a miss
         context.update({
-            'time_slots': time_slots,
-            'days_of_week': days_of_week,
-            'timetable_data': timetable_data
+            'time_slots': grids.time_slot_labels(),
+            'days_of_week': grids.days_of_week(),
+            'timetable_data': grids.student_grid(student),
+            'events_cursor': events.current_cursor(events.student_channels(student)),
         })
 
     return render(request, 'student/timetable.html', context)
@@ -59,8 +37,43 @@ def view_timetable(request):
 @login_required
 def course_detail(request, course_id):
     """Return course details for modal display"""
-    course = get_object_or_404(Course, id=course_id)
+    course = get_object_or_404(Course.objects.with_details(), id=course_id)
     
     return render(request, 'student/partials/course_detail.html', {
         'course': course
     })
+
+def render_electives(request, student, **context):
+    """The elective list, as a partial for HTMX and as the full page otherwise."""
+    context['rows'] = electives.options(student)
+    if request.htmx:
+        return render(request, 'student/partials/elective_list.html', context)
+    return render(request, 'student/electives.html', context)
+
+@login_required
+def elective_registration(request):
+    """Open electives with their free seats and whether they clash with the student's timetable."""
+    student = Student.objects.filter(user=request.user).first()
+    if student is None:
+        return redirect('home')
+    return render_electives(request, student)
+
+def elective_action(request, course_id, action, done):
+    student = Student.objects.filter(user=request.user).first()
+    if student is None:
+        return HttpResponse("Unauthorized", status=403)
+    try:
+        course = action(student, course_id)
+    except electives.RegistrationError as e:
+        return render_electives(request, student, error=str(e))
+    return render_electives(request, student, notice=done.format(course.code))
+
+@login_required
+@require_POST
+def register_elective(request, course_id):
+    return elective_action(request, course_id, electives.register, "Registered for {}.")
+
+@login_required
+@require_POST
+def drop_elective(request, course_id):
+    return elective_action(request, course_id, electives.drop, "Dropped {}.")
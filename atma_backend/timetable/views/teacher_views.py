@@ -1,7 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
-from ..models import TimeSlot, Schedule, Course
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_POST
+from .. import events, grids, occupancy, timegrid
+from ..forms import FreeRoomSearchForm
+from ..models import Course, TeacherAvailability, TimeSlot
 
 @login_required
 def teacher_home(request):
@@ -30,37 +34,15 @@ def view_timetable(request):
     if request.user.role != 'teacher':
         return redirect('home')
     
-    # Get unique time slots ordered by slot letter
-    slots = TimeSlot.objects.values_list('slot', flat=True).distinct().order_by('slot')
-    time_slots = {}
-    for slot in slots:
-        # Get any time slot with this letter to get the time range
-        time_slot = TimeSlot.objects.filter(slot=slot).first()
-        time_slots[slot] = f"{time_slot.start_time.strftime('%H:%M')} - {time_slot.end_time.strftime('%H:%M')}"
-    
-    # Get the days of the week in the correct order
-    days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-    
     # Get all courses taught by the teacher
     courses = Course.objects.filter(teacher=request.user)
     
-    # Initialize the timetable data structure
-    timetable_data = {}
-    for day in days_of_week:
-        timetable_data[day] = {}
-    
-    # Populate timetable data
-    for course in courses:
-        schedules = Schedule.objects.filter(course=course)
-        for schedule in schedules:
-            day = schedule.timeslot.day
-            slot = schedule.timeslot.slot
-            timetable_data[day][slot] = schedule
-    
+    # The grid is cached per teacher and rebuilt in one query on a miss
     context = {
-        'time_slots': time_slots,
-        'days_of_week': days_of_week,
-        'timetable_data': timetable_data,
+        'time_slots': grids.time_slot_labels(),
+        'days_of_week': grids.days_of_week(),
+        'timetable_data': grids.teacher_grid(request.user),
+        'events_cursor': events.current_cursor(events.teacher_channels(request.user)),
         'courses': courses,
     }
     
@@ -73,12 +55,87 @@ def course_detail(request, course_id):
     if request.user.role != 'teacher':
         return HttpResponse("Unauthorized", status=403)
     
-    course = get_object_or_404(Course, id=course_id)
+    course = get_object_or_404(Course.objects.with_details(), id=course_id)
     
     # Check if the teacher is allowed to view this course
-    if course.teacher != request.user:
+    if course.teacher_id != request.user.pk:
         return HttpResponse("Unauthorized", status=403)
     
     return render(request, 'teacher/partials/course_detail.html', {
         'course': course
     })
+
+@login_required
+def free_rooms(request):
+    """Find classrooms free for a range of slots on one day, from the occupancy index."""
+    if request.user.role != 'teacher':
+        return redirect('home')
+
+    form = FreeRoomSearchForm(request.GET or None)
+    rooms = None
+    if form.is_valid():
+        index = occupancy.get_index()
+        data = form.cleaned_data
+        timeslot_ids = index.slot_range(data['day'], data['first_slot'], data['last_slot'])
+        if timeslot_ids:
+            rooms = index.free_rooms(
+                timeslot_ids,
+                min_capacity=data['min_capacity'] or 0,
+                available_only=not data['include_unavailable'],
+            )
+        else:
+            form.add_error(None, "No timeslots in that range.")
+
+    context = {'form': form, 'rooms': rooms}
+    if request.htmx:
+        return render(request, 'teacher/partials/free_room_results.html', context)
+    return render(request, 'teacher/free_rooms.html', context)
+
+def availability_cell(availability, day, slot):
+    return {
+        'day': day,
+        'slot': slot,
+        'state': availability.state(TimeSlot.grid_position(day, slot)),
+    }
+
+@login_required
+def availability(request):
+    """Grid editor for the teacher's unavailable and preferred slots."""
+    if request.user.role != 'teacher':
+        return redirect('home')
+
+    availability = (
+        TeacherAvailability.objects.filter(teacher=request.user).first()
+        or TeacherAvailability(teacher=request.user)
+    )
+    availability.fit_grid()
+    grid = timegrid.get_grid()
+    context = {
+        'time_slots': grid.labels(),
+        'rows': [
+            (day, [availability_cell(availability, day, slot) for slot in grid.codes])
+            for day in grid.days
+        ],
+    }
+    return render(request, 'teacher/availability.html', context)
+
+@login_required
+@require_POST
+def toggle_availability(request, day, slot):
+    """Cycle one cell through available, preferred and unavailable; return the cell."""
+    if request.user.role != 'teacher':
+        return HttpResponse("Unauthorized", status=403)
+    try:
+        position = TimeSlot.grid_position(day, slot)
+    except ValueError:
+        raise Http404("Unknown timeslot.")
+
+    with transaction.atomic():
+        availability, _ = TeacherAvailability.objects.select_for_update().get_or_create(teacher=request.user)
+        availability.fit_grid()
+        states = TeacherAvailability.STATES
+        state = states[(states.index(availability.state(position)) + 1) % len(states)]
+        availability.set_state(position, state)
+        availability.save(update_fields=['unavailable', 'preferred', 'grid', 'updated_at'])
+
+    return render(request, 'teacher/partials/availability_cell.html', availability_cell(availability, day, slot))